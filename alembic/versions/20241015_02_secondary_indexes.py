@@ -0,0 +1,57 @@
+"""Secondary indexes for foreign keys and list ordering."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "20241015_02"
+down_revision = "20241015_01"
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) chosen from the lookups and ORDER BY clauses the routes issue.
+INDEXES = [
+    ("ix_contracts_customer_id", "contracts", ["customer_id"]),
+    ("ix_batches_contract_id", "batches", ["contract_id"]),
+    ("ix_rearing_plans_batch_id_scheduled_date", "rearing_plans", ["batch_id", "scheduled_date"]),
+    ("ix_rearing_plans_scheduled_date", "rearing_plans", ["scheduled_date"]),
+    ("ix_feedings_batch_id_fed_at", "feedings", ["batch_id", "fed_at"]),
+    ("ix_feedings_fed_at", "feedings", ["fed_at"]),
+    ("ix_medications_batch_id_administered_at", "medications", ["batch_id", "administered_at"]),
+    ("ix_medications_administered_at", "medications", ["administered_at"]),
+    ("ix_weighings_batch_id_recorded_at", "weighings", ["batch_id", "recorded_at"]),
+    ("ix_weighings_recorded_at", "weighings", ["recorded_at"]),
+    ("ix_deliveries_contract_id_delivered_at", "deliveries", ["contract_id", "delivered_at"]),
+    ("ix_deliveries_batch_id", "deliveries", ["batch_id"]),
+    ("ix_deliveries_delivered_at", "deliveries", ["delivered_at"]),
+    ("ix_settlements_contract_id_settlement_date", "settlements", ["contract_id", "settlement_date"]),
+    ("ix_settlements_settlement_date", "settlements", ["settlement_date"]),
+]
+
+
+# InnoDB drops the index it created implicitly for a foreign key once one of ours covers the
+# column, and then refuses to drop ours (error 1553). Downgrade puts a plain index back first.
+FOREIGN_KEY_COLUMNS = {"customer_id", "contract_id", "batch_id"}
+
+
+def _needs_foreign_key_index(bind: sa.engine.Connection, name: str, table: str, column: str) -> bool:
+    if bind.dialect.name != "mysql" or column not in FOREIGN_KEY_COLUMNS:
+        return False
+    indexes = sa.inspect(bind).get_indexes(table)
+    return not any(index["name"] != name and index["column_names"][:1] == [column] for index in indexes)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for name, table, columns in reversed(INDEXES):
+        if _needs_foreign_key_index(bind, name, table, columns[0]):
+            # Named like the index MySQL generated for the unnamed constraint in 20241015_01.
+            op.create_index(columns[0], table, [columns[0]])
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""Per-contract delivery aggregates."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241015_03"
+down_revision = "20241015_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "contract_delivery_stats",
+        sa.Column("contract_id", sa.Integer(), sa.ForeignKey("contracts.id"), primary_key=True),
+        sa.Column("eggs_delivered_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("delivery_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("hen_delivery_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_delivered_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        """
+        INSERT INTO contract_delivery_stats
+            (contract_id, eggs_delivered_total, delivery_count, hen_delivery_count, last_delivered_at)
+        SELECT c.id,
+               COALESCE(SUM(d.eggs_delivered), 0),
+               COUNT(d.id),
+               COALESCE(SUM(CASE WHEN d.hen_delivered THEN 1 ELSE 0 END), 0),
+               MAX(d.delivered_at)
+        FROM contracts c
+        LEFT JOIN deliveries d ON d.contract_id = c.id
+        GROUP BY c.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("contract_delivery_stats")
@@ -0,0 +1,33 @@
+"""updated_at validators for conditional GETs."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241015_04"
+down_revision = "20241015_03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Stats rows change without touching their contract (e.g. a delivery is re-dated), so they
+    # carry their own timestamp for the contract ETags.
+    # batch mode: SQLite cannot ADD COLUMN with a non-constant default in place.
+    with op.batch_alter_table("contract_delivery_stats") as batch:
+        batch.add_column(
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+        )
+    # max(updated_at) probes for list ETags read one index entry instead of scanning.
+    op.create_index("ix_contracts_updated_at", "contracts", ["updated_at"])
+    op.create_index("ix_deliveries_updated_at", "deliveries", ["updated_at"])
+    op.create_index("ix_contract_delivery_stats_updated_at", "contract_delivery_stats", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contract_delivery_stats_updated_at", table_name="contract_delivery_stats")
+    op.drop_index("ix_deliveries_updated_at", table_name="deliveries")
+    op.drop_index("ix_contracts_updated_at", table_name="contracts")
+    with op.batch_alter_table("contract_delivery_stats") as batch:
+        batch.drop_column("updated_at")
@@ -0,0 +1,63 @@
+"""Normalised customer phone numbers for indexed lookups."""
+from __future__ import annotations
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241015_05"
+down_revision = "20241015_04"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 5000
+
+
+def _normalize(phone: object) -> str:
+    # Frozen copy of app.customer_phones.normalize_phone as of this revision.
+    digits = re.sub(r"\D+", "", str(phone))
+    if len(digits) == 13 and digits.startswith("86"):
+        digits = digits[2:]
+    return digits
+
+
+def upgrade() -> None:
+    phones = op.create_table(
+        "customer_phones",
+        sa.Column("phone", sa.String(32), primary_key=True),
+        sa.Column("customer_id", sa.Integer, sa.ForeignKey("customers.id", ondelete="CASCADE"), nullable=False),
+    )
+
+    # Existing data may list one number under several customers; the oldest customer keeps it.
+    customers = sa.table("customers", sa.column("id", sa.Integer), sa.column("phones", sa.JSON))
+    bind = op.get_bind()
+    seen: set[str] = set()
+    last_id = 0
+    while True:
+        # Keyset pages rather than a streamed cursor: MySQL cannot insert while one is open.
+        page = bind.execute(
+            sa.select(customers.c.id, customers.c.phones)
+            .where(customers.c.id > last_id)
+            .order_by(customers.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not page:
+            break
+        last_id = page[-1].id
+        rows = []
+        for customer_id, numbers in page:
+            for phone in map(_normalize, numbers or []):
+                if phone and phone not in seen:
+                    seen.add(phone)
+                    rows.append({"phone": phone, "customer_id": customer_id})
+        if rows:
+            bind.execute(phones.insert(), rows)
+    # After the backfill: building the index once is cheaper than maintaining it per row.
+    op.create_index("ix_customer_phones_customer_id", "customer_phones", ["customer_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customer_phones_customer_id", table_name="customer_phones")
+    op.drop_table("customer_phones")
@@ -0,0 +1,55 @@
+"""Full-text search index over customer name, recipient and address."""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20241015_06"
+down_revision = "20241015_05"
+branch_labels = None
+depends_on = None
+
+SEARCHED = "name, recipient_name, address"
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # External content: the FTS table stores only the index and reads text from customers.
+        op.execute(
+            f"CREATE VIRTUAL TABLE customers_fts USING fts5({SEARCHED}, "
+            "content='customers', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN "
+            f"INSERT INTO customers_fts(rowid, {SEARCHED}) VALUES (new.id, new.name, new.recipient_name, new.address); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN "
+            f"INSERT INTO customers_fts(customers_fts, rowid, {SEARCHED}) "
+            "VALUES ('delete', old.id, old.name, old.recipient_name, old.address); "
+            "END"
+        )
+        # Only edits of the searched columns touch the index.
+        op.execute(
+            f"CREATE TRIGGER customers_fts_update AFTER UPDATE OF {SEARCHED} ON customers BEGIN "
+            f"INSERT INTO customers_fts(customers_fts, rowid, {SEARCHED}) "
+            "VALUES ('delete', old.id, old.name, old.recipient_name, old.address); "
+            f"INSERT INTO customers_fts(rowid, {SEARCHED}) VALUES (new.id, new.name, new.recipient_name, new.address); "
+            "END"
+        )
+        op.execute("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')")
+    elif dialect == "mysql":
+        # InnoDB keeps FULLTEXT indexes current itself; ngram tokenises Chinese text.
+        op.execute(f"CREATE FULLTEXT INDEX ft_customers_search ON customers ({SEARCHED}) WITH PARSER ngram")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("customers_fts_update", "customers_fts_delete", "customers_fts_insert"):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE customers_fts")
+    elif dialect == "mysql":
+        op.execute("DROP INDEX ft_customers_search ON customers")
@@ -0,0 +1,48 @@
+"""Per-area counters for server-side customer code allocation."""
+from __future__ import annotations
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241015_07"
+down_revision = "20241015_06"
+branch_labels = None
+depends_on = None
+
+AREAS = "0123456789"
+
+
+def _first_free_sequence(bind, area: str) -> int:
+    # Frozen copy of app.customer_codes._first_free_sequence as of this revision.
+    customers = sa.table("customers", sa.column("customer_code", sa.String))
+    codes = bind.execute(
+        sa.select(customers.c.customer_code)
+        .where(
+            customers.c.customer_code.between(f"2{area}000", f"2{area}999"),
+            sa.func.length(customers.c.customer_code) == 5,
+        )
+        .order_by(customers.c.customer_code.desc())
+    ).scalars()
+    for code in codes:
+        matched = re.fullmatch(r"2\d(\d{3})", code)
+        if matched:
+            return int(matched.group(1)) + 1
+    return 1
+
+
+def upgrade() -> None:
+    counters = op.create_table(
+        "customer_code_counters",
+        sa.Column("area", sa.String(1), primary_key=True),
+        sa.Column("next_sequence", sa.Integer, nullable=False),
+    )
+    # Every area gets its row up front so that allocators never race to create one.
+    bind = op.get_bind()
+    op.bulk_insert(counters, [{"area": area, "next_sequence": _first_free_sequence(bind, area)} for area in AREAS])
+
+
+def downgrade() -> None:
+    op.drop_table("customer_code_counters")
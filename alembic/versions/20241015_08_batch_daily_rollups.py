@@ -0,0 +1,53 @@
+"""Per-batch daily feeding and weighing rollups."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20241015_08"
+down_revision = "20241015_07"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "batch_daily_feedings",
+        sa.Column("batch_id", sa.Integer(), sa.ForeignKey("batches.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("feed_type", sa.String(100), primary_key=True),
+        sa.Column("quantity_kg", sa.DECIMAL(12, 2), nullable=False),
+        sa.Column("feeding_count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "batch_daily_weighings",
+        sa.Column("batch_id", sa.Integer(), sa.ForeignKey("batches.id"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("weighing_count", sa.Integer(), nullable=False),
+        sa.Column("weight_total_kg", sa.DECIMAL(14, 2), nullable=False),
+        sa.Column("weight_min_kg", sa.DECIMAL(8, 2), nullable=False),
+        sa.Column("weight_max_kg", sa.DECIMAL(8, 2), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO batch_daily_feedings (batch_id, day, feed_type, quantity_kg, feeding_count)
+        SELECT batch_id, DATE(fed_at), feed_type, SUM(quantity_kg), COUNT(id)
+        FROM feedings
+        GROUP BY batch_id, DATE(fed_at), feed_type
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO batch_daily_weighings
+            (batch_id, day, weighing_count, weight_total_kg, weight_min_kg, weight_max_kg)
+        SELECT batch_id, DATE(recorded_at), COUNT(id), SUM(weight_kg), MIN(weight_kg), MAX(weight_kg)
+        FROM weighings
+        GROUP BY batch_id, DATE(recorded_at)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("batch_daily_weighings")
+    op.drop_table("batch_daily_feedings")
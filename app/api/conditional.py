@@ -0,0 +1,74 @@
+"""Weak ETag / Last-Modified validators for the endpoints dashboards poll.
+
+Routes compute a small *version* tuple (``updated_at`` of the row, or ``max(updated_at)``
+and ``count`` for a list) before running their real query. When the client already
+holds that version the route answers 304 without loading or serialising anything.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response, status
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def weak_etag(variant: str, version: Sequence[Any]) -> str:
+    """Weak validator for ``version`` of a representation selected by ``variant`` (the query string)."""
+
+    normalised = [_as_utc(value).isoformat() if isinstance(value, datetime) else value for value in version]
+    digest = hashlib.sha1(repr((variant, normalised)).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole-second precision.
+    return _as_utc(since) >= last_modified.replace(microsecond=0)
+
+
+def conditional_get(request: Request, response: Response, version: Sequence[Any] | None) -> Response | None:
+    """Attach validators for ``version`` to ``response``; return a 304 response if the client is current.
+
+    ``version`` of ``None`` (the row does not exist) skips validation so the route can 404.
+    """
+
+    if version is None:
+        return None
+    etag = weak_etag(request.url.query, version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    modified = [_as_utc(value) for value in version if isinstance(value, datetime)]
+    last_modified = max(modified) if modified else None
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+    if not fresh:
+        return None
+    headers = {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
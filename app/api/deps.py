@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db, get_db
 
 
 DBSession = Session
@@ -12,3 +13,7 @@ DBSession = Session
 
 def get_db_session(db: Session = Depends(get_db)) -> Session:
     return db
+
+
+def get_async_db_session(db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
+    return db
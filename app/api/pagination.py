@@ -0,0 +1,160 @@
+"""Opaque-cursor keyset pagination shared by the list endpoints."""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import date, datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, Query as ORMQuery
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Integer keys are BIGINT at most; larger values would overflow the driver's parameter binding.
+MAX_CURSOR_INT = 2**63 - 1
+
+SortKey = tuple[InstrumentedAttribute, bool]
+SelectOrQuery = TypeVar("SelectOrQuery", Select, ORMQuery)
+
+
+class PageParams:
+    """Query parameters accepted by every paginated list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = Query(default=None, description="Opaque cursor from X-Next-Cursor"),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column: InstrumentedAttribute, value: Any) -> Any:
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type in (datetime, date):
+        if not isinstance(value, str):
+            raise TypeError(f"expected an ISO string for {column.key}")
+        return python_type.fromisoformat(value)
+    if python_type is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(f"expected an integer for {column.key}")
+        if not -MAX_CURSOR_INT <= value <= MAX_CURSOR_INT:
+            raise ValueError(f"{column.key} out of range")
+        return value
+    raise TypeError(f"unsupported cursor column {column.key}")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _load_cursor(cursor: str, arity: int) -> list[Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list) or len(values) != arity:
+        raise ValueError("cursor arity mismatch")
+    return values
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str, keys: Sequence[SortKey]) -> list[Any]:
+    try:
+        values = _load_cursor(cursor, len(keys))
+        return [_decode_value(column, value) for (column, _), value in zip(keys, values)]
+    except (binascii.Error, ValueError, TypeError, OverflowError, UnicodeDecodeError):
+        raise _invalid_cursor() from None
+
+
+def decode_offset(cursor: str) -> int:
+    try:
+        (offset,) = _load_cursor(cursor, 1)
+    except (binascii.Error, ValueError, TypeError, OverflowError, UnicodeDecodeError):
+        raise _invalid_cursor() from None
+    if isinstance(offset, bool) or not isinstance(offset, int) or not 0 <= offset <= MAX_CURSOR_INT:
+        raise _invalid_cursor()
+    return offset
+
+
+def _after(keys: Sequence[SortKey], values: Sequence[Any]):
+    """Build the keyset predicate selecting rows strictly after ``values``."""
+
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        equal_prefix = [keys[i][0] == values[i] for i in range(index)]
+        beyond = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def keyset_page(statement: SelectOrQuery, page: PageParams, keys: Sequence[SortKey]) -> SelectOrQuery:
+    """Restrict ``statement`` (an ORM ``Query`` or a ``select()``) to the rows of one page plus a lookahead row."""
+
+    if page.cursor:
+        statement = statement.filter(_after(keys, decode_cursor(page.cursor, keys)))
+    ordering = [column.desc() if descending else column.asc() for column, descending in keys]
+    return statement.order_by(*ordering).limit(page.limit + 1)
+
+
+def finish_page(rows: list, response: Response, page: PageParams, keys: Sequence[SortKey]) -> list:
+    """Drop the lookahead row and advertise the next cursor when there is one."""
+
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column, _ in keys])
+    return rows
+
+
+def offset_page(statement: Select, page: PageParams) -> Select:
+    """Like :func:`keyset_page` for orders without a usable keyset, such as search relevance.
+
+    The cursor carries the position instead of the last row's keys, so the client sees the
+    same opaque ``X-Next-Cursor`` protocol.
+    """
+
+    offset = decode_offset(page.cursor) if page.cursor else 0
+    return statement.offset(offset).limit(page.limit + 1)
+
+
+def finish_offset_page(rows: list, response: Response, page: PageParams) -> list:
+    if len(rows) > page.limit:
+        offset = decode_offset(page.cursor) if page.cursor else 0
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([offset + page.limit])
+        rows = rows[: page.limit]
+    return rows
+
+
+def paginate(query: ORMQuery, response: Response, page: PageParams, keys: Sequence[SortKey]) -> list:
+    """Return one page of ``query`` ordered by ``keys`` and set the next cursor header.
+
+    ``keys`` must end with a unique column (the primary key) so that the order is total.
+    """
+
+    return finish_page(keyset_page(query, page, keys).all(), response, page, keys)
+
+
+async def paginate_async(
+    db: AsyncSession, statement: Select, response: Response, page: PageParams, keys: Sequence[SortKey]
+) -> list:
+    """Async counterpart of :func:`paginate` for ``select()`` statements."""
+
+    rows = (await db.scalars(keyset_page(statement, page, keys))).all()
+    return finish_page(list(rows), response, page, keys)
@@ -1,14 +1,33 @@
 """Router exports."""
-from . import batches, contracts, customers, deliveries, feedings, health, medications, rearing_plans, settlements, weighings
+from . import (
+    batches,
+    contracts,
+    customers,
+    dashboard,
+    deliveries,
+    dispatch,
+    feedings,
+    health,
+    imports,
+    medications,
+    metrics,
+    rearing_plans,
+    settlements,
+    weighings,
+)
 
 __all__ = [
     "batches",
     "contracts",
     "customers",
+    "dashboard",
     "deliveries",
+    "dispatch",
     "feedings",
     "health",
+    "imports",
     "medications",
+    "metrics",
     "rearing_plans",
     "settlements",
     "weighings",
@@ -1,15 +1,26 @@
 """Batch API endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...batch_stats import daily_stats
+from ...cache import reference_cache
 from ...models import Batch, Contract
-from ..deps import get_db_session
+from ...weight_curve import CurveUnavailable, weight_curve
+from ..deps import get_async_db_session, get_db_session
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/batches", tags=["batches"])
+async_router = APIRouter(prefix="/batches", tags=["batches"], include_in_schema=False)
+
+BATCH_SORT = [(Batch.id, False)]
 
 
 def _get_batch_or_404(db: Session, batch_id: int) -> Batch:
@@ -20,13 +31,22 @@ def _get_batch_or_404(db: Session, batch_id: int) -> Batch:
 
 
 @router.get("/", response_model=list[schemas.BatchRead])
-def list_batches(db: Session = Depends(get_db_session)) -> list[Batch]:
-    return db.query(Batch).order_by(Batch.id).all()
+def list_batches(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Batch]:
+    return paginate(db.query(Batch), response, page, BATCH_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.BatchRead])
+async def list_batches_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Batch]:
+    return await paginate_async(db, select(Batch), response, page, BATCH_SORT)
 
 
 @router.post("/", response_model=schemas.BatchRead, status_code=status.HTTP_201_CREATED)
 def create_batch(payload: schemas.BatchCreate, db: Session = Depends(get_db_session)) -> Batch:
-    contract = db.get(Contract, payload.contract_id)
+    contract = reference_cache().lookup(db, Contract, payload.contract_id)
     if not contract:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contract not found")
     batch = Batch(**payload.model_dump())
@@ -41,6 +61,36 @@ def get_batch(batch_id: int, db: Session = Depends(get_db_session)) -> Batch:
     return _get_batch_or_404(db, batch_id)
 
 
+@router.get("/{batch_id}/daily-stats", response_model=list[schemas.BatchDailyStats])
+def get_batch_daily_stats(
+    batch_id: int,
+    start: date | None = Query(default=None, description="First day, inclusive"),
+    end: date | None = Query(default=None, description="Last day, inclusive"),
+    db: Session = Depends(get_db_session),
+) -> list[dict]:
+    """Feed given (in total and per feed type) and weigh-in figures of a batch per day, from the daily rollups."""
+
+    if not reference_cache().lookup(db, Batch, batch_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    return daily_stats(db, batch_id, start, end)
+
+
+@router.get("/{batch_id}/weight-curve", response_model=schemas.WeightCurve)
+def get_batch_weight_curve(
+    batch_id: int,
+    points: int = Query(default=500, ge=3, le=10_000, description="Maximum number of points to return"),
+    db: Session = Depends(get_db_session),
+) -> dict:
+    """Weigh-ins of a batch in time order, downsampled with LTTB to at most ``points`` points."""
+
+    if not reference_cache().lookup(db, Batch, batch_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    try:
+        return weight_curve(db, batch_id, points)
+    except CurveUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+
+
 @router.put("/{batch_id}", response_model=schemas.BatchRead)
 def update_batch(batch_id: int, payload: schemas.BatchUpdate, db: Session = Depends(get_db_session)) -> Batch:
     batch = _get_batch_or_404(db, batch_id)
@@ -48,6 +98,7 @@ def update_batch(batch_id: int, payload: schemas.BatchUpdate, db: Session = Depe
         setattr(batch, key, value)
     db.add(batch)
     db.commit()
+    reference_cache().invalidate(Batch, batch_id)
     db.refresh(batch)
     return batch
 
@@ -62,3 +113,4 @@ def delete_batch(batch_id: int, db: Session = Depends(get_db_session)) -> None:
     batch = _get_batch_or_404(db, batch_id)
     db.delete(batch)
     db.commit()
+    reference_cache().invalidate(Batch, batch_id)
@@ -1,32 +1,120 @@
 """Contract API endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from ... import schemas
-from ...models import Contract, Customer
-from ..deps import get_db_session
+from ...cache import reference_cache
+from ...dispatch import invalidate_dispatch
+from ...models import Batch, Contract, ContractDeliveryStats, Customer
+from ..conditional import conditional_get
+from ..deps import get_async_db_session, get_db_session
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/contracts", tags=["contracts"])
+async_router = APIRouter(prefix="/contracts", tags=["contracts"], include_in_schema=False)
 
+CONTRACT_SORT = [(Contract.id, False)]
 
-def _get_contract_or_404(db: Session, contract_id: int) -> Contract:
-    contract = db.get(Contract, contract_id)
+
+def _get_contract_or_404(db: Session, contract_id: int, options: list[LoaderOption] | None = None) -> Contract:
+    # populate_existing applies the loader options even when the contract is already in the session.
+    contract = db.get(Contract, contract_id, options=options, populate_existing=options is not None)
     if not contract:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
     return contract
 
 
+def contract_load_options(
+    expand: str | None = Query(default=None, description="Comma separated relations to embed, e.g. customer"),
+) -> list[LoaderOption]:
+    """Translate ``?expand=`` into loader options; unrequested relations are never loaded.
+
+    The one-row delivery aggregates are always joined into the contract query.
+    """
+
+    requested = {item.strip() for item in (expand or "").split(",") if item.strip()}
+    unknown = requested - {"customer"}
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported expand: {', '.join(sorted(unknown))}"
+        )
+    stats = joinedload(Contract.delivery_stats)
+    if "customer" in requested:
+        return [selectinload(Contract.customer), stats]
+    return [noload(Contract.customer), stats]
+
+
+def _expands_customer(request: Request) -> bool:
+    return "customer" in (request.query_params.get("expand") or "")
+
+
+def _contracts_version(request: Request) -> Select:
+    """Probe whose result changes whenever any contract representation in a list would."""
+
+    columns = [
+        func.max(Contract.updated_at),
+        func.count(Contract.id),
+        select(func.max(ContractDeliveryStats.updated_at)).scalar_subquery(),
+    ]
+    if _expands_customer(request):
+        columns.append(select(func.max(Customer.updated_at)).scalar_subquery())
+    return select(*columns)
+
+
+def _contract_version(request: Request, contract_id: int) -> Select:
+    columns = [Contract.updated_at, ContractDeliveryStats.updated_at]
+    statement = (
+        select(*columns)
+        .select_from(Contract)
+        .outerjoin(ContractDeliveryStats, ContractDeliveryStats.contract_id == Contract.id)
+        .where(Contract.id == contract_id)
+    )
+    if _expands_customer(request):
+        statement = statement.add_columns(Customer.updated_at).join(Customer, Customer.id == Contract.customer_id)
+    return statement
+
+
 @router.get("/", response_model=list[schemas.ContractRead])
-def list_contracts(db: Session = Depends(get_db_session)) -> list[Contract]:
-    return db.query(Contract).order_by(Contract.id).all()
+def list_contracts(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    options: list[LoaderOption] = Depends(contract_load_options),
+    db: Session = Depends(get_db_session),
+) -> list[Contract] | Response:
+    not_modified = conditional_get(request, response, db.execute(_contracts_version(request)).one())
+    if not_modified:
+        return not_modified
+    return paginate(db.query(Contract).options(*options), response, page, CONTRACT_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.ContractRead])
+async def list_contracts_async(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    options: list[LoaderOption] = Depends(contract_load_options),
+    db: AsyncSession = Depends(get_async_db_session),
+) -> list[Contract] | Response:
+    not_modified = conditional_get(request, response, (await db.execute(_contracts_version(request))).one())
+    if not_modified:
+        return not_modified
+    return await paginate_async(db, select(Contract).options(*options), response, page, CONTRACT_SORT)
 
 
 @router.post("/", response_model=schemas.ContractRead, status_code=status.HTTP_201_CREATED)
-def create_contract(payload: schemas.ContractCreate, db: Session = Depends(get_db_session)) -> Contract:
-    customer = db.get(Customer, payload.customer_id)
+def create_contract(
+    payload: schemas.ContractCreate,
+    options: list[LoaderOption] = Depends(contract_load_options),
+    db: Session = Depends(get_db_session),
+) -> Contract:
+    customer = reference_cache().lookup(db, Customer, payload.customer_id)
     if not customer:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Customer not found")
     existing = db.query(Contract).filter(Contract.contract_code == payload.contract_code).first()
@@ -35,29 +123,42 @@ def create_contract(payload: schemas.ContractCreate, db: Session = Depends(get_d
     data = payload.model_dump()
     if data.get("remaining_eggs") is None:
         data["remaining_eggs"] = data["total_eggs"]
-    contract = Contract(**data)
+    contract = Contract(**data, delivery_stats=ContractDeliveryStats())
     db.add(contract)
     db.commit()
-    db.refresh(contract)
-    return contract
+    invalidate_dispatch()
+    return _get_contract_or_404(db, contract.id, options)
 
 
 @router.get("/{contract_id}", response_model=schemas.ContractRead)
-def get_contract(contract_id: int, db: Session = Depends(get_db_session)) -> Contract:
-    return _get_contract_or_404(db, contract_id)
+def get_contract(
+    contract_id: int,
+    request: Request,
+    response: Response,
+    options: list[LoaderOption] = Depends(contract_load_options),
+    db: Session = Depends(get_db_session),
+) -> Contract | Response:
+    not_modified = conditional_get(request, response, db.execute(_contract_version(request, contract_id)).first())
+    if not_modified:
+        return not_modified
+    return _get_contract_or_404(db, contract_id, options)
 
 
 @router.put("/{contract_id}", response_model=schemas.ContractRead)
 def update_contract(
-    contract_id: int, payload: schemas.ContractUpdate, db: Session = Depends(get_db_session)
+    contract_id: int,
+    payload: schemas.ContractUpdate,
+    options: list[LoaderOption] = Depends(contract_load_options),
+    db: Session = Depends(get_db_session),
 ) -> Contract:
     contract = _get_contract_or_404(db, contract_id)
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(contract, key, value)
     db.add(contract)
     db.commit()
-    db.refresh(contract)
-    return contract
+    reference_cache().invalidate(Contract, contract_id)
+    invalidate_dispatch()
+    return _get_contract_or_404(db, contract_id, options)
 
 
 @router.delete(
@@ -68,5 +169,10 @@ def update_contract(
 )
 def delete_contract(contract_id: int, db: Session = Depends(get_db_session)) -> None:
     contract = _get_contract_or_404(db, contract_id)
+    batch_ids = [batch.id for batch in contract.batches]
     db.delete(contract)
     db.commit()
+    cache = reference_cache()
+    cache.invalidate(Contract, contract_id)
+    cache.invalidate(Batch, *batch_ids)
+    invalidate_dispatch()
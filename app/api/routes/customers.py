@@ -1,15 +1,26 @@
 """Customer API endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
-from ...models import Customer
-from ..deps import get_db_session
+from ...cache import reference_cache
+from ...customer_codes import AreaCodesExhausted, InvalidAreaCode, allocate_code, observe_code
+from ...customer_phones import normalize_phone, normalize_phones, sync_phones, taken_phones
+from ...customer_search import search_statement
+from ...dispatch import invalidate_dispatch
+from ...models import Batch, Contract, Customer, CustomerPhone
+from ..deps import get_async_db_session, get_db_session
+from ..pagination import PageParams, finish_offset_page, offset_page, paginate, paginate_async
 
 router = APIRouter(prefix="/customers", tags=["customers"])
+async_router = APIRouter(prefix="/customers", tags=["customers"], include_in_schema=False)
+
+CUSTOMER_SORT = [(Customer.id, False)]
 
 
 def _get_customer_or_404(db: Session, customer_id: int) -> Customer:
@@ -19,23 +30,112 @@ def _get_customer_or_404(db: Session, customer_id: int) -> Customer:
     return customer
 
 
+def _check_phones_free(db: Session, phones: list[str], customer_id: int | None = None) -> None:
+    taken = taken_phones(db, normalize_phones(phones), customer_id)
+    if taken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Phone already bound to another customer: {', '.join(taken)}",
+        )
+
+
+def _by_phone(phone: str):
+    return (
+        select(Customer)
+        .join(CustomerPhone, CustomerPhone.customer_id == Customer.id)
+        .where(CustomerPhone.phone == normalize_phone(phone))
+    )
+
+
+def _found(customer: Customer | None) -> Customer:
+    if customer is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Customer not found")
+    return customer
+
+
 @router.get("/", response_model=list[schemas.CustomerRead])
-def list_customers(db: Session = Depends(get_db_session)) -> list[Customer]:
-    return db.query(Customer).order_by(Customer.id).all()
+def list_customers(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Customer]:
+    return paginate(db.query(Customer), response, page, CUSTOMER_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.CustomerRead])
+async def list_customers_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Customer]:
+    return await paginate_async(db, select(Customer), response, page, CUSTOMER_SORT)
+
+
+def _search(dialect: str, q: str, page: PageParams):
+    if not q.split():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query is empty")
+    return offset_page(search_statement(dialect, q), page)
+
+
+@router.get("/search", response_model=list[schemas.CustomerRead])
+def search_customers(
+    response: Response,
+    q: str = Query(..., max_length=100, description="Terms matched in name, recipient and address"),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db_session),
+) -> list[Customer]:
+    """Customers matching every term of ``q``, most relevant first."""
+
+    customers = db.scalars(_search(db.get_bind().dialect.name, q, page)).all()
+    return finish_offset_page(list(customers), response, page)
+
+
+@async_router.get("/search", response_model=list[schemas.CustomerRead])
+async def search_customers_async(
+    response: Response,
+    q: str = Query(..., max_length=100),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db_session),
+) -> list[Customer]:
+    customers = (await db.scalars(_search(db.get_bind().dialect.name, q, page))).all()
+    return finish_offset_page(list(customers), response, page)
 
 
 @router.post("/", response_model=schemas.CustomerRead, status_code=status.HTTP_201_CREATED)
 def create_customer(payload: schemas.CustomerCreate, db: Session = Depends(get_db_session)) -> Customer:
-    existing = db.query(Customer).filter(Customer.customer_code == payload.customer_code).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Customer code already exists")
+    """Create a customer; without ``customer_code`` the next free code of ``area_code`` is allocated."""
+
+    if payload.customer_code is not None:
+        existing = db.query(Customer).filter(Customer.customer_code == payload.customer_code).first()
+        if existing:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Customer code already exists")
+    _check_phones_free(db, payload.phones)
     customer = Customer(**payload.model_dump())
+    # Allocated last: the counter row stays locked until the commit.
+    if customer.customer_code is None:
+        try:
+            customer.customer_code = allocate_code(db, customer.area_code)
+        except InvalidAreaCode as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from None
+        except AreaCodesExhausted as exc:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from None
+    else:
+        observe_code(db, customer.customer_code)
+    sync_phones(customer)
     db.add(customer)
     db.commit()
     db.refresh(customer)
     return customer
 
 
+@router.get("/by-phone/{phone}", response_model=schemas.CustomerRead)
+def get_customer_by_phone(phone: str, db: Session = Depends(get_db_session)) -> Customer:
+    """Find the customer a phone number is bound to; formatting and a +86 prefix are ignored."""
+
+    return _found(db.scalar(_by_phone(phone)))
+
+
+@async_router.get("/by-phone/{phone}", response_model=schemas.CustomerRead)
+async def get_customer_by_phone_async(phone: str, db: AsyncSession = Depends(get_async_db_session)) -> Customer:
+    return _found(await db.scalar(_by_phone(phone)))
+
+
 @router.get("/{customer_id}", response_model=schemas.CustomerRead)
 def get_customer(customer_id: int, db: Session = Depends(get_db_session)) -> Customer:
     return _get_customer_or_404(db, customer_id)
@@ -47,10 +147,16 @@ def update_customer(
 ) -> Customer:
     customer = _get_customer_or_404(db, customer_id)
     update_data = payload.model_dump(exclude_unset=True)
+    if update_data.get("phones") is not None:
+        _check_phones_free(db, update_data["phones"], customer_id)
     for key, value in update_data.items():
         setattr(customer, key, value)
+    if "phones" in update_data:
+        sync_phones(customer)
     db.add(customer)
     db.commit()
+    reference_cache().invalidate(Customer, customer_id)
+    invalidate_dispatch()
     db.refresh(customer)
     return customer
 
@@ -63,5 +169,12 @@ def update_customer(
 )
 def delete_customer(customer_id: int, db: Session = Depends(get_db_session)) -> None:
     customer = _get_customer_or_404(db, customer_id)
+    contract_ids = [contract.id for contract in customer.contracts]
+    batch_ids = [batch.id for contract in customer.contracts for batch in contract.batches]
     db.delete(customer)
     db.commit()
+    cache = reference_cache()
+    cache.invalidate(Customer, customer_id)
+    cache.invalidate(Contract, *contract_ids)
+    cache.invalidate(Batch, *batch_ids)
+    invalidate_dispatch()
@@ -0,0 +1,18 @@
+"""Admin dashboard endpoint (see :mod:`app.dashboard`)."""
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ... import schemas
+from ...dashboard import dashboard_summary
+from ..deps import get_db_session
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("/summary", response_model=schemas.DashboardSummary)
+def get_dashboard_summary(db: Session = Depends(get_db_session)) -> dict:
+    """Contract, egg, hen, pending settlement and batch figures; up to ``DASHBOARD_CACHE_TTL`` seconds old."""
+
+    return dashboard_summary(db)
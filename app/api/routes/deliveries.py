@@ -1,17 +1,30 @@
 """Delivery API endpoints."""
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Update, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...cache import BatchRef, ContractRef, reference_cache
+from ...delivery_stats import apply_delta, apply_delta_async, hen_delivered_from_stats, stats_delta
+from ...dispatch import invalidate_dispatch
 from ...models import Batch, Contract, Delivery
-from ..deps import get_db_session
+from ..conditional import conditional_get
+from ..deps import get_async_db_session, get_db_session
+from ..export import ExportParams, export_params, stream_export
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/deliveries", tags=["deliveries"])
+async_router = APIRouter(prefix="/deliveries", tags=["deliveries"], include_in_schema=False)
+
+DELIVERY_SORT = [(Delivery.delivered_at, True), (Delivery.id, True)]
+DELIVERIES_VERSION = select(func.max(Delivery.updated_at), func.count(Delivery.id))
 
 
 def _get_delivery_or_404(db: Session, delivery_id: int) -> Delivery:
@@ -21,46 +34,262 @@ def _get_delivery_or_404(db: Session, delivery_id: int) -> Delivery:
     return delivery
 
 
-def _ensure_contract(db: Session, contract_id: int) -> Contract:
-    contract = db.get(Contract, contract_id)
+def _ensure_contract(contract: ContractRef | None) -> ContractRef:
     if not contract:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Contract not found")
     return contract
 
 
+def _egg_deduction(contract_id: int, eggs: int, hen_delivered: bool = False) -> Update:
+    """Build the guarded UPDATE moving ``eggs`` out of a contract's balance (negative values give them back).
+
+    The guard lives in the UPDATE itself, so concurrent deliveries against the same
+    contract can never overdraw it or lose each other's deductions.
+    """
+
+    contracts = Contract.__table__
+    values: dict[str, object] = {"remaining_eggs": contracts.c.remaining_eggs - eggs}
+    if hen_delivered:
+        values["hen_delivered"] = True
+    return (
+        update(contracts)
+        .where(contracts.c.id == contract_id, contracts.c.remaining_eggs >= eggs)
+        .values(**values)
+    )
+
+
+def _deduct_remaining_eggs(db: Session, contract_id: int, eggs: int, hen_delivered: bool = False) -> bool:
+    statement = _egg_deduction(contract_id, eggs, hen_delivered)
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(Contract.__table__.c.id)).first() is not None
+    return db.execute(statement).rowcount == 1
+
+
+async def _deduct_remaining_eggs_async(
+    db: AsyncSession, contract_id: int, eggs: int, hen_delivered: bool = False
+) -> bool:
+    statement = _egg_deduction(contract_id, eggs, hen_delivered)
+    if db.get_bind().dialect.update_returning:
+        return (await db.execute(statement.returning(Contract.__table__.c.id))).first() is not None
+    return (await db.execute(statement)).rowcount == 1
+
+
+def _check_batch_link(batch: BatchRef | None, contract_id: int) -> None:
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
+    if batch.contract_id != contract_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not linked to contract")
+
+
+def _new_delivery(payload: schemas.DeliveryCreate) -> Delivery:
+    data = payload.model_dump()
+    if data.get("delivered_at") is None:
+        data["delivered_at"] = datetime.now(timezone.utc)
+    return Delivery(**data)
+
+
+def _delivery_added(delivery: Delivery) -> Update:
+    return stats_delta(delivery.contract_id, eggs=delivery.eggs_delivered, count=1, hen=int(delivery.hen_delivered))
+
+
+def _insufficient_eggs() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient remaining eggs")
+
+
 @router.get("/", response_model=list[schemas.DeliveryRead])
-def list_deliveries(db: Session = Depends(get_db_session)) -> list[Delivery]:
-    return db.query(Delivery).order_by(Delivery.delivered_at.desc()).all()
+def list_deliveries(
+    request: Request, response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Delivery] | Response:
+    not_modified = conditional_get(request, response, db.execute(DELIVERIES_VERSION).one())
+    if not_modified:
+        return not_modified
+    return paginate(db.query(Delivery), response, page, DELIVERY_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.DeliveryRead])
+async def list_deliveries_async(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db_session),
+) -> list[Delivery] | Response:
+    not_modified = conditional_get(request, response, (await db.execute(DELIVERIES_VERSION)).one())
+    if not_modified:
+        return not_modified
+    return await paginate_async(db, select(Delivery), response, page, DELIVERY_SORT)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_deliveries(params: ExportParams = Depends(export_params)) -> StreamingResponse:
+    return stream_export(Delivery, schemas.DeliveryRead, Delivery.delivered_at, params)
 
 
 @router.post("/", response_model=schemas.DeliveryRead, status_code=status.HTTP_201_CREATED)
 def create_delivery(payload: schemas.DeliveryCreate, db: Session = Depends(get_db_session)) -> Delivery:
-    contract = _ensure_contract(db, payload.contract_id)
+    cache = reference_cache()
+    contract = _ensure_contract(cache.lookup(db, Contract, payload.contract_id))
     if payload.batch_id is not None:
-        batch = db.get(Batch, payload.batch_id)
-        if not batch:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
-        if batch.contract_id != contract.id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not linked to contract")
-    data = payload.model_dump()
-    if data.get("delivered_at") is None:
-        data["delivered_at"] = datetime.now(timezone.utc)
-    delivery = Delivery(**data)
-    if contract.remaining_eggs - delivery.eggs_delivered < 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient remaining eggs")
-    contract.remaining_eggs -= delivery.eggs_delivered
-    if delivery.hen_delivered:
-        contract.hen_delivered = True
+        _check_batch_link(cache.lookup(db, Batch, payload.batch_id), contract.id)
+    delivery = _new_delivery(payload)
+    if not _deduct_remaining_eggs(db, contract.id, delivery.eggs_delivered, delivery.hen_delivered):
+        db.rollback()
+        # The cached contract may have been deleted since; report that rather than a balance error.
+        cache.invalidate(Contract, contract.id)
+        _ensure_contract(cache.lookup(db, Contract, contract.id))
+        raise _insufficient_eggs()
     db.add(delivery)
-    db.add(contract)
+    db.flush()
+    apply_delta(db, contract.id, _delivery_added(delivery))
     db.commit()
+    invalidate_dispatch()
     db.refresh(delivery)
-    db.refresh(contract)
     return delivery
 
 
+@async_router.post("/", response_model=schemas.DeliveryRead, status_code=status.HTTP_201_CREATED)
+async def create_delivery_async(
+    payload: schemas.DeliveryCreate, db: AsyncSession = Depends(get_async_db_session)
+) -> Delivery:
+    cache = reference_cache()
+    contract = _ensure_contract(await cache.lookup_async(db, Contract, payload.contract_id))
+    if payload.batch_id is not None:
+        _check_batch_link(await cache.lookup_async(db, Batch, payload.batch_id), contract.id)
+    delivery = _new_delivery(payload)
+    if not await _deduct_remaining_eggs_async(db, contract.id, delivery.eggs_delivered, delivery.hen_delivered):
+        await db.rollback()
+        cache.invalidate(Contract, contract.id)
+        _ensure_contract(await cache.lookup_async(db, Contract, contract.id))
+        raise _insufficient_eggs()
+    db.add(delivery)
+    await db.flush()
+    await apply_delta_async(db, contract.id, _delivery_added(delivery))
+    await db.commit()
+    invalidate_dispatch()
+    await db.refresh(delivery)
+    return delivery
+
+
+@router.post("/bulk", response_model=schemas.DeliveryBulkResult, status_code=status.HTTP_201_CREATED)
+def create_deliveries_bulk(
+    payload: schemas.DeliveryBulkCreate, db: Session = Depends(get_db_session)
+) -> schemas.DeliveryBulkResult:
+    """Register a courier's whole route in one transaction; any invalid row rejects the batch."""
+
+    rows = payload.deliveries
+    contract_ids = {row.contract_id for row in rows}
+    batch_ids = {row.batch_id for row in rows if row.batch_id is not None}
+    remaining = dict(
+        db.execute(select(Contract.id, Contract.remaining_eggs).where(Contract.id.in_(contract_ids))).all()
+    )
+    batch_owner = (
+        dict(db.execute(select(Batch.id, Batch.contract_id).where(Batch.id.in_(batch_ids))).all()) if batch_ids else {}
+    )
+
+    errors: list[schemas.DeliveryBulkError] = []
+    rows_by_contract: dict[int, list[int]] = defaultdict(list)
+    deductions: dict[int, int] = defaultdict(int)
+    hen_contracts: set[int] = set()
+    for index, row in enumerate(rows):
+        if row.contract_id not in remaining:
+            errors.append(schemas.DeliveryBulkError(index=index, detail="Contract not found"))
+            continue
+        if row.batch_id is not None:
+            if row.batch_id not in batch_owner:
+                errors.append(schemas.DeliveryBulkError(index=index, detail="Batch not found"))
+                continue
+            if batch_owner[row.batch_id] != row.contract_id:
+                errors.append(schemas.DeliveryBulkError(index=index, detail="Batch not linked to contract"))
+                continue
+        rows_by_contract[row.contract_id].append(index)
+        deductions[row.contract_id] += row.eggs_delivered
+        if row.hen_delivered:
+            hen_contracts.add(row.contract_id)
+    for contract_id, eggs in deductions.items():
+        if remaining[contract_id] - eggs < 0:
+            errors.extend(
+                schemas.DeliveryBulkError(index=index, detail="Insufficient remaining eggs")
+                for index in rows_by_contract[contract_id]
+            )
+    if errors:
+        errors.sort(key=lambda error: error.index)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=[error.model_dump() for error in errors]
+        )
+
+    now = datetime.now(timezone.utc)
+    records = [{**row.model_dump(), "delivered_at": row.delivered_at or now} for row in rows]
+    contracts = Contract.__table__
+    result = db.execute(
+        update(contracts)
+        .where(contracts.c.id == bindparam("contract_id_"), contracts.c.remaining_eggs >= bindparam("eggs"))
+        .values(
+            remaining_eggs=contracts.c.remaining_eggs - bindparam("eggs"),
+            hen_delivered=or_(contracts.c.hen_delivered, bindparam("hen")),
+        ),
+        [
+            {"contract_id_": contract_id, "eggs": eggs, "hen": contract_id in hen_contracts}
+            for contract_id, eggs in deductions.items()
+        ],
+    )
+    if result.rowcount != len(deductions):
+        # A concurrent delivery drained one of the contracts between validation and the update.
+        db.rollback()
+        current = dict(
+            db.execute(select(Contract.id, Contract.remaining_eggs).where(Contract.id.in_(deductions))).all()
+        )
+        short = [contract_id for contract_id, eggs in deductions.items() if current.get(contract_id, 0) < eggs]
+        # The balance may have been restored again since the failed update; still name every
+        # row rather than answer with an empty list.
+        errors = [
+            schemas.DeliveryBulkError(index=index, detail="Insufficient remaining eggs")
+            for contract_id in short or deductions
+            for index in rows_by_contract[contract_id]
+        ]
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[error.model_dump() for error in sorted(errors, key=lambda error: error.index)],
+        )
+    db.execute(insert(Delivery), records)
+    added: dict[int, dict[str, int]] = {}
+    for record in records:
+        contract_id = record["contract_id"]
+        totals = added.setdefault(contract_id, {"contract_id_": contract_id, "eggs": 0, "count": 0, "hen": 0})
+        totals["eggs"] += record["eggs_delivered"]
+        totals["count"] += 1
+        totals["hen"] += int(record["hen_delivered"])
+    stats = db.execute(
+        stats_delta(bindparam("contract_id_"), eggs=bindparam("eggs"), count=bindparam("count"), hen=bindparam("hen")),
+        list(added.values()),
+    )
+    if stats.rowcount != len(added):
+        for contract_id in added:
+            apply_delta(db, contract_id, stats_delta(contract_id))
+    db.commit()
+    invalidate_dispatch()
+    balances = db.execute(
+        select(Contract.id, Contract.remaining_eggs, Contract.hen_delivered)
+        .where(Contract.id.in_(contract_ids))
+        .order_by(Contract.id)
+    ).all()
+    return schemas.DeliveryBulkResult(
+        created=len(records),
+        contracts=[
+            schemas.ContractEggBalance(
+                contract_id=row.id, remaining_eggs=row.remaining_eggs, hen_delivered=row.hen_delivered
+            )
+            for row in balances
+        ],
+    )
+
+
 @router.get("/{delivery_id}", response_model=schemas.DeliveryRead)
-def get_delivery(delivery_id: int, db: Session = Depends(get_db_session)) -> Delivery:
+def get_delivery(
+    delivery_id: int, request: Request, response: Response, db: Session = Depends(get_db_session)
+) -> Delivery | Response:
+    version = db.execute(select(Delivery.updated_at).where(Delivery.id == delivery_id)).first()
+    not_modified = conditional_get(request, response, version)
+    if not_modified:
+        return not_modified
     return _get_delivery_or_404(db, delivery_id)
 
 
@@ -69,21 +298,37 @@ def update_delivery(
     delivery_id: int, payload: schemas.DeliveryUpdate, db: Session = Depends(get_db_session)
 ) -> Delivery:
     delivery = _get_delivery_or_404(db, delivery_id)
-    contract = _ensure_contract(db, delivery.contract_id)
-    original_eggs = delivery.eggs_delivered
+    original_eggs, original_hen = delivery.eggs_delivered, delivery.hen_delivered
     update_data = payload.model_dump(exclude_unset=True)
+    if "eggs_delivered" in update_data and update_data["eggs_delivered"] != original_eggs:
+        # Compare-and-set on the delivery row so two concurrent edits cannot both apply their delta.
+        deliveries = Delivery.__table__
+        swapped = db.execute(
+            update(deliveries)
+            .where(deliveries.c.id == delivery.id, deliveries.c.eggs_delivered == original_eggs)
+            .values(eggs_delivered=update_data["eggs_delivered"])
+        )
+        if swapped.rowcount != 1:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Delivery was modified concurrently")
+        delta = update_data["eggs_delivered"] - original_eggs
+        if not _deduct_remaining_eggs(db, delivery.contract_id, delta, bool(update_data.get("hen_delivered"))):
+            db.rollback()
+            raise _insufficient_eggs()
+    elif update_data.get("hen_delivered"):
+        _deduct_remaining_eggs(db, delivery.contract_id, 0, hen_delivered=True)
+    new_hen = update_data.get("hen_delivered")
+    hen_change = int(new_hen if new_hen is not None else original_hen) - int(original_hen)
     for key, value in update_data.items():
         setattr(delivery, key, value)
-    if "eggs_delivered" in update_data:
-        delta = update_data["eggs_delivered"] - original_eggs
-        if contract.remaining_eggs - delta < 0:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient remaining eggs")
-        contract.remaining_eggs -= delta
-    if "hen_delivered" in update_data and delivery.hen_delivered:
-        contract.hen_delivered = True
     db.add(delivery)
-    db.add(contract)
+    db.flush()
+    eggs_change = delivery.eggs_delivered - original_eggs
+    apply_delta(db, delivery.contract_id, stats_delta(delivery.contract_id, eggs=eggs_change, hen=hen_change))
+    if hen_change < 0:
+        db.execute(hen_delivered_from_stats(delivery.contract_id))
     db.commit()
+    invalidate_dispatch()
     db.refresh(delivery)
     return delivery
 
@@ -96,16 +341,17 @@ def update_delivery(
 )
 def delete_delivery(delivery_id: int, db: Session = Depends(get_db_session)) -> None:
     delivery = _get_delivery_or_404(db, delivery_id)
-    contract = _ensure_contract(db, delivery.contract_id)
-    contract.remaining_eggs += delivery.eggs_delivered
-    if delivery.hen_delivered:
-        # recompute hen delivery flag
-        other = (
-            db.query(Delivery)
-            .filter(Delivery.contract_id == contract.id, Delivery.id != delivery.id, Delivery.hen_delivered.is_(True))
-            .first()
-        )
-        contract.hen_delivered = other is not None
-    db.delete(delivery)
-    db.add(contract)
+    contract_id, eggs, hen_delivered = delivery.contract_id, delivery.eggs_delivered, delivery.hen_delivered
+    deliveries = Delivery.__table__
+    # Deleting first makes a concurrent second delete of the same row match nothing,
+    # so the eggs are handed back exactly once.
+    if db.execute(delete(deliveries).where(deliveries.c.id == delivery_id)).rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delivery not found")
+    db.expunge(delivery)
+    _deduct_remaining_eggs(db, contract_id, -eggs)
+    apply_delta(db, contract_id, stats_delta(contract_id, eggs=-eggs, count=-1, hen=-int(hen_delivered)))
+    if hen_delivered:
+        db.execute(hen_delivered_from_stats(contract_id))
     db.commit()
+    invalidate_dispatch()
@@ -0,0 +1,27 @@
+"""Courier dispatch manifest endpoint (see :mod:`app.dispatch`)."""
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from ... import schemas
+from ...dispatch import dispatch_manifest
+from ..deps import get_db_session
+
+router = APIRouter(prefix="/dispatch", tags=["dispatch"])
+
+
+@router.get("/{day}", response_model=schemas.DispatchManifest)
+def get_dispatch_manifest(
+    day: date,
+    cadence_days: int | None = Query(
+        default=None, ge=1, le=365, description="Days between deliveries; DISPATCH_CADENCE_DAYS when omitted"
+    ),
+    db: Session = Depends(get_db_session),
+) -> Response:
+    """Contracts due a delivery on ``day``, grouped by customer area and courier."""
+
+    return Response(dispatch_manifest(db, day, cadence_days), media_type="application/json")
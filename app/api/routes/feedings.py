@@ -2,14 +2,23 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...batch_stats import refresh_days
+from ...cache import reference_cache
 from ...models import Batch, Feeding
-from ..deps import get_db_session
+from ..deps import get_async_db_session, get_db_session
+from ..export import ExportParams, export_params, stream_export
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/feedings", tags=["feedings"])
+async_router = APIRouter(prefix="/feedings", tags=["feedings"], include_in_schema=False)
+
+FEEDING_SORT = [(Feeding.fed_at, True), (Feeding.id, True)]
 
 
 def _get_feeding_or_404(db: Session, feeding_id: int) -> Feeding:
@@ -20,17 +29,33 @@ def _get_feeding_or_404(db: Session, feeding_id: int) -> Feeding:
 
 
 @router.get("/", response_model=list[schemas.FeedingRead])
-def list_feedings(db: Session = Depends(get_db_session)) -> list[Feeding]:
-    return db.query(Feeding).order_by(Feeding.fed_at.desc()).all()
+def list_feedings(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Feeding]:
+    return paginate(db.query(Feeding), response, page, FEEDING_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.FeedingRead])
+async def list_feedings_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Feeding]:
+    return await paginate_async(db, select(Feeding), response, page, FEEDING_SORT)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_feedings(params: ExportParams = Depends(export_params)) -> StreamingResponse:
+    return stream_export(Feeding, schemas.FeedingRead, Feeding.fed_at, params)
 
 
 @router.post("/", response_model=schemas.FeedingRead, status_code=status.HTTP_201_CREATED)
 def create_feeding(payload: schemas.FeedingCreate, db: Session = Depends(get_db_session)) -> Feeding:
-    batch = db.get(Batch, payload.batch_id)
+    batch = reference_cache().lookup(db, Batch, payload.batch_id)
     if not batch:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
     feeding = Feeding(**payload.model_dump())
     db.add(feeding)
+    db.flush()
+    refresh_days(db, Feeding, feeding.batch_id, [feeding.fed_at])
     db.commit()
     db.refresh(feeding)
     return feeding
@@ -46,9 +71,12 @@ def update_feeding(
     feeding_id: int, payload: schemas.FeedingUpdate, db: Session = Depends(get_db_session)
 ) -> Feeding:
     feeding = _get_feeding_or_404(db, feeding_id)
+    previous = feeding.fed_at
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(feeding, key, value)
     db.add(feeding)
+    db.flush()
+    refresh_days(db, Feeding, feeding.batch_id, [previous, feeding.fed_at])
     db.commit()
     db.refresh(feeding)
     return feeding
@@ -63,4 +91,6 @@ def update_feeding(
 def delete_feeding(feeding_id: int, db: Session = Depends(get_db_session)) -> None:
     feeding = _get_feeding_or_404(db, feeding_id)
     db.delete(feeding)
+    db.flush()
+    refresh_days(db, Feeding, feeding.batch_id, [feeding.fed_at])
     db.commit()
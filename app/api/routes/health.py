@@ -1,11 +1,22 @@
 """Health check endpoint."""
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter
 
+from ...cache import reference_cache
+
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@router.get("/health/cache")
+def cache_stats() -> dict[str, Any]:
+    """Hit/miss counters of the reference cache used by the write routes."""
+
+    return reference_cache().stats()
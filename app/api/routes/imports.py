@@ -0,0 +1,64 @@
+"""Bulk import upload endpoint (see :mod:`app.importer`)."""
+from __future__ import annotations
+
+import tempfile
+from typing import IO, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ... import schemas
+from ...importer import ImportFormatError, import_rows, read_rows
+from ..deps import get_db_session
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Uploads beyond this size are spooled to a temporary file instead of memory.
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+REJECTS_IN_RESPONSE = 100
+
+
+def _import_upload(
+    db: Session, kind: str, upload: IO[bytes], format: str, encoding: str
+) -> schemas.ImportResultRead:
+    rejects: list[schemas.ImportReject] = []
+
+    def on_reject(line: int, raw: dict, error: str) -> None:
+        if len(rejects) < REJECTS_IN_RESPONSE:
+            rejects.append(schemas.ImportReject(line=line, error=error))
+
+    try:
+        for columns, rows in read_rows(upload, format, encoding):
+            result = import_rows(db, kind, columns, rows, on_reject)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except UnicodeDecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"File is not valid {encoding} text"
+        ) from exc
+    return schemas.ImportResultRead(kind=kind, imported=result.imported, rejected=result.rejected, rejects=rejects)
+
+
+@router.post("/{kind}", response_model=schemas.ImportResultRead)
+async def upload_import(
+    kind: Literal["customers", "contracts", "deliveries"],
+    request: Request,
+    format: Literal["csv", "xlsx"] | None = Query(default=None, description="Defaults from the Content-Type"),
+    encoding: str = Query(default="utf-8-sig", description="CSV text encoding"),
+    db: Session = Depends(get_db_session),
+) -> schemas.ImportResultRead:
+    """Import a CSV or XLSX file sent as the raw request body.
+
+    Valid rows are committed chunk by chunk even when others are rejected; the response
+    counts both and lists the first rejected lines with their errors.
+    """
+
+    if format is None:
+        format = "xlsx" if request.headers.get("content-type", "").startswith(XLSX_MEDIA_TYPE) else "csv"
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        return await run_in_threadpool(_import_upload, db, kind, upload, format, encoding)
@@ -2,14 +2,22 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...cache import reference_cache
 from ...models import Batch, Medication
-from ..deps import get_db_session
+from ..deps import get_async_db_session, get_db_session
+from ..export import ExportParams, export_params, stream_export
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/medications", tags=["medications"])
+async_router = APIRouter(prefix="/medications", tags=["medications"], include_in_schema=False)
+
+MEDICATION_SORT = [(Medication.administered_at, True), (Medication.id, True)]
 
 
 def _get_medication_or_404(db: Session, medication_id: int) -> Medication:
@@ -20,13 +28,27 @@ def _get_medication_or_404(db: Session, medication_id: int) -> Medication:
 
 
 @router.get("/", response_model=list[schemas.MedicationRead])
-def list_medications(db: Session = Depends(get_db_session)) -> list[Medication]:
-    return db.query(Medication).order_by(Medication.administered_at.desc()).all()
+def list_medications(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Medication]:
+    return paginate(db.query(Medication), response, page, MEDICATION_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.MedicationRead])
+async def list_medications_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Medication]:
+    return await paginate_async(db, select(Medication), response, page, MEDICATION_SORT)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_medications(params: ExportParams = Depends(export_params)) -> StreamingResponse:
+    return stream_export(Medication, schemas.MedicationRead, Medication.administered_at, params)
 
 
 @router.post("/", response_model=schemas.MedicationRead, status_code=status.HTTP_201_CREATED)
 def create_medication(payload: schemas.MedicationCreate, db: Session = Depends(get_db_session)) -> Medication:
-    batch = db.get(Batch, payload.batch_id)
+    batch = reference_cache().lookup(db, Batch, payload.batch_id)
     if not batch:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
     medication = Medication(**payload.model_dump())
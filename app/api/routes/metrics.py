@@ -0,0 +1,14 @@
+"""Prometheus scrape endpoint."""
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ...metrics import CONTENT_TYPE, render
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/metrics", response_class=Response)
+def metrics() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE)
@@ -3,13 +3,20 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...cache import reference_cache
 from ...models import Batch, RearingPlan
-from ..deps import get_db_session
+from ..deps import get_async_db_session, get_db_session
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/rearing-plans", tags=["rearing-plans"])
+async_router = APIRouter(prefix="/rearing-plans", tags=["rearing-plans"], include_in_schema=False)
+
+REARING_PLAN_SORT = [(RearingPlan.scheduled_date, False), (RearingPlan.id, False)]
 
 
 def _get_plan_or_404(db: Session, plan_id: int) -> RearingPlan:
@@ -20,13 +27,22 @@ def _get_plan_or_404(db: Session, plan_id: int) -> RearingPlan:
 
 
 @router.get("/", response_model=list[schemas.RearingPlanRead])
-def list_plans(db: Session = Depends(get_db_session)) -> list[RearingPlan]:
-    return db.query(RearingPlan).order_by(RearingPlan.scheduled_date).all()
+def list_plans(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[RearingPlan]:
+    return paginate(db.query(RearingPlan), response, page, REARING_PLAN_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.RearingPlanRead])
+async def list_plans_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[RearingPlan]:
+    return await paginate_async(db, select(RearingPlan), response, page, REARING_PLAN_SORT)
 
 
 @router.post("/", response_model=schemas.RearingPlanRead, status_code=status.HTTP_201_CREATED)
 def create_plan(payload: schemas.RearingPlanCreate, db: Session = Depends(get_db_session)) -> RearingPlan:
-    batch = db.get(Batch, payload.batch_id)
+    batch = reference_cache().lookup(db, Batch, payload.batch_id)
     if not batch:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
     plan = RearingPlan(**payload.model_dump())
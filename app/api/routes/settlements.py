@@ -2,15 +2,22 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
-from sqlalchemy import func
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
-from ...models import Contract, Delivery, Settlement
-from ..deps import get_db_session
+from ...database import session_scope
+from ...models import Contract, ContractDeliveryStats, Settlement
+from ..deps import get_async_db_session, get_db_session
+from ..export import EXPORT_CHUNK_SIZE, MEDIA_TYPES, encode_ndjson
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/settlements", tags=["settlements"])
+async_router = APIRouter(prefix="/settlements", tags=["settlements"], include_in_schema=False)
+
+SETTLEMENT_SORT = [(Settlement.settlement_date, True), (Settlement.id, True)]
 
 
 def _get_contract_or_404(db: Session, contract_id: int) -> Contract:
@@ -28,17 +35,22 @@ def _get_settlement_or_404(db: Session, settlement_id: int) -> Settlement:
 
 
 @router.get("/", response_model=list[schemas.SettlementRead])
-def list_settlements(db: Session = Depends(get_db_session)) -> list[Settlement]:
-    return db.query(Settlement).order_by(Settlement.settlement_date.desc()).all()
+def list_settlements(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Settlement]:
+    return paginate(db.query(Settlement), response, page, SETTLEMENT_SORT)
 
 
-@router.post("/trial", response_model=schemas.SettlementTrialResponse)
-def trial_settlement(payload: schemas.SettlementTrialRequest, db: Session = Depends(get_db_session)):
-    contract = _get_contract_or_404(db, payload.contract_id)
-    eggs_query = db.query(func.coalesce(func.sum(Delivery.eggs_delivered), 0)).filter(
-        Delivery.contract_id == contract.id
-    )
-    eggs_total = eggs_query.scalar()
+@async_router.get("/", response_model=list[schemas.SettlementRead])
+async def list_settlements_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Settlement]:
+    return await paginate_async(db, select(Settlement), response, page, SETTLEMENT_SORT)
+
+
+def _trial_result(
+    contract: Contract, eggs_total: int, payload: schemas.SettlementTrialRequest
+) -> schemas.SettlementTrialResponse:
     eggs_delivered = payload.eggs_delivered if payload.eggs_delivered is not None else eggs_total
     price = float(payload.price_override if payload.price_override is not None else contract.price)
     amount_due = float(price) * float(eggs_delivered) / max(float(contract.total_eggs), 1)
@@ -52,6 +64,70 @@ def trial_settlement(payload: schemas.SettlementTrialRequest, db: Session = Depe
     )
 
 
+def _delivered_eggs(contract_id: int):
+    return select(ContractDeliveryStats.eggs_delivered_total).where(ContractDeliveryStats.contract_id == contract_id)
+
+
+@router.post("/trial", response_model=schemas.SettlementTrialResponse)
+def trial_settlement(payload: schemas.SettlementTrialRequest, db: Session = Depends(get_db_session)):
+    contract = _get_contract_or_404(db, payload.contract_id)
+    return _trial_result(contract, db.scalar(_delivered_eggs(contract.id)) or 0, payload)
+
+
+@async_router.post("/trial", response_model=schemas.SettlementTrialResponse)
+async def trial_settlement_async(
+    payload: schemas.SettlementTrialRequest, db: AsyncSession = Depends(get_async_db_session)
+):
+    contract = await db.get(Contract, payload.contract_id)
+    if not contract:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contract not found")
+    return _trial_result(contract, await db.scalar(_delivered_eggs(contract.id)) or 0, payload)
+
+
+def _bulk_trial_statement(payload: schemas.SettlementTrialBulkRequest):
+    """One query over the contracts matching the filter, joined to their delivery aggregates."""
+
+    delivered = func.coalesce(ContractDeliveryStats.eggs_delivered_total, 0).label("eggs_total")
+    statement = (
+        select(Contract.id, Contract.price, Contract.total_eggs, delivered)
+        .outerjoin(ContractDeliveryStats, ContractDeliveryStats.contract_id == Contract.id)
+        .order_by(Contract.id)
+    )
+    if payload.status is not None:
+        statement = statement.where(Contract.status == payload.status)
+    if payload.customer_id is not None:
+        statement = statement.where(Contract.customer_id == payload.customer_id)
+    if payload.start_date_from is not None:
+        statement = statement.where(Contract.start_date >= payload.start_date_from)
+    if payload.start_date_to is not None:
+        statement = statement.where(Contract.start_date <= payload.start_date_to)
+    return statement
+
+
+def _bulk_trial_records(payload: schemas.SettlementTrialBulkRequest):
+    # The rows carry id/price/total_eggs, which is all _trial_result reads from a contract.
+    template = schemas.SettlementTrialRequest(contract_id=0, price_override=payload.price_override, notes=payload.notes)
+    statement = _bulk_trial_statement(payload).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    with session_scope() as session:
+        for partition in session.execute(statement).partitions():
+            yield [_trial_result(row, row.eggs_total, template).model_dump(mode="json") for row in partition]
+
+
+@router.post("/trial/bulk", response_class=StreamingResponse)
+def trial_settlement_bulk(payload: schemas.SettlementTrialBulkRequest) -> StreamingResponse:
+    """Stream one NDJSON trial line per matching contract, ordered by contract id."""
+
+    if (
+        payload.start_date_from is not None
+        and payload.start_date_to is not None
+        and payload.start_date_from > payload.start_date_to
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="start_date_from must not be after start_date_to"
+        )
+    return StreamingResponse(encode_ndjson(_bulk_trial_records(payload)), media_type=MEDIA_TYPES["ndjson"])
+
+
 @router.post("/", response_model=schemas.SettlementRead, status_code=status.HTTP_201_CREATED)
 def create_settlement(payload: schemas.SettlementCreate, db: Session = Depends(get_db_session)) -> Settlement:
     contract = _get_contract_or_404(db, payload.contract_id)
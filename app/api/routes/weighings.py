@@ -2,14 +2,23 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ... import schemas
+from ...batch_stats import refresh_days
+from ...cache import reference_cache
 from ...models import Batch, Weighing
-from ..deps import get_db_session
+from ..deps import get_async_db_session, get_db_session
+from ..export import ExportParams, export_params, stream_export
+from ..pagination import PageParams, paginate, paginate_async
 
 router = APIRouter(prefix="/weighings", tags=["weighings"])
+async_router = APIRouter(prefix="/weighings", tags=["weighings"], include_in_schema=False)
+
+WEIGHING_SORT = [(Weighing.recorded_at, True), (Weighing.id, True)]
 
 
 def _get_weighing_or_404(db: Session, weighing_id: int) -> Weighing:
@@ -20,17 +29,33 @@ def _get_weighing_or_404(db: Session, weighing_id: int) -> Weighing:
 
 
 @router.get("/", response_model=list[schemas.WeighingRead])
-def list_weighings(db: Session = Depends(get_db_session)) -> list[Weighing]:
-    return db.query(Weighing).order_by(Weighing.recorded_at.desc()).all()
+def list_weighings(
+    response: Response, page: PageParams = Depends(), db: Session = Depends(get_db_session)
+) -> list[Weighing]:
+    return paginate(db.query(Weighing), response, page, WEIGHING_SORT)
+
+
+@async_router.get("/", response_model=list[schemas.WeighingRead])
+async def list_weighings_async(
+    response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db_session)
+) -> list[Weighing]:
+    return await paginate_async(db, select(Weighing), response, page, WEIGHING_SORT)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_weighings(params: ExportParams = Depends(export_params)) -> StreamingResponse:
+    return stream_export(Weighing, schemas.WeighingRead, Weighing.recorded_at, params)
 
 
 @router.post("/", response_model=schemas.WeighingRead, status_code=status.HTTP_201_CREATED)
 def create_weighing(payload: schemas.WeighingCreate, db: Session = Depends(get_db_session)) -> Weighing:
-    batch = db.get(Batch, payload.batch_id)
+    batch = reference_cache().lookup(db, Batch, payload.batch_id)
     if not batch:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch not found")
     weighing = Weighing(**payload.model_dump())
     db.add(weighing)
+    db.flush()
+    refresh_days(db, Weighing, weighing.batch_id, [weighing.recorded_at])
     db.commit()
     db.refresh(weighing)
     return weighing
@@ -46,9 +71,12 @@ def update_weighing(
     weighing_id: int, payload: schemas.WeighingUpdate, db: Session = Depends(get_db_session)
 ) -> Weighing:
     weighing = _get_weighing_or_404(db, weighing_id)
+    previous = weighing.recorded_at
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(weighing, key, value)
     db.add(weighing)
+    db.flush()
+    refresh_days(db, Weighing, weighing.batch_id, [previous, weighing.recorded_at])
     db.commit()
     db.refresh(weighing)
     return weighing
@@ -63,4 +91,6 @@ def update_weighing(
 def delete_weighing(weighing_id: int, db: Session = Depends(get_db_session)) -> None:
     weighing = _get_weighing_or_404(db, weighing_id)
     db.delete(weighing)
+    db.flush()
+    refresh_days(db, Weighing, weighing.batch_id, [weighing.recorded_at])
     db.commit()
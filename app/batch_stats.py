@@ -0,0 +1,169 @@
+"""Per-batch daily rollups of feedings and weighings.
+
+``batch_daily_feedings`` holds the feed given per batch, day and feed type and
+``batch_daily_weighings`` the count, total, minimum and maximum weight per batch and day,
+so growth and feed charts read a few rows per day instead of every record. A day is the
+calendar date of ``fed_at`` / ``recorded_at`` as stored.
+
+The feeding and weighing write routes refresh the days they touch inside their own
+transaction: each day is re-aggregated from the (batch_id, timestamp) index, which also
+keeps minimum and maximum right when a weigh-in is edited or removed.
+
+Rebuild the tables from the records (e.g. after a manual data fix or a bulk load)::
+
+    python -m app.batch_stats rebuild [--batch-id ID ...]
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable
+from datetime import date, datetime, time
+from typing import Any
+
+from sqlalchemy import Date, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from .database import session_scope
+from .models import BatchDailyFeeding, BatchDailyWeighing, Feeding, Weighing
+
+FEEDINGS = BatchDailyFeeding.__table__
+WEIGHINGS = BatchDailyWeighing.__table__
+
+
+def _feeding_rollup():
+    day = func.date(Feeding.fed_at, type_=Date)
+    return (
+        select(Feeding.batch_id, day, Feeding.feed_type, func.sum(Feeding.quantity_kg), func.count(Feeding.id))
+        .group_by(Feeding.batch_id, day, Feeding.feed_type)
+    )
+
+
+def _weighing_rollup():
+    day = func.date(Weighing.recorded_at, type_=Date)
+    return (
+        select(
+            Weighing.batch_id,
+            day,
+            func.count(Weighing.id),
+            func.sum(Weighing.weight_kg),
+            func.min(Weighing.weight_kg),
+            func.max(Weighing.weight_kg),
+        )
+        .group_by(Weighing.batch_id, day)
+    )
+
+
+# Source model, its timestamp, rollup table and the rollup columns in ``_*_rollup`` order.
+ROLLUPS: dict[type, tuple[Any, Any, list[str], Any]] = {
+    Feeding: (
+        Feeding.fed_at,
+        FEEDINGS,
+        ["batch_id", "day", "feed_type", "quantity_kg", "feeding_count"],
+        _feeding_rollup,
+    ),
+    Weighing: (
+        Weighing.recorded_at,
+        WEIGHINGS,
+        ["batch_id", "day", "weighing_count", "weight_total_kg", "weight_min_kg", "weight_max_kg"],
+        _weighing_rollup,
+    ),
+}
+
+
+def refresh_days(db: Session, model: type, batch_id: int, timestamps: Iterable[datetime]) -> None:
+    """Re-aggregate the days of ``timestamps`` for one batch from ``model`` (``Feeding`` or ``Weighing``).
+
+    Runs in the caller's transaction after the record change has been flushed.
+    """
+
+    timestamp, table, columns, rollup = ROLLUPS[model]
+    days = sorted({value.date() for value in timestamps})
+    if not days:
+        return
+    source = model.__table__
+    db.execute(delete(table).where(table.c.batch_id == batch_id, table.c.day.in_(days)))
+    # Timestamp ranges rather than date(): they can use the (batch_id, timestamp) index.
+    ranges = [timestamp.between(datetime.combine(day, time.min), datetime.combine(day, time.max)) for day in days]
+    db.execute(insert(table).from_select(columns, rollup().where(source.c.batch_id == batch_id, or_(*ranges))))
+
+
+def rebuild(db: Session, batch_ids: Iterable[int] | None = None) -> tuple[int, int]:
+    """Recompute both rollups from the records, for all batches or only ``batch_ids``.
+
+    Returns the number of feeding and weighing rows written. The caller commits.
+    """
+
+    if batch_ids is not None:
+        batch_ids = list(batch_ids)
+    written = []
+    for model, (_, table, columns, rollup) in ROLLUPS.items():
+        clear = delete(table)
+        aggregate = rollup()
+        if batch_ids is not None:
+            clear = clear.where(table.c.batch_id.in_(batch_ids))
+            aggregate = aggregate.where(model.__table__.c.batch_id.in_(batch_ids))
+        db.execute(clear)
+        written.append(db.execute(insert(table).from_select(columns, aggregate)).rowcount)
+    return written[0], written[1]
+
+
+def daily_stats(db: Session, batch_id: int, start: date | None = None, end: date | None = None) -> list[dict[str, Any]]:
+    """Per-day feed and weight figures of a batch between ``start`` and ``end`` inclusive, oldest first."""
+
+    feedings = select(FEEDINGS).where(FEEDINGS.c.batch_id == batch_id)
+    weighings = select(WEIGHINGS).where(WEIGHINGS.c.batch_id == batch_id)
+    if start is not None:
+        feedings = feedings.where(FEEDINGS.c.day >= start)
+        weighings = weighings.where(WEIGHINGS.c.day >= start)
+    if end is not None:
+        feedings = feedings.where(FEEDINGS.c.day <= end)
+        weighings = weighings.where(WEIGHINGS.c.day <= end)
+
+    days: dict[date, dict[str, Any]] = {}
+
+    def entry(day: date) -> dict[str, Any]:
+        if day not in days:
+            days[day] = {
+                "day": day,
+                "feed_kg": 0.0,
+                "feeds": [],
+                "weighing_count": 0,
+                "weight_mean_kg": None,
+                "weight_min_kg": None,
+                "weight_max_kg": None,
+            }
+        return days[day]
+
+    for row in db.execute(feedings.order_by(FEEDINGS.c.day, FEEDINGS.c.feed_type)):
+        day = entry(row.day)
+        day["feed_kg"] += float(row.quantity_kg)
+        day["feeds"].append(
+            {"feed_type": row.feed_type, "quantity_kg": float(row.quantity_kg), "feeding_count": row.feeding_count}
+        )
+    for row in db.execute(weighings):
+        entry(row.day).update(
+            weighing_count=row.weighing_count,
+            weight_mean_kg=round(float(row.weight_total_kg) / row.weighing_count, 3),
+            weight_min_kg=float(row.weight_min_kg),
+            weight_max_kg=float(row.weight_max_kg),
+        )
+    for day in days.values():
+        day["feed_kg"] = round(day["feed_kg"], 2)
+    return [days[day] for day in sorted(days)]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_command = commands.add_parser("rebuild", help="recompute the daily rollups from feedings and weighings")
+    rebuild_command.add_argument("--batch-id", type=int, action="append", help="limit to these batches")
+    args = parser.parse_args(argv)
+
+    with session_scope() as session:
+        feedings, weighings = rebuild(session, args.batch_id)
+        session.commit()
+    print(f"Rebuilt {feedings} daily feeding rows and {weighings} daily weighing rows")
+
+
+if __name__ == "__main__":
+    main()
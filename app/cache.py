@@ -0,0 +1,298 @@
+"""Read-through cache for the reference rows write routes look up by primary key.
+
+Creating a delivery, batch, feeding or weighing only needs to know that the parent
+contract or batch exists and who owns it. Those facts are cached as small tuples
+(never ORM instances, which belong to a session) and invalidated by the update and
+delete routes of the cached models.
+
+``REFERENCE_CACHE`` selects the store:
+
+* ``memory`` (default): a per-process LRU with TTL. With several workers another
+  process may keep a deleted row for up to ``REFERENCE_CACHE_TTL`` seconds.
+* ``shared``: a SQLite file shared by every worker on the host, so invalidations
+  are seen by all of them.
+* ``off``: always query the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .core.config import get_settings
+from .models import Batch, Contract, Customer
+
+MISSING: Any = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlightCache:
+    """One value recomputed at most every ``ttl`` seconds; callers that miss together share one computation.
+
+    A miss takes the lock and computes; callers arriving meanwhile wait for it and get
+    its result instead of running the same query again.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._entry: tuple[float, Any] | None = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Any:
+        entry = self._entry
+        if entry is None or entry[0] <= self._clock():
+            return MISSING
+        return entry[1]
+
+    def get_or_compute(self, compute: Callable[[], Any]) -> Any:
+        value = self._current()
+        if value is not MISSING:
+            return value
+        with self._lock:
+            value = self._current()
+            if value is MISSING:
+                value = compute()
+                self._entry = (self._clock() + self.ttl, value)
+            return value
+
+    def clear(self) -> None:
+        self._entry = None
+
+
+class SharedCache:
+    """The :class:`LRUCache` interface over a SQLite file, for caches shared by worker processes.
+
+    Values must be JSON serialisable. Expired and least recently stored entries are pruned
+    every ``prune_every`` writes rather than on each one.
+    """
+
+    def __init__(self, path: str, maxsize: int, ttl: float, prune_every: int = 256) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            connection.execute("DELETE FROM cache_entries WHERE expires <= ?", (time.time(),))
+            connection.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+
+
+class CustomerRef(NamedTuple):
+    id: int
+
+
+class ContractRef(NamedTuple):
+    id: int
+    customer_id: int
+
+
+class BatchRef(NamedTuple):
+    id: int
+    contract_id: int
+
+
+REFERENCES: dict[type, type[NamedTuple]] = {Customer: CustomerRef, Contract: ContractRef, Batch: BatchRef}
+
+
+class ReferenceCache:
+    """Primary-key lookups of :data:`REFERENCES` through ``store`` (``None`` disables caching)."""
+
+    def __init__(self, store: LRUCache | SharedCache | None, namespace: str = "") -> None:
+        self.store = store
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key(self, model: type, ident: int) -> str:
+        return f"{self.namespace}:{model.__tablename__}:{ident}"
+
+    def _statement(self, model: type, ident: int):
+        ref = REFERENCES[model]
+        return select(*(getattr(model, field) for field in ref._fields)).where(model.id == ident)
+
+    def _cached(self, model: type, ident: int) -> Any:
+        if self.store is None:
+            return MISSING
+        value = self.store.get(self._key(model, ident))
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value if value is MISSING else REFERENCES[model](*value)
+
+    def _store(self, model: type, ident: int, row: Any) -> Any:
+        if row is None:
+            # Misses are not cached: the row may be created by the very next request.
+            return None
+        ref = REFERENCES[model](*row)
+        if self.store is not None:
+            self.store.set(self._key(model, ident), list(ref))
+        return ref
+
+    def lookup(self, db: Session, model: type, ident: int) -> Any:
+        """Return the reference tuple for ``model`` ``ident``, or ``None`` if the row does not exist."""
+
+        ref = self._cached(model, ident)
+        if ref is not MISSING:
+            return ref
+        return self._store(model, ident, db.execute(self._statement(model, ident)).first())
+
+    async def lookup_async(self, db: AsyncSession, model: type, ident: int) -> Any:
+        ref = self._cached(model, ident)
+        if ref is not MISSING:
+            return ref
+        return self._store(model, ident, (await db.execute(self._statement(model, ident))).first())
+
+    def invalidate(self, model: type, *idents: int) -> None:
+        if self.store is None:
+            return
+        for ident in idents:
+            self.store.delete(self._key(model, ident))
+
+    def clear(self) -> None:
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> dict[str, Any]:
+        backend = "off" if self.store is None else "shared" if isinstance(self.store, SharedCache) else "memory"
+        return {
+            "backend": backend,
+            "size": 0 if self.store is None else len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_reference_cache: ReferenceCache | None = None
+_reference_cache_lock = threading.Lock()
+
+
+def _build_reference_cache() -> ReferenceCache:
+    settings = get_settings()
+    url = settings.resolved_database_url or settings.database_url
+    # Workers sharing a cache file may point at different databases (e.g. test runs).
+    namespace = hashlib.sha1(url.encode()).hexdigest()[:12]
+    if settings.reference_cache == "off":
+        return ReferenceCache(None, namespace)
+    if settings.reference_cache == "shared":
+        path = settings.reference_cache_path or os.path.join(tempfile.gettempdir(), "doppytang-reference-cache.db")
+        store: LRUCache | SharedCache = SharedCache(path, settings.reference_cache_size, settings.reference_cache_ttl)
+    else:
+        store = LRUCache(settings.reference_cache_size, settings.reference_cache_ttl)
+    return ReferenceCache(store, namespace)
+
+
+def reference_cache() -> ReferenceCache:
+    """The process-wide :class:`ReferenceCache`, built from settings on first use."""
+
+    global _reference_cache
+    if _reference_cache is None:
+        with _reference_cache_lock:
+            if _reference_cache is None:
+                _reference_cache = _build_reference_cache()
+    return _reference_cache
+
+
+def reset_reference_cache() -> None:
+    """Drop the cached entries and rebuild from settings on next use."""
+
+    global _reference_cache
+    with _reference_cache_lock:
+        if _reference_cache is not None:
+            _reference_cache.clear()
+        _reference_cache = None
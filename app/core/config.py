@@ -4,12 +4,15 @@ from __future__ import annotations
 import json
 import logging
 import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from functools import lru_cache
-from typing import List
+from typing import List, Literal
 
 from pydantic import BaseModel, Field
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
 
 LOGGER = logging.getLogger(__name__)
 
@@ -51,8 +54,54 @@ class Settings(BaseModel):
         default="sqlite:///./dev.db",
         description="Fallback SQLite database URL for cloud environments",
     )
+    db_connect_timeout: float = Field(
+        default=3.0,
+        gt=0,
+        description="Seconds each candidate database may take to accept a probe connection at startup",
+    )
+    db_pool_size: int = Field(default=5, ge=1, description="Connections kept open in the pool")
+    db_max_overflow: int = Field(default=10, ge=0, description="Extra connections allowed beyond db_pool_size")
+    db_pool_timeout: float = Field(default=30.0, gt=0, description="Seconds to wait for a free connection")
+    db_pool_recycle: int = Field(
+        default=1800,
+        description="Replace connections older than this many seconds (keep below MySQL wait_timeout); -1 disables",
+    )
+    db_pre_ping: Literal["auto", "always", "never"] = Field(
+        default="auto",
+        description="Ping connections on checkout: auto pings server databases but not SQLite files",
+    )
+    db_pool_wait_warning: float = Field(
+        default=0.1, ge=0, description="Log a warning when a pool checkout waits longer than this many seconds"
+    )
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, ge=0, description="PRAGMA mmap_size for SQLite")
+    sqlite_busy_timeout: int = Field(default=5000, ge=0, description="PRAGMA busy_timeout for SQLite, milliseconds")
+    slow_query_threshold: float = Field(
+        default=0.5, ge=0, description="Log statements taking at least this many seconds, with their route"
+    )
+    reference_cache: Literal["memory", "shared", "off"] = Field(
+        default="memory",
+        description="Store for contract/customer/batch reference lookups: per-process LRU, host-shared SQLite file or off",
+    )
+    reference_cache_size: int = Field(default=4096, ge=1, description="Maximum cached reference rows")
+    reference_cache_ttl: float = Field(default=60.0, gt=0, description="Seconds a cached reference row stays valid")
+    reference_cache_path: str | None = Field(
+        default=None, description="File backing the shared reference cache; defaults to the temp directory"
+    )
+    dispatch_cadence_days: int = Field(
+        default=7, ge=1, description="Days between deliveries after which an active contract is due again"
+    )
+    dispatch_cache_ttl: float = Field(default=300.0, gt=0, description="Seconds a computed dispatch manifest is reused")
+    dashboard_cache_ttl: float = Field(default=5.0, gt=0, description="Seconds a computed dashboard summary is reused")
     cors_origins: List[str] = Field(default_factory=lambda: ["*"])
     jwt_secret: str = Field(default="change-me")
+    async_routes: bool = Field(
+        default=False,
+        description="Serve the hot list/delivery/settlement routes from async handlers on an AsyncSession",
+    )
+    async_database_url: str | None = Field(
+        default=None,
+        description="Async driver URL; derived from the resolved URL (aiomysql/aiosqlite) when unset",
+    )
     resolved_database_url: str | None = None
     using_sqlite: bool = False
 
@@ -70,16 +119,100 @@ def get_settings() -> Settings:
         data["database_url"] = env
     if env := os.getenv("SQLITE_URL"):
         data["sqlite_url"] = env
+    if env := os.getenv("DB_CONNECT_TIMEOUT"):
+        data["db_connect_timeout"] = env
+    for field, variable in (
+        ("db_pool_size", "DB_POOL_SIZE"),
+        ("db_max_overflow", "DB_MAX_OVERFLOW"),
+        ("db_pool_timeout", "DB_POOL_TIMEOUT"),
+        ("db_pool_recycle", "DB_POOL_RECYCLE"),
+        ("db_pre_ping", "DB_PRE_PING"),
+        ("db_pool_wait_warning", "DB_POOL_WAIT_WARNING"),
+        ("sqlite_mmap_size", "SQLITE_MMAP_SIZE"),
+        ("sqlite_busy_timeout", "SQLITE_BUSY_TIMEOUT"),
+        ("slow_query_threshold", "SLOW_QUERY_THRESHOLD"),
+        ("reference_cache", "REFERENCE_CACHE"),
+        ("reference_cache_size", "REFERENCE_CACHE_SIZE"),
+        ("reference_cache_ttl", "REFERENCE_CACHE_TTL"),
+        ("reference_cache_path", "REFERENCE_CACHE_PATH"),
+        ("dispatch_cadence_days", "DISPATCH_CADENCE_DAYS"),
+        ("dispatch_cache_ttl", "DISPATCH_CACHE_TTL"),
+        ("dashboard_cache_ttl", "DASHBOARD_CACHE_TTL"),
+    ):
+        if env := os.getenv(variable):
+            data[field] = env
     if env := os.getenv("CORS_ORIGINS"):
         data["cors_origins"] = _parse_origins(env)
     if env := os.getenv("JWT_SECRET"):
         data["jwt_secret"] = env
+    if env := os.getenv("ASYNC_ROUTES"):
+        data["async_routes"] = env
+    if env := os.getenv("ASYNC_DATABASE_URL"):
+        data["async_database_url"] = env
     return Settings(**data)
 
 
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "mysql": "mysql+aiomysql"}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver of ``url`` for its async counterpart."""
+
+    scheme, separator, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {scheme}")
+    return f"{ASYNC_DRIVERS[backend]}{separator}{rest}"
+
+
+# Extra wait beyond the driver connect timeout before a probe that ignores it is abandoned.
+PROBE_GRACE_SECONDS = 1.0
+
+
+def _probe_connect_args(url: str, timeout: float) -> dict[str, object]:
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False, "timeout": timeout}
+    if url.startswith("mysql"):
+        # connect_timeout only covers the TCP connect; a server that accepts and then
+        # stalls in the handshake is bounded by the socket read/write timeouts.
+        return {"connect_timeout": timeout, "read_timeout": timeout, "write_timeout": timeout}
+    return {}
+
+
+def _probe(url: str, timeout: float) -> None:
+    engine = create_engine(url, future=True, poolclass=NullPool, connect_args=_probe_connect_args(url, timeout))
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    finally:
+        engine.dispose()
+
+
+def _start_probe(url: str, timeout: float) -> Future:
+    """Probe ``url`` on a daemon thread so a stuck driver never delays interpreter exit."""
+
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            _probe(url, timeout)
+        except BaseException as exc:  # re-raised by future.result() in the caller
+            future.set_exception(exc)
+        else:
+            future.set_result(None)
+
+    threading.Thread(target=run, name=f"db-probe-{url.partition(':')[0]}", daemon=True).start()
+    return future
+
+
 @lru_cache
 def resolve_database_url() -> str:
-    """Determine the active database URL with MySQL → SQLite fallback."""
+    """Determine the active database URL with MySQL → SQLite fallback.
+
+    All candidates are probed concurrently with a bounded connect timeout, so an
+    unreachable primary costs at most ``db_connect_timeout`` instead of a TCP timeout.
+    The first candidate in priority order that answers wins.
+    """
 
     settings = get_settings()
     candidates: list[str] = []
@@ -89,25 +222,29 @@ def resolve_database_url() -> str:
     if fallback and fallback not in candidates:
         candidates.append(fallback)
 
+    timeout = settings.db_connect_timeout
     last_error: Exception | None = None
-    for index, url in enumerate(candidates):
-        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    futures = [_start_probe(url, timeout) for url in candidates]
+    for index, (url, future) in enumerate(zip(candidates, futures)):
         try:
-            engine = create_engine(url, future=True, pool_pre_ping=True, connect_args=connect_args)
-            with engine.connect() as connection:
-                connection.execute(text("SELECT 1"))
-            engine.dispose()
-            object.__setattr__(settings, "resolved_database_url", url)
-            object.__setattr__(settings, "using_sqlite", url.startswith("sqlite"))
-            if index > 0:
-                LOGGER.warning("Primary database unavailable; falling back to %s", url)
-            return url
+            future.result(timeout=timeout + PROBE_GRACE_SECONDS)
+        except FutureTimeoutError as exc:  # pragma: no cover - network dependant
+            last_error = exc
+            LOGGER.warning("Timed out after %.1fs connecting to %s", timeout, url)
+            continue
         except SQLAlchemyError as exc:  # pragma: no cover - network dependant
             last_error = exc
             LOGGER.warning("Failed to connect to %s: %s", url, exc)
+            continue
         except Exception as exc:  # pragma: no cover - safety net
             last_error = exc
             LOGGER.warning("Unexpected error when connecting to %s: %s", url, exc)
+            continue
+        object.__setattr__(settings, "resolved_database_url", url)
+        object.__setattr__(settings, "using_sqlite", url.startswith("sqlite"))
+        if index > 0:
+            LOGGER.warning("Primary database unavailable; falling back to %s", url)
+        return url
 
     if last_error is not None:
         LOGGER.error("All configured database URLs failed; using fallback %s", fallback)
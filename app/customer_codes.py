@@ -0,0 +1,137 @@
+"""Server-side allocation of customer codes in the 2xxxx scheme.
+
+A code is ``2``, the area digit, then a three-digit sequence within the area
+(``docs/requirements.md``); ``area_code`` holds the first two digits, e.g. ``"21"``.
+Each area has a row in ``customer_code_counters`` with its next free sequence. Codes are
+claimed by one ``UPDATE`` that advances the counter only while the area has room, so the
+row lock serialises allocators and two transactions can never be handed the same code.
+A block of codes is one update as well, which is how bulk imports reserve a chunk's codes.
+
+The counters live in the caller's transaction: a rolled back customer gives its code back.
+Codes entered by hand still work; :func:`observe_code` moves the counter past them.
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Customer, CustomerCodeCounter
+
+AREA_CODE = re.compile(r"2(\d)")
+CUSTOMER_CODE = re.compile(r"2(\d)(\d{3})")
+MAX_SEQUENCE = 999
+
+COUNTERS = CustomerCodeCounter.__table__
+
+
+class InvalidAreaCode(ValueError):
+    """``area_code`` is not ``2`` followed by an area digit."""
+
+    def __init__(self, area_code: str | None) -> None:
+        super().__init__(f"area_code must be 2 followed by the area digit, got {area_code!r}")
+
+
+class AreaCodesExhausted(RuntimeError):
+    """The area has fewer free sequences left than were requested."""
+
+    def __init__(self, area_code: str, count: int) -> None:
+        codes = "a customer code" if count == 1 else f"{count} customer codes"
+        super().__init__(f"Area {area_code} has no room for {codes}; the 2xxxx scheme holds {MAX_SEQUENCE} per area")
+        self.area_code = area_code
+
+
+def format_code(area: str, sequence: int) -> str:
+    return f"2{area}{sequence:03d}"
+
+
+def _area(area_code: str | None) -> str:
+    matched = AREA_CODE.fullmatch(area_code or "")
+    if not matched:
+        raise InvalidAreaCode(area_code)
+    return matched.group(1)
+
+
+def _first_free_sequence(db: Session, area: str) -> int:
+    """One past the highest sequence already used in ``area``; 1 for a new area."""
+
+    codes = db.scalars(
+        select(Customer.customer_code)
+        .where(
+            Customer.customer_code.between(format_code(area, 0), format_code(area, MAX_SEQUENCE)),
+            func.length(Customer.customer_code) == 5,
+        )
+        .order_by(Customer.customer_code.desc())
+    )
+    for code in codes:
+        matched = CUSTOMER_CODE.fullmatch(code)
+        if matched:
+            return int(matched.group(2)) + 1
+    return 1
+
+
+def _create_counter(db: Session, area: str) -> bool:
+    """Add the counter row of ``area`` unless it exists; ``False`` when it was already there."""
+
+    if db.scalar(select(COUNTERS.c.area).where(COUNTERS.c.area == area)) is not None:
+        return False
+    try:
+        with db.begin_nested():
+            db.execute(insert(COUNTERS).values(area=area, next_sequence=_first_free_sequence(db, area)))
+    except IntegrityError:
+        pass  # another transaction created it first
+    return True
+
+
+def allocate_codes(db: Session, area_code: str | None, count: int = 1) -> list[str]:
+    """Reserve ``count`` consecutive codes in the area of ``area_code`` within the current transaction.
+
+    Raises :class:`InvalidAreaCode` for an area code outside the scheme and
+    :class:`AreaCodesExhausted` when the block does not fit; nothing is reserved then.
+    """
+
+    area = _area(area_code)
+    if count < 1:
+        return []
+    claim = (
+        update(COUNTERS)
+        .where(COUNTERS.c.area == area, COUNTERS.c.next_sequence + count <= MAX_SEQUENCE + 1)
+        .values(next_sequence=COUNTERS.c.next_sequence + count)
+    )
+    # Counters are created on first use (the migration creates those of existing areas).
+    for _ in range(2):
+        if db.execute(claim).rowcount:
+            end = db.scalar(select(COUNTERS.c.next_sequence).where(COUNTERS.c.area == area))
+            return [format_code(area, sequence) for sequence in range(end - count, end)]
+        if not _create_counter(db, area):
+            break
+    raise AreaCodesExhausted(area_code, count)
+
+
+def allocate_code(db: Session, area_code: str | None) -> str:
+    return allocate_codes(db, area_code)[0]
+
+
+def observe_codes(db: Session, codes: Iterable[str]) -> None:
+    """Move counters past hand-entered ``codes`` so that they are never allocated again."""
+
+    highest: dict[str, int] = {}
+    for code in codes:
+        matched = CUSTOMER_CODE.fullmatch(code)
+        if matched:
+            area, sequence = matched.group(1), int(matched.group(2))
+            highest[area] = max(highest.get(area, 0), sequence)
+    for area, sequence in highest.items():
+        _create_counter(db, area)
+        db.execute(
+            update(COUNTERS)
+            .where(COUNTERS.c.area == area, COUNTERS.c.next_sequence <= sequence)
+            .values(next_sequence=sequence + 1)
+        )
+
+
+def observe_code(db: Session, code: str) -> None:
+    observe_codes(db, [code])
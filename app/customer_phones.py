@@ -0,0 +1,51 @@
+"""Normalised phone numbers backing ``GET /customers/by-phone/{phone}``.
+
+``Customer.phones`` keeps the numbers as entered. ``customer_phones`` holds each number
+once, digits only and without the +86 country code, keyed by the number itself: a lookup
+is one primary-key probe and a number cannot be bound to two customers. The customer
+routes keep the rows in step with ``Customer.phones``.
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Customer, CustomerPhone
+
+NON_DIGITS = re.compile(r"\D+")
+
+
+def normalize_phone(phone: str) -> str:
+    digits = NON_DIGITS.sub("", str(phone))
+    if len(digits) == 13 and digits.startswith("86"):
+        digits = digits[2:]
+    return digits
+
+
+def normalize_phones(phones: Iterable[str]) -> list[str]:
+    """Normalised, de-duplicated numbers in their original order; blanks are dropped."""
+
+    return list(dict.fromkeys(phone for phone in map(normalize_phone, phones) if phone))
+
+
+def taken_phones(db: Session, phones: Iterable[str], customer_id: int | None = None) -> list[str]:
+    """Which of the normalised ``phones`` already belong to a customer other than ``customer_id``."""
+
+    phones = list(phones)
+    if not phones:
+        return []
+    statement = select(CustomerPhone.phone).where(CustomerPhone.phone.in_(phones))
+    if customer_id is not None:
+        statement = statement.where(CustomerPhone.customer_id != customer_id)
+    return sorted(db.scalars(statement))
+
+
+def sync_phones(customer: Customer) -> None:
+    """Make ``customer.phone_numbers`` match ``customer.phones`` (flushed with the customer)."""
+
+    wanted = normalize_phones(customer.phones or [])
+    current = {row.phone: row for row in customer.phone_numbers}
+    customer.phone_numbers = [current.get(phone) or CustomerPhone(phone=phone) for phone in wanted]
@@ -0,0 +1,74 @@
+"""Ranked customer search over name, recipient and address.
+
+The full-text index lives outside the ORM metadata because it differs per database
+(created by migration ``20241015_06``):
+
+* SQLite: the FTS5 table ``customers_fts`` (trigram tokenizer, so Chinese text matches
+  by substring) with ``customers`` as external content, kept current by triggers.
+  Results are ranked by ``bm25`` weighting name over recipient over address.
+* MySQL: the ``FULLTEXT`` index ``ft_customers_search`` with the ngram parser, which InnoDB
+  maintains itself; results are ranked by the ``MATCH ... AGAINST`` score.
+
+Each whitespace separated term must match. Terms shorter than the index's token size (three
+characters for trigrams, ``ngram_token_size`` = 2 on MySQL) cannot use it and are matched with
+``LIKE``; a query made only of such terms scans ``customers`` and ranks name matches first.
+"""
+from __future__ import annotations
+
+from sqlalchemy import Integer, Select, and_, case, column, func, literal_column, or_, select, table
+from sqlalchemy.dialects.mysql import match
+
+from .models import Customer
+
+SEARCH_COLUMNS = (Customer.name, Customer.recipient_name, Customer.address)
+# bm25 weights of SEARCH_COLUMNS.
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+MIN_TOKEN_LENGTH = {"sqlite": 3, "mysql": 2}
+
+customers_fts = table("customers_fts", column("rowid", Integer))
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _contains(term: str):
+    return or_(*(searched.contains(term, autoescape=True) for searched in SEARCH_COLUMNS))
+
+
+def _like_rank(term: str):
+    return case(
+        (Customer.name == term, 0),
+        (Customer.name.startswith(term, autoescape=True), 1),
+        (Customer.name.contains(term, autoescape=True), 2),
+        (Customer.recipient_name.contains(term, autoescape=True), 3),
+        else_=4,
+    )
+
+
+def search_statement(dialect: str, query: str) -> Select:
+    """``select(Customer, rank)`` for ``query``, best matches first (lower rank is better)."""
+
+    terms = query.split()
+    min_length = MIN_TOKEN_LENGTH.get(dialect)
+    indexed = [term for term in terms if min_length is not None and len(term) >= min_length]
+    short = [term for term in terms if term not in indexed]
+    if indexed and dialect == "sqlite":
+        fts = literal_column("customers_fts")
+        rank = func.bm25(fts, *SQLITE_WEIGHTS).label("rank")
+        statement = (
+            select(Customer, rank)
+            .join(customers_fts, customers_fts.c.rowid == Customer.id)
+            .where(fts.op("MATCH")(" ".join(map(_phrase, indexed))))
+        )
+    elif indexed and dialect == "mysql":
+        against = " ".join("+" + _phrase(term) for term in indexed)
+        score = match(*SEARCH_COLUMNS, against=against).in_boolean_mode()
+        rank = (-score).label("rank")
+        statement = select(Customer, rank).where(score > 0)
+    else:
+        rank = _like_rank(terms[0]).label("rank")
+        statement = select(Customer, rank)
+    if short:
+        statement = statement.where(and_(*map(_contains, short)))
+    return statement.order_by(rank, Customer.id)
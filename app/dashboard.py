@@ -0,0 +1,90 @@
+"""Operations figures for the admin home page.
+
+The contract and pending-settlement figures come from one statement that cross joins
+two single-row aggregates (conditional ``SUM``/``COUNT`` over ``contracts``, and the
+pending non-trial ``settlements``); batches are counted per status by a second one.
+
+The summary is cached per process for ``DASHBOARD_CACHE_TTL`` seconds and is not
+invalidated by writes: it may trail them by up to the TTL. Concurrent requests that
+find it expired share a single computation.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import Select, and_, case, func, select, true
+from sqlalchemy.orm import Session
+
+from .cache import SingleFlightCache
+from .core.config import get_settings
+from .models import Batch, Contract, Settlement
+
+
+def totals_statement() -> Select:
+    """One row: active contracts, their remaining eggs and undelivered hens, and pending settlement sums."""
+
+    active = Contract.status == "active"
+    contracts = select(
+        func.count(case((active, 1))).label("active_contracts"),
+        func.coalesce(func.sum(case((active, Contract.remaining_eggs), else_=0)), 0).label("remaining_eggs"),
+        func.count(case((and_(active, Contract.hen_delivered.is_(False)), 1))).label("hens_outstanding"),
+    ).subquery()
+    settlements = (
+        select(
+            func.count(Settlement.id).label("pending_settlements"),
+            func.coalesce(func.sum(Settlement.amount_due), 0).label("pending_amount_due"),
+            func.coalesce(func.sum(Settlement.amount_paid), 0).label("pending_amount_paid"),
+        )
+        .where(and_(Settlement.status == "pending", Settlement.is_trial.is_(False)))
+        .subquery()
+    )
+    return select(contracts, settlements).select_from(contracts.join(settlements, true()))
+
+
+def batches_statement() -> Select:
+    return select(Batch.status, func.count(Batch.id)).group_by(Batch.status).order_by(Batch.status)
+
+
+def build_summary(db: Session) -> dict[str, Any]:
+    """The summary shaped like ``schemas.DashboardSummary``."""
+
+    totals = db.execute(totals_statement()).one()
+    due, paid = float(totals.pending_amount_due), float(totals.pending_amount_paid)
+    return {
+        "active_contracts": totals.active_contracts,
+        "remaining_eggs": int(totals.remaining_eggs),
+        "hens_outstanding": totals.hens_outstanding,
+        "pending_settlements": totals.pending_settlements,
+        "pending_amount_due": round(due, 2),
+        "pending_amount_paid": round(paid, 2),
+        "pending_amount_outstanding": round(due - paid, 2),
+        "batches_by_status": dict(db.execute(batches_statement()).tuples().all()),
+        "generated_at": datetime.now(timezone.utc),
+    }
+
+
+_summary_cache: SingleFlightCache | None = None
+_summary_cache_lock = threading.Lock()
+
+
+def summary_cache() -> SingleFlightCache:
+    global _summary_cache
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SingleFlightCache(get_settings().dashboard_cache_ttl)
+    return _summary_cache
+
+
+def invalidate_dashboard() -> None:
+    """Forget the cached summary so the next request recomputes it."""
+
+    summary_cache().clear()
+
+
+def dashboard_summary(db: Session) -> dict[str, Any]:
+    """The summary, from the cache while it is younger than ``DASHBOARD_CACHE_TTL``."""
+
+    return summary_cache().get_or_compute(lambda: build_summary(db))
@@ -1,10 +1,23 @@
 """Database session and engine utilities with runtime fallbacks."""
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from typing import Any
 
-from .core.config import get_settings, resolve_database_url
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from .core.config import get_settings, resolve_database_url, to_async_url
+from .metrics import POOL_CHECKOUT_WAIT
+from .profiling import instrument_engine
+
+LOGGER = logging.getLogger(__name__)
 
 
 class Base(DeclarativeBase):
@@ -12,22 +25,151 @@ class Base(DeclarativeBase):
 
 
 settings = get_settings()
-database_url = resolve_database_url()
-connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
-engine = create_engine(
-    database_url,
-    future=True,
-    pool_pre_ping=True,
-    connect_args=connect_args,
-)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+# Both factories are bound by init_engine(); resolving the URL probes the network, so it
+# happens in the application lifespan (or on first use) rather than at import time.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, future=True)
+# Objects stay readable after commit: async sessions cannot lazy-load during serialization.
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_engine_lock = threading.Lock()
+
+
+class _TimedCheckout:
+    """Pool mixin that logs and records how long each checkout waited for a free connection."""
+
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        waited = time.perf_counter() - started
+        POOL_CHECKOUT_WAIT.observe((self.metrics_label,), waited)
+        if waited >= settings.db_pool_wait_warning:
+            LOGGER.warning("Waited %.3fs for a pooled connection (%s)", waited, self.status())
+        else:
+            LOGGER.debug("Pool checkout took %.4fs", waited)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str, poolclass: type[Pool]) -> dict[str, Any]:
+    """Pool keyword arguments for ``create_engine``/``create_async_engine`` from the settings."""
+
+    sqlite = _is_sqlite(url)
+    pre_ping = settings.db_pre_ping == "always" or (settings.db_pre_ping == "auto" and not sqlite)
+    options: dict[str, Any] = {"pool_pre_ping": pre_ping}
+    if sqlite and make_url(url).database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; SQLAlchemy picks a suitable pool.
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size:d}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout:d}")
+    finally:
+        cursor.close()
+
+
+def init_engine(database_url: str | None = None) -> Engine:
+    """Create the process-wide engine and bind ``SessionLocal`` to it (idempotent)."""
+
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            database_url = database_url or resolve_database_url()
+            connect_args = {"check_same_thread": False} if _is_sqlite(database_url) else {}
+            _engine = create_engine(
+                database_url,
+                future=True,
+                connect_args=connect_args,
+                **engine_options(database_url, TimedQueuePool),
+            )
+            if _is_sqlite(database_url):
+                event.listen(_engine, "connect", _apply_sqlite_pragmas)
+            instrument_engine(_engine)
+            SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_engine() -> Engine:
+    """Return the engine, resolving the database URL first if nothing has yet."""
+
+    return _engine if _engine is not None else init_engine()
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Open a session on the process-wide engine, creating the engine on first use."""
+
+    get_engine()
+    with SessionLocal() as session:
+        yield session
 
 
 def get_db():
     """Yield a new SQLAlchemy session per request."""
 
-    db = SessionLocal()
-    try:
+    with session_scope() as db:
+        yield db
+
+
+def init_async_engine() -> AsyncEngine:
+    """Create the async engine and bind ``AsyncSessionLocal`` (idempotent).
+
+    Only the application lifespan calls this, so the engine's connections belong to the
+    event loop that serves requests and the async drivers stay optional otherwise.
+    """
+
+    global _async_engine
+    if _async_engine is None:
+        url = settings.async_database_url or to_async_url(get_engine().url.render_as_string(hide_password=False))
+        _async_engine = create_async_engine(url, **engine_options(url, TimedAsyncQueuePool))
+        if _is_sqlite(url):
+            event.listen(_async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_engines() -> None:
+    """Release the pooled connections of both engines; the async one is dropped with its loop."""
+
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Yield a new async SQLAlchemy session per request."""
+
+    if _async_engine is None:
+        raise RuntimeError("The async engine is created by the application lifespan when ASYNC_ROUTES is set")
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
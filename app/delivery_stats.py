@@ -0,0 +1,125 @@
+"""Per-contract delivery aggregates kept in step with the deliveries table.
+
+Every write path that adds, changes or removes a delivery applies a delta to the
+contract's ``contract_delivery_stats`` row inside the same transaction, so settlement
+and contract reads get totals with a primary-key lookup instead of scanning deliveries.
+
+Rebuild the table from the deliveries (e.g. after a manual data fix)::
+
+    python -m app.delivery_stats rebuild [--contract-id ID ...]
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import DateTime, Update, case, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import session_scope
+from .models import Contract, ContractDeliveryStats, Delivery
+
+STATS = ContractDeliveryStats.__table__
+
+
+def latest_delivery(contract_id: Any):
+    """Scalar subquery for the newest ``delivered_at`` of a contract (served by its composite index)."""
+
+    return select(func.max(Delivery.delivered_at)).where(Delivery.contract_id == contract_id).scalar_subquery()
+
+
+def stats_delta(contract_id: Any, eggs: Any = 0, count: Any = 0, hen: Any = 0) -> Update:
+    """Build the UPDATE adding a delta to one contract's aggregates.
+
+    Arguments may be literals or ``bindparam`` objects for executemany. ``last_delivered_at``
+    is re-read through the (contract_id, delivered_at) index, so the statement must run after
+    the delivery change itself has been flushed.
+    """
+
+    return (
+        update(STATS)
+        .where(STATS.c.contract_id == contract_id)
+        .values(
+            eggs_delivered_total=STATS.c.eggs_delivered_total + eggs,
+            delivery_count=STATS.c.delivery_count + count,
+            hen_delivery_count=STATS.c.hen_delivery_count + hen,
+            last_delivered_at=latest_delivery(contract_id),
+        )
+    )
+
+
+def hen_delivered_from_stats(contract_id: int) -> Update:
+    """Recompute ``contracts.hen_delivered`` from the contract's hen delivery count."""
+
+    contracts = Contract.__table__
+    remaining = select(STATS.c.hen_delivery_count > 0).where(STATS.c.contract_id == contract_id).scalar_subquery()
+    return update(contracts).where(contracts.c.id == contract_id).values(hen_delivered=remaining)
+
+
+def rebuild(db: Session, contract_ids: Iterable[int] | None = None) -> int:
+    """Recompute aggregates from the deliveries, for all contracts or only ``contract_ids``.
+
+    The caller commits; the rows are replaced inside its transaction.
+    """
+
+    aggregate = (
+        select(
+            Contract.id,
+            func.coalesce(func.sum(Delivery.eggs_delivered), 0),
+            func.count(Delivery.id),
+            func.coalesce(func.sum(case((Delivery.hen_delivered.is_(True), 1), else_=0)), 0),
+            func.max(Delivery.delivered_at),
+            literal(datetime.now(timezone.utc), DateTime(timezone=True)),
+        )
+        .outerjoin(Delivery, Delivery.contract_id == Contract.id)
+        .group_by(Contract.id)
+    )
+    clear = delete(STATS)
+    if contract_ids is not None:
+        contract_ids = list(contract_ids)
+        aggregate = aggregate.where(Contract.id.in_(contract_ids))
+        clear = clear.where(STATS.c.contract_id.in_(contract_ids))
+    db.execute(clear)
+    columns = [
+        "contract_id",
+        "eggs_delivered_total",
+        "delivery_count",
+        "hen_delivery_count",
+        "last_delivered_at",
+        "updated_at",
+    ]
+    return db.execute(insert(STATS).from_select(columns, aggregate)).rowcount
+
+
+def apply_delta(db: Session, contract_id: int, statement: Update) -> None:
+    """Run a :func:`stats_delta` statement, rebuilding the row if the contract has none yet."""
+
+    if db.execute(statement).rowcount == 0:
+        db.flush()
+        rebuild(db, [contract_id])
+
+
+async def apply_delta_async(db: AsyncSession, contract_id: int, statement: Update) -> None:
+    if (await db.execute(statement)).rowcount == 0:
+        await db.flush()
+        await db.run_sync(rebuild, [contract_id])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_command = commands.add_parser("rebuild", help="recompute contract_delivery_stats from deliveries")
+    rebuild_command.add_argument("--contract-id", type=int, action="append", help="limit to these contracts")
+    args = parser.parse_args(argv)
+
+    with session_scope() as session:
+        rebuilt = rebuild(session, args.contract_id)
+        session.commit()
+    print(f"Rebuilt delivery stats for {rebuilt} contracts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Daily courier dispatch manifests: the contracts due a delivery on a given day.
+
+A contract is due on ``day`` when it is active, has started, still has eggs, and its last
+delivery (``contract_delivery_stats.last_delivered_at``) was at least ``cadence`` days
+before ``day``, or it has had none yet. The due contracts, their customers and the
+courier of each contract's last delivery come from one statement; the stops are grouped
+by the customer's ``area_code`` and that courier.
+
+Manifests are cached per process by ``(day, cadence)`` for ``DISPATCH_CACHE_TTL`` seconds.
+Delivery, contract and customer writes clear the cache after they commit; other worker
+processes notice within the TTL.
+"""
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from typing import Any
+
+from pydantic_core import to_json
+from sqlalchemy import Select, or_, select
+from sqlalchemy.orm import Session
+
+from .cache import MISSING, LRUCache
+from .core.config import get_settings
+from .models import Contract, ContractDeliveryStats, Customer, Delivery
+
+DISPATCH_CACHE_SIZE = 64
+
+
+def due_contracts_statement(day: date, cadence: int) -> Select:
+    """Rows of the contracts due on ``day``, ordered by area, courier and customer code."""
+
+    # Due when the last delivery fell on day - cadence or earlier, i.e. before the next midnight.
+    boundary = datetime.combine(day - timedelta(days=cadence - 1), time.min)
+    courier = (
+        select(Delivery.delivered_by)
+        .where(Delivery.contract_id == Contract.id)
+        .order_by(Delivery.delivered_at.desc(), Delivery.id.desc())
+        .limit(1)
+        .scalar_subquery()
+        .label("courier")
+    )
+    return (
+        select(
+            Customer.area_code,
+            courier,
+            Contract.id.label("contract_id"),
+            Contract.contract_code,
+            Customer.id.label("customer_id"),
+            Customer.customer_code,
+            Customer.name.label("customer_name"),
+            Customer.recipient_name,
+            Customer.address,
+            Customer.phones,
+            Contract.remaining_eggs,
+            ContractDeliveryStats.last_delivered_at,
+        )
+        .join(Customer, Customer.id == Contract.customer_id)
+        .outerjoin(ContractDeliveryStats, ContractDeliveryStats.contract_id == Contract.id)
+        .where(
+            Contract.status == "active",
+            Contract.remaining_eggs > 0,
+            Contract.start_date <= day,
+            or_(ContractDeliveryStats.last_delivered_at.is_(None), ContractDeliveryStats.last_delivered_at < boundary),
+        )
+        .order_by(Customer.area_code, courier, Customer.customer_code, Contract.id)
+    )
+
+
+def _stops(rows: Iterable[Any], day: date) -> list[dict[str, Any]]:
+    stops = []
+    for (_, _, contract_id, contract_code, customer_id, customer_code, customer_name, recipient_name, address,
+         phones, remaining_eggs, last_delivered_at) in rows:
+        stops.append({
+            "contract_id": contract_id,
+            "contract_code": contract_code,
+            "customer_id": customer_id,
+            "customer_code": customer_code,
+            "customer_name": customer_name,
+            "recipient_name": recipient_name,
+            "address": address,
+            "phones": phones or [],
+            "remaining_eggs": remaining_eggs,
+            "last_delivered_at": last_delivered_at,
+            "days_since_last_delivery": None if last_delivered_at is None else (day - last_delivered_at.date()).days,
+        })
+    return stops
+
+
+def build_manifest(db: Session, day: date, cadence: int) -> dict[str, Any]:
+    """The manifest of ``day`` shaped like ``schemas.DispatchManifest``."""
+
+    rows = db.execute(due_contracts_statement(day, cadence)).all()
+    areas = [
+        {
+            "area_code": area_code,
+            "couriers": [
+                {"courier": courier, "stops": _stops(stops, day)}
+                for courier, stops in groupby(area_rows, key=lambda row: row.courier)
+            ],
+        }
+        for area_code, area_rows in groupby(rows, key=lambda row: row.area_code)
+    ]
+    return {"date": day, "cadence_days": cadence, "contract_count": len(rows), "areas": areas}
+
+
+class ManifestCache:
+    """:class:`LRUCache` of manifests that drops results computed across an invalidation."""
+
+    def __init__(self, store: LRUCache) -> None:
+        self.store = store
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        value = self.store.get(key)
+        if value is not MISSING:
+            return value
+        generation = self.generation
+        value = build()
+        with self._lock:
+            # A delivery committed while building may be missing from ``value``: serve it, don't keep it.
+            if generation == self.generation:
+                self.store.set(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self.store.clear()
+
+
+_dispatch_cache: ManifestCache | None = None
+_dispatch_cache_lock = threading.Lock()
+
+
+def dispatch_cache() -> ManifestCache:
+    global _dispatch_cache
+    if _dispatch_cache is None:
+        with _dispatch_cache_lock:
+            if _dispatch_cache is None:
+                _dispatch_cache = ManifestCache(LRUCache(DISPATCH_CACHE_SIZE, get_settings().dispatch_cache_ttl))
+    return _dispatch_cache
+
+
+def invalidate_dispatch() -> None:
+    """Forget every cached manifest; call after committing a write that can change one."""
+
+    dispatch_cache().invalidate()
+
+
+def dispatch_manifest(db: Session, day: date, cadence: int | None = None) -> bytes:
+    """The manifest of ``day`` as JSON, from the cache when one is current.
+
+    The rendered JSON is cached so that a hit skips serialising as well. The rows come
+    straight from the database, so they are dumped without validating them against the
+    response model: on a busy day validation cost more than the query.
+    """
+
+    cadence = cadence or get_settings().dispatch_cadence_days
+    return dispatch_cache().get_or_build((day, cadence), lambda: to_json(build_manifest(db, day, cadence)))
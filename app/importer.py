@@ -0,0 +1,500 @@
+"""Bulk import of historical customer, contract and delivery records from CSV or XLSX files.
+
+::
+
+    python -m app.importer customers customers.xlsx
+    python -m app.importer contracts contracts.csv
+    python -m app.importer deliveries deliveries.csv --rejects deliveries.rejects.csv
+
+Columns are named after the fields of the matching ``schemas.*Create`` model, except that
+parents are referenced by code: contracts carry ``customer_code`` and deliveries carry
+``contract_code``. ``phones`` may hold several numbers separated by ``;`` or ``、``.
+Customers without a ``customer_code`` are given the next free codes of their ``area_code``.
+
+Rows are streamed from the file (``csv`` module, or openpyxl in read-only mode), validated
+with the schema and written with Core ``insert()`` executemany, one transaction per chunk.
+Parent codes, duplicate codes and (for customers) already bound phone numbers are
+resolved with one query per chunk. Rows that fail are left out and reported to the
+reject file with their line number and error, while the rest of their chunk is still
+imported. Deliveries draw down ``remaining_eggs`` and update
+the contract delivery stats, as ``POST /deliveries/bulk`` does.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import re
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+from sqlalchemy import DateTime, Integer, bindparam, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .customer_codes import AreaCodesExhausted, InvalidAreaCode, allocate_codes, observe_codes
+from .customer_phones import normalize_phones, taken_phones
+from .database import session_scope
+from .delivery_stats import STATS, apply_delta, stats_delta
+from .dispatch import invalidate_dispatch
+from .models import Batch, Contract, Customer, CustomerPhone, Delivery
+
+IMPORT_CHUNK_SIZE = 5000
+FORMATS = ("csv", "xlsx")
+PHONE_SEPARATORS = re.compile(r"[;；,，、/]+")
+BOOLEAN_WORDS = {"是": True, "否": False, "有": True, "无": False}
+# Balance updates are retried when a concurrent delivery drains a contract mid-chunk.
+MAX_CHUNK_ATTEMPTS = 3
+
+Row = tuple[int, dict[str, Any]]
+RejectSink = Callable[[int, dict[str, Any], str], None]
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be imported at all (unknown format, missing columns, no openpyxl)."""
+
+
+def _lenient(schema: type[BaseModel]) -> type[BaseModel]:
+    # Spreadsheet cells holding codes or phone numbers arrive as numbers.
+    config = ConfigDict(**schema.model_config, coerce_numbers_to_str=True)
+    return type(f"Import{schema.__name__}", (schema,), {"model_config": config})
+
+
+@dataclass(frozen=True)
+class ImportKind:
+    """How the rows of one file type map onto a table."""
+
+    schema: type[BaseModel]
+    model: type
+    code: str | None = None  # unique column rejected when it already exists
+    parent: type | None = None
+    parent_code: str | None = None  # file column naming the parent
+    parent_field: str | None = None  # schema field receiving the parent's id
+
+    @property
+    def columns(self) -> set[str]:
+        fields = set(self.schema.model_fields)
+        if self.parent_field:
+            fields = (fields - {self.parent_field}) | {self.parent_code}
+        return fields
+
+    @property
+    def required(self) -> set[str]:
+        required = {name for name, field in self.schema.model_fields.items() if field.is_required()}
+        if self.parent_field:
+            required = (required - {self.parent_field}) | {self.parent_code}
+        return required
+
+
+KINDS = {
+    "customers": ImportKind(_lenient(schemas.CustomerCreate), Customer, code="customer_code"),
+    "contracts": ImportKind(
+        _lenient(schemas.ContractCreate),
+        Contract,
+        code="contract_code",
+        parent=Customer,
+        parent_code="customer_code",
+        parent_field="customer_id",
+    ),
+    "deliveries": ImportKind(
+        _lenient(schemas.DeliveryCreate),
+        Delivery,
+        parent=Contract,
+        parent_code="contract_code",
+        parent_field="contract_id",
+    ),
+}
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejected: int = 0
+
+
+# ---------------------------------------------------------------------------
+# Reading
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _header(cells: Iterable[Any]) -> list[str]:
+    return [str(cell).strip() if cell is not None else "" for cell in cells]
+
+
+def _csv_rows(stream: IO[bytes], encoding: str) -> Iterator[tuple[list[str], Iterator[Row]]]:
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    reader = csv.reader(text)
+    columns = _header(next(reader, []))
+
+    def rows() -> Iterator[Row]:
+        for values in reader:
+            if any(values):
+                yield reader.line_num, dict(zip(columns, values))
+
+    yield columns, rows()
+
+
+def _xlsx_rows(stream: IO[bytes], sheet: str | None) -> Iterator[tuple[list[str], Iterator[Row]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ImportFormatError("XLSX import requires openpyxl (pip install openpyxl)") from exc
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        cells = worksheet.iter_rows(values_only=True)
+        columns = _header(next(cells, ()))
+
+        def rows() -> Iterator[Row]:
+            for line, values in enumerate(cells, start=2):
+                if any(value is not None and value != "" for value in values):
+                    yield line, dict(zip(columns, values))
+
+        yield columns, rows()
+    finally:
+        workbook.close()
+
+
+def read_rows(
+    stream: IO[bytes], format: str, encoding: str = "utf-8-sig", sheet: str | None = None
+) -> Iterator[tuple[list[str], Iterator[Row]]]:
+    """Yield once ``(columns, rows)`` for the file; ``rows`` yields ``(line number, raw cells)``.
+
+    Written as a generator so the workbook stays open while the caller consumes the rows.
+    """
+
+    if format == "csv":
+        yield from _csv_rows(stream, encoding)
+    elif format == "xlsx":
+        yield from _xlsx_rows(stream, sheet)
+    else:
+        raise ImportFormatError(f"Unsupported format {format!r}; expected one of {', '.join(FORMATS)}")
+
+
+# ---------------------------------------------------------------------------
+# Importing
+
+
+class _Importer:
+    def __init__(self, db: Session, kind: ImportKind, on_reject: RejectSink) -> None:
+        self.db = db
+        self.kind = kind
+        self.on_reject = on_reject
+        self.result = ImportResult()
+        self.seen_codes: set[Any] = set()
+        self.seen_phones: set[str] = set()
+        self.parents: dict[str, Any] = {}
+        self.columns = kind.columns
+        self.booleans = {
+            name for name, field in kind.schema.model_fields.items() if field.annotation in (bool, bool | None)
+        }
+
+    def reject(self, line: int, raw: dict[str, Any], error: str) -> None:
+        self.result.rejected += 1
+        self.on_reject(line, raw, error)
+
+    def _prepare(self, raw: dict[str, Any]) -> dict[str, Any]:
+        data = {}
+        for column, value in raw.items():
+            if column not in self.columns:
+                continue
+            value = _clean(value)
+            if value is None:
+                continue
+            if column == "phones" and not isinstance(value, list):
+                value = [phone for phone in PHONE_SEPARATORS.split(str(value)) if phone]
+            elif column in self.booleans and isinstance(value, str):
+                value = BOOLEAN_WORDS.get(value, value)
+            elif column == self.kind.parent_code:
+                value = str(value)
+            data[column] = value
+        return data
+
+    def _parents(self, codes: set[str]) -> dict[str, Any]:
+        if not codes:
+            return {}
+        parent = self.kind.parent
+        code_column = getattr(parent, self.kind.parent_code)
+        columns = [code_column, parent.id]
+        if parent is Contract:
+            columns.append(Contract.remaining_eggs)
+        rows = self.db.execute(select(*columns).where(code_column.in_(codes))).all()
+        return {row[0]: row[1:] for row in rows}
+
+    def _existing_codes(self, codes: set[str]) -> set[str]:
+        if not codes:
+            return set()
+        column = getattr(self.kind.model, self.kind.code)
+        return set(self.db.scalars(select(column).where(column.in_(codes))))
+
+    def _validate(self, chunk: list[Row]) -> list[tuple[int, dict[str, Any], BaseModel]]:
+        prepared = [(line, raw, self._prepare(raw)) for line, raw in chunk]
+        parents = self._parents(
+            {data[self.kind.parent_code] for _, _, data in prepared if self.kind.parent_code in data}
+        )
+        existing = self._existing_codes(
+            {str(data[self.kind.code]) for _, _, data in prepared if self.kind.code and self.kind.code in data}
+        )
+        self.parents = parents
+        taken: set[str] = set()
+        if self.kind.model is Customer:
+            numbers = (phone for _, _, data in prepared for phone in data.get("phones", []))
+            taken = set(taken_phones(self.db, normalize_phones(numbers)))
+        valid = []
+        for line, raw, data in prepared:
+            if self.kind.parent:
+                code = data.pop(self.kind.parent_code, None)
+                if code not in parents:
+                    self.reject(line, raw, f"{self.kind.parent.__name__} {code} not found")
+                    continue
+                data[self.kind.parent_field] = parents[code][0]
+            try:
+                row = self.kind.schema.model_validate(data)
+            except ValidationError as exc:
+                errors = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+                self.reject(line, raw, errors)
+                continue
+            code = getattr(row, self.kind.code) if self.kind.code else None
+            if code is not None:
+                if code in existing or code in self.seen_codes:
+                    self.reject(line, raw, f"{self.kind.code} {code} already exists")
+                    continue
+            if self.kind.model is Customer:
+                phones = normalize_phones(row.phones)
+                bound = [phone for phone in phones if phone in taken or phone in self.seen_phones]
+                if bound:
+                    self.reject(line, raw, f"Phone already bound to another customer: {', '.join(bound)}")
+                    continue
+                self.seen_phones.update(phones)
+            if code is not None:
+                self.seen_codes.add(code)
+            valid.append((line, raw, row))
+        return valid
+
+    def _assign_customer_codes(self, valid: list[tuple[int, dict[str, Any], BaseModel]]) -> list:
+        """Give rows without ``customer_code`` one from a block reserved per area; reject the rest."""
+
+        observe_codes(self.db, [row.customer_code for _, _, row in valid if row.customer_code is not None])
+        uncoded: dict[str | None, list[BaseModel]] = defaultdict(list)
+        for _, _, row in valid:
+            if row.customer_code is None:
+                uncoded[row.area_code].append(row)
+        failed: dict[str | None, str] = {}
+        for area_code, rows in uncoded.items():
+            try:
+                codes = allocate_codes(self.db, area_code, len(rows))
+            except (InvalidAreaCode, AreaCodesExhausted) as exc:
+                failed[area_code] = str(exc)
+                continue
+            for row, code in zip(rows, codes):
+                row.customer_code = code
+        kept = []
+        for line, raw, row in valid:
+            if row.customer_code is None:
+                self.reject(line, raw, failed[row.area_code])
+            else:
+                kept.append((line, raw, row))
+        return kept
+
+    def import_chunk(self, chunk: list[Row]) -> None:
+        valid = self._validate(chunk)
+        if self.kind.model is Customer:
+            valid = self._assign_customer_codes(valid)
+        if not valid:
+            return
+        if self.kind.model is Delivery:
+            self._insert_deliveries(valid)
+        else:
+            records = [row.model_dump() for _, _, row in valid]
+            if self.kind.model is Contract:
+                for record in records:
+                    if record.get("remaining_eggs") is None:
+                        record["remaining_eggs"] = record["total_eggs"]
+            self.db.execute(insert(self.kind.model.__table__), records)
+            if self.kind.model is Contract:
+                self._insert_contract_stats([record["contract_code"] for record in records])
+            elif self.kind.model is Customer:
+                self._insert_customer_phones(records)
+            self.db.commit()
+            invalidate_dispatch()
+            self.result.imported += len(records)
+
+    def _insert_contract_stats(self, codes: list[str]) -> None:
+        zero = literal(0, Integer)
+        now = literal(datetime.now(timezone.utc), DateTime(timezone=True))
+        new_contracts = select(Contract.id, zero, zero, zero, now).where(Contract.contract_code.in_(codes))
+        columns = ["contract_id", "eggs_delivered_total", "delivery_count", "hen_delivery_count", "updated_at"]
+        self.db.execute(insert(STATS).from_select(columns, new_contracts))
+
+    def _insert_customer_phones(self, records: list[dict[str, Any]]) -> None:
+        codes = [record["customer_code"] for record in records]
+        ids = dict(
+            self.db.execute(select(Customer.customer_code, Customer.id).where(Customer.customer_code.in_(codes))).all()
+        )
+        phones = [
+            {"phone": phone, "customer_id": ids[record["customer_code"]]}
+            for record in records
+            for phone in normalize_phones(record["phones"])
+        ]
+        if phones:
+            self.db.execute(insert(CustomerPhone.__table__), phones)
+
+    def _insert_deliveries(self, valid: list[tuple[int, dict[str, Any], BaseModel]]) -> None:
+        for _ in range(MAX_CHUNK_ATTEMPTS):
+            if self._try_deliveries(valid):
+                return
+            # A concurrent delivery drained a contract: reload the balances and redo the chunk.
+            self.db.rollback()
+            self.parents = self._parents(set(self.parents))
+        raise RuntimeError("Contract balances kept changing during the import; retry later")
+
+    def _try_deliveries(self, valid: list[tuple[int, dict[str, Any], BaseModel]]) -> bool:
+        remaining = {contract_id: eggs for contract_id, eggs in self.parents.values()}
+        batch_ids = {row.batch_id for _, _, row in valid if row.batch_id is not None}
+        batch_owner = (
+            dict(self.db.execute(select(Batch.id, Batch.contract_id).where(Batch.id.in_(batch_ids))).all())
+            if batch_ids
+            else {}
+        )
+        now = datetime.now(timezone.utc)
+        records = []
+        rejects = []
+        deductions: dict[int, int] = defaultdict(int)
+        added: dict[int, dict[str, int]] = {}
+        hen_contracts: set[int] = set()
+        for line, raw, row in valid:
+            if row.batch_id is not None and batch_owner.get(row.batch_id) != row.contract_id:
+                error = "Batch not found" if row.batch_id not in batch_owner else "Batch not linked to contract"
+                rejects.append((line, raw, error))
+                continue
+            if remaining[row.contract_id] < row.eggs_delivered:
+                rejects.append((line, raw, "Insufficient remaining eggs"))
+                continue
+            remaining[row.contract_id] -= row.eggs_delivered
+            deductions[row.contract_id] += row.eggs_delivered
+            totals = added.setdefault(
+                row.contract_id, {"contract_id_": row.contract_id, "eggs": 0, "count": 0, "hen": 0}
+            )
+            totals["eggs"] += row.eggs_delivered
+            totals["count"] += 1
+            totals["hen"] += int(row.hen_delivered)
+            if row.hen_delivered:
+                hen_contracts.add(row.contract_id)
+            records.append({**row.model_dump(), "delivered_at": row.delivered_at or now})
+
+        if deductions:
+            contracts = Contract.__table__
+            result = self.db.execute(
+                update(contracts)
+                .where(contracts.c.id == bindparam("contract_id_"), contracts.c.remaining_eggs >= bindparam("eggs"))
+                .values(
+                    remaining_eggs=contracts.c.remaining_eggs - bindparam("eggs"),
+                    hen_delivered=or_(contracts.c.hen_delivered, bindparam("hen")),
+                ),
+                [
+                    {"contract_id_": contract_id, "eggs": eggs, "hen": contract_id in hen_contracts}
+                    for contract_id, eggs in deductions.items()
+                ],
+            )
+            if result.rowcount != len(deductions):
+                return False
+            self.db.execute(insert(Delivery.__table__), records)
+            stats = self.db.execute(
+                stats_delta(
+                    bindparam("contract_id_"), eggs=bindparam("eggs"), count=bindparam("count"), hen=bindparam("hen")
+                ),
+                list(added.values()),
+            )
+            if stats.rowcount != len(added):
+                for contract_id in added:
+                    apply_delta(self.db, contract_id, stats_delta(contract_id))
+            self.db.commit()
+            invalidate_dispatch()
+        for line, raw, error in rejects:
+            self.reject(line, raw, error)
+        self.result.imported += len(records)
+        return True
+
+
+def import_rows(
+    db: Session,
+    kind: str,
+    columns: list[str],
+    rows: Iterable[Row],
+    on_reject: RejectSink,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    """Import ``rows`` of ``kind`` in transactions of ``chunk_size`` rows, reporting failures to ``on_reject``."""
+
+    spec = KINDS[kind]
+    missing = spec.required - set(columns)
+    if missing:
+        raise ImportFormatError(f"Missing columns: {', '.join(sorted(missing))}")
+    importer = _Importer(db, spec, on_reject)
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        importer.import_chunk(chunk)
+    return importer.result
+
+
+class RejectWriter:
+    """Reject sink writing ``line, error`` followed by the original columns as CSV."""
+
+    def __init__(self, stream: IO[str], columns: list[str]) -> None:
+        self.writer = csv.writer(stream)
+        self.writer.writerow(["line", "error", *columns])
+        self.columns = columns
+
+    def __call__(self, line: int, raw: dict[str, Any], error: str) -> None:
+        self.writer.writerow([line, error, *(raw.get(column, "") for column in self.columns)])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--encoding", default="utf-8-sig", help="CSV text encoding (e.g. gbk)")
+    parser.add_argument("--sheet", help="XLSX worksheet name (defaults to the active sheet)")
+    parser.add_argument("--rejects", type=Path, help="reject file (defaults to <path>.rejects.csv)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="rows per transaction")
+    args = parser.parse_args(argv)
+    format = args.format or args.path.suffix.lstrip(".").lower()
+    rejects_path = args.rejects or args.path.with_name(args.path.name + ".rejects.csv")
+
+    started = time.perf_counter()
+    try:
+        with args.path.open("rb") as stream, rejects_path.open("w", newline="", encoding="utf-8-sig") as rejects:
+            for columns, rows in read_rows(stream, format, args.encoding, args.sheet):
+                with session_scope() as session:
+                    result = import_rows(
+                        session, args.kind, columns, rows, RejectWriter(rejects, columns), args.chunk_size
+                    )
+    except ImportFormatError as exc:
+        rejects_path.unlink(missing_ok=True)
+        parser.exit(2, f"error: {exc}\n")
+    elapsed = time.perf_counter() - started
+    print(f"Imported {result.imported} {args.kind} in {elapsed:.1f}s, rejected {result.rejected}")
+    if result.rejected:
+        print(f"Rejected rows written to {rejects_path}")
+    else:
+        rejects_path.unlink()
+
+
+if __name__ == "__main__":
+    main()
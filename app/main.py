@@ -1,18 +1,31 @@
 """FastAPI application entry point."""
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from . import get_settings
+from .cache import reset_reference_cache
+from .database import dispose_engines, init_async_engine, init_engine
+from .metrics import MetricsMiddleware
+from .profiling import SERVER_TIMING_HEADER, QueryTimingMiddleware
+from .api.pagination import NEXT_CURSOR_HEADER
 from .api.routes import (
     batches,
     contracts,
     customers,
+    dashboard,
     deliveries,
+    dispatch,
     feedings,
     health,
+    imports,
     medications,
+    metrics,
     rearing_plans,
     settlements,
     weighings,
@@ -20,7 +33,20 @@ from .api.routes import (
 
 settings = get_settings()
 
-app = FastAPI(title="客户定养管理系统 API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # URL resolution probes the candidate databases; keep it off the event loop.
+    await run_in_threadpool(init_engine)
+    # Cached reference rows belong to whichever database was resolved last.
+    reset_reference_cache()
+    if settings.async_routes:
+        init_async_engine()
+    yield
+    await dispose_engines()
+
+
+app = FastAPI(title="客户定养管理系统 API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,9 +54,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, SERVER_TIMING_HEADER],
 )
+app.add_middleware(QueryTimingMiddleware)
+# Added last so it wraps everything else, CORS preflights included.
+app.add_middleware(MetricsMiddleware)
+
+if settings.async_routes:
+    # The async handlers share paths with the sync ones; mounting them first lets them win the route match.
+    for module in (customers, contracts, batches, rearing_plans, feedings, medications, weighings, deliveries, settlements):
+        app.include_router(module.async_router)
 
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(customers.router)
 app.include_router(contracts.router)
 app.include_router(batches.router)
@@ -40,6 +76,9 @@ app.include_router(medications.router)
 app.include_router(weighings.router)
 app.include_router(deliveries.router)
 app.include_router(settlements.router)
+app.include_router(dispatch.router)
+app.include_router(dashboard.router)
+app.include_router(imports.router)
 
 
 @app.get("/")
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from datetime import date, datetime, timezone
 
-from sqlalchemy import Boolean, Date, DateTime, DECIMAL, ForeignKey, Integer, JSON, String, Text
+from sqlalchemy import Boolean, Date, DateTime, DECIMAL, ForeignKey, Index, Integer, JSON, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -37,10 +37,36 @@ class Customer(TimestampMixin, Base):
     notes: Mapped[str | None] = mapped_column(Text)
 
     contracts: Mapped[list["Contract"]] = relationship(back_populates="customer", cascade="all, delete-orphan")
+    phone_numbers: Mapped[list["CustomerPhone"]] = relationship(cascade="all, delete-orphan")
+
+
+class CustomerPhone(Base):
+    """A customer's phone number, normalised; the primary key makes each number bind one customer."""
+
+    __tablename__ = "customer_phones"
+    __table_args__ = (
+        Index("ix_customer_phones_customer_id", "customer_id"),
+    )
+
+    phone: Mapped[str] = mapped_column(String(32), primary_key=True)
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"), nullable=False)
+
+
+class CustomerCodeCounter(Base):
+    """Next free 2xxxx sequence of one area, claimed with a guarded UPDATE (see ``customer_codes``)."""
+
+    __tablename__ = "customer_code_counters"
+
+    area: Mapped[str] = mapped_column(String(1), primary_key=True)
+    next_sequence: Mapped[int] = mapped_column(Integer, nullable=False)
 
 
 class Contract(TimestampMixin, Base):
     __tablename__ = "contracts"
+    __table_args__ = (
+        Index("ix_contracts_customer_id", "customer_id"),
+        Index("ix_contracts_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     contract_code: Mapped[str] = mapped_column(String(36), unique=True, nullable=False)
@@ -60,10 +86,39 @@ class Contract(TimestampMixin, Base):
     batches: Mapped[list["Batch"]] = relationship(back_populates="contract", cascade="all, delete-orphan")
     deliveries: Mapped[list["Delivery"]] = relationship(back_populates="contract", cascade="all, delete-orphan")
     settlements: Mapped[list["Settlement"]] = relationship(back_populates="contract", cascade="all, delete-orphan")
+    delivery_stats: Mapped["ContractDeliveryStats | None"] = relationship(
+        back_populates="contract", cascade="all, delete-orphan"
+    )
+
+
+class ContractDeliveryStats(Base):
+    """Delivery aggregates per contract, updated in the same transaction as the deliveries."""
+
+    __tablename__ = "contract_delivery_stats"
+    __table_args__ = (
+        Index("ix_contract_delivery_stats_updated_at", "updated_at"),
+    )
+
+    contract_id: Mapped[int] = mapped_column(ForeignKey("contracts.id"), primary_key=True)
+    eggs_delivered_total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    delivery_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    hen_delivery_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_delivered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    contract: Mapped[Contract] = relationship(back_populates="delivery_stats")
 
 
 class Batch(TimestampMixin, Base):
     __tablename__ = "batches"
+    __table_args__ = (
+        Index("ix_batches_contract_id", "contract_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     contract_id: Mapped[int] = mapped_column(ForeignKey("contracts.id"), nullable=False)
@@ -81,10 +136,16 @@ class Batch(TimestampMixin, Base):
     medications: Mapped[list["Medication"]] = relationship(back_populates="batch", cascade="all, delete-orphan")
     weighings: Mapped[list["Weighing"]] = relationship(back_populates="batch", cascade="all, delete-orphan")
     deliveries: Mapped[list["Delivery"]] = relationship(back_populates="batch")
+    daily_feedings: Mapped[list["BatchDailyFeeding"]] = relationship(cascade="all, delete-orphan")
+    daily_weighings: Mapped[list["BatchDailyWeighing"]] = relationship(cascade="all, delete-orphan")
 
 
 class RearingPlan(TimestampMixin, Base):
     __tablename__ = "rearing_plans"
+    __table_args__ = (
+        Index("ix_rearing_plans_batch_id_scheduled_date", "batch_id", "scheduled_date"),
+        Index("ix_rearing_plans_scheduled_date", "scheduled_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), nullable=False)
@@ -98,6 +159,10 @@ class RearingPlan(TimestampMixin, Base):
 
 class Feeding(TimestampMixin, Base):
     __tablename__ = "feedings"
+    __table_args__ = (
+        Index("ix_feedings_batch_id_fed_at", "batch_id", "fed_at"),
+        Index("ix_feedings_fed_at", "fed_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), nullable=False)
@@ -111,8 +176,37 @@ class Feeding(TimestampMixin, Base):
     batch: Mapped[Batch] = relationship(back_populates="feedings")
 
 
+class BatchDailyFeeding(Base):
+    """Feed given to a batch per day and feed type, kept in step with ``feedings`` (see ``batch_stats``)."""
+
+    __tablename__ = "batch_daily_feedings"
+
+    batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    feed_type: Mapped[str] = mapped_column(String(100), primary_key=True)
+    quantity_kg: Mapped[float] = mapped_column(DECIMAL(12, 2), nullable=False)
+    feeding_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class BatchDailyWeighing(Base):
+    """Weigh-ins of a batch per day, kept in step with ``weighings`` (see ``batch_stats``)."""
+
+    __tablename__ = "batch_daily_weighings"
+
+    batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    weighing_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight_total_kg: Mapped[float] = mapped_column(DECIMAL(14, 2), nullable=False)
+    weight_min_kg: Mapped[float] = mapped_column(DECIMAL(8, 2), nullable=False)
+    weight_max_kg: Mapped[float] = mapped_column(DECIMAL(8, 2), nullable=False)
+
+
 class Medication(TimestampMixin, Base):
     __tablename__ = "medications"
+    __table_args__ = (
+        Index("ix_medications_batch_id_administered_at", "batch_id", "administered_at"),
+        Index("ix_medications_administered_at", "administered_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), nullable=False)
@@ -128,6 +222,10 @@ class Medication(TimestampMixin, Base):
 
 class Weighing(TimestampMixin, Base):
     __tablename__ = "weighings"
+    __table_args__ = (
+        Index("ix_weighings_batch_id_recorded_at", "batch_id", "recorded_at"),
+        Index("ix_weighings_recorded_at", "recorded_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     batch_id: Mapped[int] = mapped_column(ForeignKey("batches.id"), nullable=False)
@@ -142,6 +240,12 @@ class Weighing(TimestampMixin, Base):
 
 class Delivery(TimestampMixin, Base):
     __tablename__ = "deliveries"
+    __table_args__ = (
+        Index("ix_deliveries_contract_id_delivered_at", "contract_id", "delivered_at"),
+        Index("ix_deliveries_batch_id", "batch_id"),
+        Index("ix_deliveries_delivered_at", "delivered_at"),
+        Index("ix_deliveries_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     contract_id: Mapped[int] = mapped_column(ForeignKey("contracts.id"), nullable=False)
@@ -163,6 +267,10 @@ class Delivery(TimestampMixin, Base):
 
 class Settlement(TimestampMixin, Base):
     __tablename__ = "settlements"
+    __table_args__ = (
+        Index("ix_settlements_contract_id_settlement_date", "contract_id", "settlement_date"),
+        Index("ix_settlements_settlement_date", "settlement_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     contract_id: Mapped[int] = mapped_column(ForeignKey("contracts.id"), nullable=False)
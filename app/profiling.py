@@ -0,0 +1,148 @@
+"""Per-request SQL statement counts and database time.
+
+Cursor events on the engines add each statement's duration to the request being served
+(tracked in a context variable, which FastAPI copies into its worker threads). The
+middleware reports the totals in a ``Server-Timing`` header::
+
+    Server-Timing: db;dur=3.10;desc="4 queries", app;dur=1.52, total;dur=4.62
+
+``db`` is time spent in cursor executes, ``app`` the rest of the request up to the response
+headers (handler code, serialisation). Streamed bodies keep querying after the headers are
+sent; those statements still count towards :func:`query_budget` but not the header.
+Statements slower than ``SLOW_QUERY_THRESHOLD`` seconds are logged with their route.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .core.config import get_settings
+
+LOGGER = logging.getLogger(__name__)
+SERVER_TIMING_HEADER = "Server-Timing"
+SLOW_QUERY_LOG_LENGTH = 500
+
+settings = get_settings()
+
+
+@dataclass
+class RequestQueries:
+    """Statements executed while serving one request."""
+
+    scope: Scope = field(repr=False)
+    count: int = 0
+    db_time: float = 0.0
+    statements: list[str] | None = None
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return route.path if route is not None else self.scope.get("path", "-")
+
+    def __str__(self) -> str:
+        return f"{self.scope.get('method', '-')} {self.route}: {self.count} statements, {self.db_time * 1000:.2f}ms"
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+_observers: list[Callable[[RequestQueries], None]] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    queries = _current.get()
+    if queries is not None:
+        queries.count += 1
+        queries.db_time += elapsed
+        if queries.statements is not None:
+            queries.statements.append(statement)
+    if elapsed >= settings.slow_query_threshold:
+        LOGGER.warning(
+            "Slow query (%.3fs) on %s: %s",
+            elapsed,
+            queries.route if queries is not None else "-",
+            statement[:SLOW_QUERY_LOG_LENGTH],
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the statement timers to ``engine`` (for async engines pass ``sync_engine``)."""
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(queries: RequestQueries, total: float) -> str:
+    db_ms, total_ms = queries.db_time * 1000, total * 1000
+    return (
+        f'db;dur={db_ms:.2f};desc="{queries.count} queries", '
+        f"app;dur={max(total_ms - db_ms, 0.0):.2f}, total;dur={total_ms:.2f}"
+    )
+
+
+class QueryTimingMiddleware:
+    """ASGI middleware collecting :class:`RequestQueries` per request and adding ``Server-Timing``."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope, statements=[] if _observers else None)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timing = server_timing(queries, time.perf_counter() - started)
+                MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, timing)
+            await send(message)
+
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            for observer in list(_observers):
+                observer(queries)
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[list[RequestQueries]]:
+    """Record the requests served inside the block; fail if any executed more than ``limit`` statements.
+
+    Usable from tests against the ASGI app (``TestClient``) or a real server in the same process::
+
+        with query_budget(2) as requests:
+            client.get("/contracts/")
+        assert requests[0].count == 2
+    """
+
+    recorded: list[RequestQueries] = []
+    _observers.append(recorded.append)
+    try:
+        yield recorded
+    finally:
+        _observers.remove(recorded.append)
+    over = [queries for queries in recorded if queries.count > limit]
+    if over:
+        details = "\n".join(f"{queries}\n    " + "\n    ".join(queries.statements or []) for queries in over)
+        raise AssertionError(f"Query budget of {limit} exceeded:\n{details}")
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -27,7 +27,8 @@ class CustomerBase(ORMModel):
 
 
 class CustomerCreate(CustomerBase):
-    pass
+    # Left out, the next free code of ``area_code`` is allocated.
+    customer_code: Optional[str] = Field(default=None, min_length=1, max_length=32)
 
 
 class CustomerUpdate(ORMModel):
@@ -82,11 +83,19 @@ class ContractUpdate(ORMModel):
     description: Optional[str] = None
 
 
+class ContractDeliveryStatsRead(ORMModel):
+    eggs_delivered_total: int
+    delivery_count: int
+    hen_delivery_count: int
+    last_delivered_at: Optional[datetime] = None
+
+
 class ContractRead(ContractBase):
     id: int
     created_at: datetime
     updated_at: datetime
     customer: Optional[CustomerRead] = None
+    delivery_stats: Optional[ContractDeliveryStatsRead] = None
 
 
 # ---------------------------------------------------------------------------
@@ -120,6 +129,33 @@ class BatchRead(BatchBase):
     updated_at: datetime
 
 
+class BatchDailyFeed(ORMModel):
+    feed_type: str
+    quantity_kg: float
+    feeding_count: int
+
+
+class BatchDailyStats(ORMModel):
+    day: date
+    feed_kg: float
+    feeds: List[BatchDailyFeed] = Field(default_factory=list)
+    weighing_count: int = 0
+    weight_mean_kg: Optional[float] = None
+    weight_min_kg: Optional[float] = None
+    weight_max_kg: Optional[float] = None
+
+
+class WeightCurvePoint(ORMModel):
+    recorded_at: datetime
+    weight_kg: float
+
+
+class WeightCurve(ORMModel):
+    batch_id: int
+    weighing_count: int
+    points: List[WeightCurvePoint] = Field(default_factory=list)
+
+
 # ---------------------------------------------------------------------------
 # Rearing plan
 
@@ -272,6 +308,26 @@ class DeliveryRead(DeliveryBase):
     updated_at: datetime
 
 
+class DeliveryBulkCreate(ORMModel):
+    deliveries: List[DeliveryCreate] = Field(..., min_length=1, max_length=500)
+
+
+class DeliveryBulkError(ORMModel):
+    index: int
+    detail: str
+
+
+class ContractEggBalance(ORMModel):
+    contract_id: int
+    remaining_eggs: int
+    hen_delivered: bool
+
+
+class DeliveryBulkResult(ORMModel):
+    created: int
+    contracts: List[ContractEggBalance]
+
+
 # ---------------------------------------------------------------------------
 # Settlement
 
@@ -314,6 +370,17 @@ class SettlementTrialRequest(ORMModel):
     notes: Optional[str] = None
 
 
+class SettlementTrialBulkRequest(ORMModel):
+    """Contract filter for a fleet-wide trial; every matching contract gets a trial line."""
+
+    status: Optional[str] = None
+    customer_id: Optional[int] = None
+    start_date_from: Optional[date] = None
+    start_date_to: Optional[date] = None
+    price_override: Optional[float] = None
+    notes: Optional[str] = None
+
+
 class SettlementTrialResponse(ORMModel):
     contract_id: int
     eggs_delivered_total: int
@@ -321,3 +388,74 @@ class SettlementTrialResponse(ORMModel):
     amount_paid: float
     status: str
     notes: Optional[str] = None
+
+
+# ---------------------------------------------------------------------------
+# Dispatch
+
+
+class DispatchStop(ORMModel):
+    contract_id: int
+    contract_code: str
+    customer_id: int
+    customer_code: str
+    customer_name: str
+    recipient_name: str
+    address: str
+    phones: List[str] = Field(default_factory=list)
+    remaining_eggs: int
+    last_delivered_at: Optional[datetime] = None
+    days_since_last_delivery: Optional[int] = None
+
+
+class DispatchCourier(ORMModel):
+    """Stops of one courier; ``courier`` is whoever made the contract's last delivery, if anyone."""
+
+    courier: Optional[str] = None
+    stops: List[DispatchStop]
+
+
+class DispatchArea(ORMModel):
+    area_code: Optional[str] = None
+    couriers: List[DispatchCourier]
+
+
+class DispatchManifest(ORMModel):
+    date: date
+    cadence_days: int
+    contract_count: int
+    areas: List[DispatchArea]
+
+
+# ---------------------------------------------------------------------------
+# Dashboard
+
+
+class DashboardSummary(ORMModel):
+    active_contracts: int
+    remaining_eggs: int
+    hens_outstanding: int
+    pending_settlements: int
+    pending_amount_due: float
+    pending_amount_paid: float
+    pending_amount_outstanding: float
+    batches_by_status: Dict[str, int] = Field(default_factory=dict)
+    generated_at: datetime
+
+
+# ---------------------------------------------------------------------------
+# Import
+
+
+class ImportReject(ORMModel):
+    line: int
+    error: str
+
+
+class ImportResultRead(ORMModel):
+    """Outcome of a bulk import; ``rejects`` lists the first failed rows only, ``rejected`` counts all."""
+
+    kind: str
+    imported: int
+    rejected: int
+    rejects: List[ImportReject] = Field(default_factory=list)
@@ -1,12 +1,48 @@
-"""Database seed script."""
+"""Database seed script.
+
+``python -m app.seed`` inserts one example of every record. ``--scale`` instead generates a
+deterministic synthetic dataset for load testing (100k customers by default, with their
+contracts, batches and a few million feedings, weighings and deliveries)::
+
+    python -m app.seed --scale              # 100k customers
+    python -m app.seed --scale 20000 --seed 7
+
+Rows are written with chunked Core ``insert()`` executemany, one transaction per chunk of
+customers. Every value (primary keys included) is a function of ``--seed`` and the customer
+index, so an interrupted run picks up after the last committed chunk when restarted with
+the same arguments.
+"""
 from __future__ import annotations
 
-from datetime import date, datetime, timezone
+import argparse
+import json
+import random
+import time
+from collections.abc import Iterator, Sequence
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
 
+from sqlalchemy import Date, DateTime, func, select
 from sqlalchemy.orm import Session
 
-from .database import SessionLocal
-from .models import Batch, Contract, Customer, Delivery, Feeding, Medication, RearingPlan, Settlement, Weighing
+from .batch_stats import rebuild as rebuild_batch_stats
+from .customer_codes import MAX_SEQUENCE, observe_code, observe_codes
+from .customer_phones import sync_phones
+from .database import session_scope
+from .delivery_stats import rebuild as rebuild_delivery_stats
+from .models import (
+    Batch,
+    Contract,
+    ContractDeliveryStats,
+    Customer,
+    CustomerPhone,
+    Delivery,
+    Feeding,
+    Medication,
+    RearingPlan,
+    Settlement,
+    Weighing,
+)
 
 
 def seed(db: Session) -> None:
@@ -22,6 +58,8 @@ def seed(db: Session) -> None:
         area_code="21",
         first_purchase_date=date(2024, 1, 1),
     )
+    sync_phones(customer)
+    observe_code(db, customer.customer_code)
     db.add(customer)
     db.flush()
 
@@ -101,12 +139,300 @@ def seed(db: Session) -> None:
     )
     db.add(settlement)
 
+    db.flush()
+    rebuild_delivery_stats(db)
+    rebuild_batch_stats(db)
     db.commit()
 
 
-def main() -> None:
-    with SessionLocal() as session:
-        seed(session)
+# ---------------------------------------------------------------------------
+# Synthetic dataset
+
+AREAS = 10
+CONTRACTS_PER_CUSTOMER = 2
+ROWS_PER_BATCH = 12  # id slots per batch for feedings, weighings and deliveries
+SCALE_START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红建国文辉鹏飞雪梅海燕春林"
+DISTRICTS = ("前锋区", "广安区", "岳池县", "武胜县", "邻水县", "华蓥市")
+STREETS = ("幸福街", "建设路", "人民路", "滨江路", "金安大道", "万盛街", "龙塘路", "思源大道")
+PACKAGES = (
+    ("山野草鸡定养", "草鸡母", "山野草鸡蛋", 200, 466.0),
+    ("林下土鸡定养", "土鸡母", "林下土鸡蛋", 300, 658.0),
+    ("全年家庭定养", "草鸡母", "山野草鸡蛋", 360, 799.0),
+)
+FEED_TYPES = ("有机玉米", "稻谷", "麦麸", "青菜叶", "豆粕")
+PACKAGING = ("普通家庭装30枚", "礼盒装20枚", "散装")
+VEGETABLES = (None, "油麦菜", "白菜", "萝卜", "莴笋")
+# Odd and not a multiple of 5, so multiplying by it permutes the nine-digit subscriber numbers.
+PHONE_STRIDE = 387_420_489
+COURIERS = tuple(f"配送员{letter}" for letter in "ABCDEF")
+
+# Column order of the generated row tuples; parents first so foreign keys hold on MySQL.
+SCALE_COLUMNS: dict[Any, tuple[str, ...]] = {
+    Customer.__table__: (
+        "id", "customer_code", "name", "phones", "recipient_name", "address", "area_code",
+        "first_purchase_date", "notes", "created_at", "updated_at",
+    ),
+    CustomerPhone.__table__: ("phone", "customer_id"),
+    Contract.__table__: (
+        "id", "contract_code", "customer_id", "package_name", "hen_type", "egg_type", "total_eggs",
+        "remaining_eggs", "price", "start_date", "status", "hen_delivered", "created_at", "updated_at",
+    ),
+    ContractDeliveryStats.__table__: (
+        "contract_id", "eggs_delivered_total", "delivery_count", "hen_delivery_count", "last_delivered_at",
+        "updated_at",
+    ),
+    Batch.__table__: ("id", "contract_id", "name", "start_date", "end_date", "status", "created_at", "updated_at"),
+    Feeding.__table__: ("id", "batch_id", "feed_type", "quantity_kg", "fed_at", "created_at", "updated_at"),
+    Weighing.__table__: ("id", "batch_id", "weight_kg", "recorded_at", "created_at", "updated_at"),
+    Delivery.__table__: (
+        "id", "contract_id", "batch_id", "delivered_at", "eggs_delivered", "packaging", "vegetables",
+        "delivered_by", "hen_delivered", "created_at", "updated_at",
+    ),
+}
+
+
+def customer_code(index: int) -> str:
+    """``2`` + area digit + per-area sequence, following the 2xxxx scheme.
+
+    The five-digit scheme holds 999 customers per area; beyond that the sequence simply
+    grows a digit, which keeps codes unique because the three-digit range is never reused.
+    """
+
+    area, sequence = index % AREAS, index // AREAS + 1
+    return f"2{area}{sequence:03d}"
+
+
+def _pick(rng: random.Random, options: Sequence[Any]) -> Any:
+    # rng.choice/randint cost several times rng.random(); this generator calls them millions of times.
+    return options[int(rng.random() * len(options))]
+
+
+def _between(rng: random.Random, low: int, high: int) -> int:
+    return low + int(rng.random() * (high - low + 1))
+
+
+class ScaleValues:
+    """Driver-ready dates and timestamps for one dialect, memoised.
+
+    The dataset reuses a few thousand distinct days and hours; converting a datetime for
+    every row would cost more than inserting the row.
+    """
+
+    def __init__(self, dialect: Any) -> None:
+        identity = lambda value: value  # noqa: E731
+        self._timestamp = dialect.type_descriptor(DateTime(timezone=True)).bind_processor(dialect) or identity
+        self._date = dialect.type_descriptor(Date()).bind_processor(dialect) or identity
+        self._moments: dict[int, Any] = {}
+        self._days: dict[int, Any] = {}
+
+    def moment(self, days: int, hours: int) -> Any:
+        hour = days * 24 + hours
+        value = self._moments.get(hour)
+        if value is None:
+            value = self._moments[hour] = self._timestamp(SCALE_START + timedelta(hours=hour))
+        return value
+
+    def day(self, days: int) -> Any:
+        value = self._days.get(days)
+        if value is None:
+            value = self._days[days] = self._date((SCALE_START + timedelta(days=days)).date())
+        return value
+
+
+def _scale_customer(
+    rows: dict[Any, list[tuple]], rng: random.Random, values: ScaleValues, index: int, marker: str
+) -> None:
+    joined = int(rng.random() * 365)
+    name = _pick(rng, SURNAMES) + _pick(rng, GIVEN_NAMES) + (_pick(rng, GIVEN_NAMES) if rng.random() < 0.5 else "")
+    # customer_phones is keyed by number: derive the digits from the customer index so they never collide.
+    phones = [
+        f"1{_pick(rng, '3589')}{(index * 2 + slot) * PHONE_STRIDE % 10**9:09d}"
+        for slot in range(1 if rng.random() < 0.7 else 2)
+    ]
+    recipient = name if rng.random() < 0.7 else _pick(rng, SURNAMES) + _pick(rng, GIVEN_NAMES)
+    address = f"四川省广安市{_pick(rng, DISTRICTS)}{_pick(rng, STREETS)}{_between(rng, 1, 999)}号"
+    created = values.moment(joined, 9)
+    rows[Customer.__table__].append(
+        (
+            index + 1, customer_code(index), name, json.dumps(phones), recipient, address, f"2{index % AREAS}",
+            values.day(joined), marker, created, created,
+        )
+    )
+    rows[CustomerPhone.__table__].extend((phone, index + 1) for phone in phones)
+    for slot in range(CONTRACTS_PER_CUSTOMER):
+        if slot and rng.random() >= 0.2:
+            break
+        contract_id = index * CONTRACTS_PER_CUSTOMER + slot + 1
+        _scale_contract(rows, rng, values, contract_id, index + 1, joined + 400 * slot)
+
+
+def _scale_contract(
+    rows: dict[Any, list[tuple]],
+    rng: random.Random,
+    values: ScaleValues,
+    contract_id: int,
+    customer_id: int,
+    signed: int,
+) -> None:
+    package, hen_type, egg_type, total_eggs, price = _pick(rng, PACKAGES)
+    start = signed + _between(rng, 0, 14)
+    # Batches share the contract's id; their feedings, weighings and deliveries own fixed id slots.
+    batch_id = contract_id
+    first_slot = (batch_id - 1) * ROWS_PER_BATCH + 1
+    batch_created = values.moment(start, 8)
+    rows[Batch.__table__].append(
+        (batch_id, contract_id, f"批次{contract_id}", values.day(start), values.day(start + 300), "active",
+         batch_created, batch_created)
+    )
+
+    feedings = rows[Feeding.__table__]
+    for slot in range(_between(rng, 6, ROWS_PER_BATCH)):
+        fed_at = values.moment(start + 7 * slot, _between(rng, 6, 9))
+        quantity = round(5 + rng.random() * 20, 2)
+        feedings.append((first_slot + slot, batch_id, _pick(rng, FEED_TYPES), quantity, fed_at, fed_at, fed_at))
+
+    weighings = rows[Weighing.__table__]
+    weight = 0.3 + rng.random() * 0.3
+    for slot in range(_between(rng, 6, ROWS_PER_BATCH)):
+        recorded_at = values.moment(start + 14 * slot, _between(rng, 8, 11))
+        weight += 0.05 + rng.random() * 0.2
+        weighings.append((first_slot + slot, batch_id, round(weight, 2), recorded_at, recorded_at, recorded_at))
+
+    deliveries = rows[Delivery.__table__]
+    count = _between(rng, 0, min(ROWS_PER_BATCH, total_eggs // 30))
+    hen_slot = int(rng.random() * count) if count and rng.random() < 0.3 else -1
+    delivered = 0
+    delivered_at = None
+    for slot in range(count):
+        eggs = 20 if rng.random() < 0.5 else 30
+        delivered += eggs
+        delivered_at = values.moment(start + 14 * slot + 7, _between(rng, 8, 17))
+        deliveries.append(
+            (
+                first_slot + slot, contract_id, batch_id, delivered_at, eggs, _pick(rng, PACKAGING),
+                _pick(rng, VEGETABLES), COURIERS[contract_id % len(COURIERS)], int(slot == hen_slot),
+                delivered_at, delivered_at,
+            )
+        )
+
+    signed_at = values.moment(signed, 10)
+    rows[Contract.__table__].append(
+        (
+            contract_id, f"SYN-{contract_id:08d}", customer_id, package, hen_type, egg_type, total_eggs,
+            total_eggs - delivered, price, values.day(start), "active" if delivered < total_eggs else "completed",
+            int(hen_slot >= 0), signed_at, signed_at,
+        )
+    )
+    rows[ContractDeliveryStats.__table__].append(
+        (contract_id, delivered, count, int(hen_slot >= 0), delivered_at, delivered_at or signed_at)
+    )
+
+
+def scale_rows(values: ScaleValues, seed_value: int, start: int, stop: int) -> dict[Any, list[tuple]]:
+    """Row tuples (in :data:`SCALE_COLUMNS` order) for customers ``start`` to ``stop`` and everything they own."""
+
+    rng = random.Random(f"{seed_value}:{start}")
+    rows: dict[Any, list[tuple]] = {table: [] for table in SCALE_COLUMNS}
+    for index in range(start, stop):
+        _scale_customer(rows, rng, values, index, f"synthetic:{seed_value}")
+    return rows
+
+
+def _insert_statement(dialect: Any, table: Any, columns: tuple[str, ...]) -> str:
+    quote = dialect.identifier_preparer.quote
+    placeholder = "?" if dialect.paramstyle == "qmark" else "%s"
+    return (
+        f"INSERT INTO {dialect.identifier_preparer.format_table(table)} "
+        f"({', '.join(quote(column) for column in columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+
+
+def _scale_progress(db: Session, seed_value: int) -> int:
+    """Number of customers a previous run with ``seed_value`` committed (chunks are atomic)."""
+
+    count, last_id = db.execute(select(func.count(Customer.id), func.max(Customer.id))).one()
+    if not count:
+        return 0
+    marker = db.execute(select(Customer.notes).where(Customer.id == last_id)).scalar_one()
+    if marker != f"synthetic:{seed_value}" or count != last_id:
+        raise SystemExit("--scale needs an empty database or one filled by an earlier --scale run with the same --seed")
+    return count
+
+
+def seed_scale(
+    customers: int, seed_value: int = 1, chunk_size: int = 1000, analyze: bool = True
+) -> Iterator[tuple[int, int]]:
+    """Insert the synthetic dataset, yielding ``(customers done, rows inserted)`` after each chunk.
+
+    Values are bound straight to the driver (one executemany per table and chunk): at
+    millions of rows SQLAlchemy's per-row parameter processing costs more than the insert.
+    On SQLite the secondary indexes are dropped for the load and rebuilt (sorted, in one
+    pass) at the end; an interrupted run leaves them missing until it is resumed.
+    """
+
+    with session_scope() as db:
+        done = _scale_progress(db, seed_value)
+        connection = db.connection()
+        dialect = connection.dialect
+        statements = {table: _insert_statement(dialect, table, columns) for table, columns in SCALE_COLUMNS.items()}
+        values = ScaleValues(dialect)
+        # MySQL needs the indexes backing its foreign keys, so only SQLite defers them.
+        deferred = [index for table in SCALE_COLUMNS for index in table.indexes] if dialect.name == "sqlite" else []
+        for index in deferred:
+            index.drop(connection, checkfirst=True)
+        db.commit()
+        connection = db.connection()
+        if dialect.name == "sqlite":
+            # A large page cache for this connection, and index build sorts kept in memory.
+            connection.exec_driver_sql("PRAGMA cache_size=-262144")
+            connection.exec_driver_sql("PRAGMA temp_store=MEMORY")
+        for start in range(done, customers, chunk_size):
+            stop = min(start + chunk_size, customers)
+            rows = scale_rows(values, seed_value, start, stop)
+            for table, statement in statements.items():
+                if rows[table]:
+                    connection.exec_driver_sql(statement, rows[table])
+            db.commit()
+            connection = db.connection()
+            yield stop, sum(len(table_rows) for table_rows in rows.values())
+        # The highest five-digit code of every area; longer codes are outside the allocator's range.
+        top = min(customers, MAX_SEQUENCE * AREAS)
+        observe_codes(db, [customer_code(index) for index in range(max(0, top - AREAS), top)])
+        rebuild_batch_stats(db)
+        connection = db.connection()
+        for index in deferred:
+            index.create(connection, checkfirst=True)
+        if analyze and dialect.name == "sqlite":
+            # Sample rather than scan for the planner statistics.
+            connection.exec_driver_sql("PRAGMA analysis_limit=1000")
+            connection.exec_driver_sql("ANALYZE")
+        db.commit()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--scale", type=int, nargs="?", const=100_000, metavar="CUSTOMERS", help="generate a synthetic dataset"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the synthetic dataset")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="customers per transaction")
+    args = parser.parse_args(argv)
+
+    if args.scale is None:
+        with session_scope() as session:
+            seed(session)
+        return
+
+    started = time.perf_counter()
+    total = 0
+    for done, rows in seed_scale(args.scale, args.seed, args.chunk_size):
+        total += rows
+        elapsed = time.perf_counter() - started
+        print(f"\r{done}/{args.scale} customers, {total} rows, {total / elapsed:,.0f} rows/s", end="", flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"\n{total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s including index builds)")
 
 
 if __name__ == "__main__":
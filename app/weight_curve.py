@@ -0,0 +1,102 @@
+"""Downsampled weight curves of a batch for charting.
+
+A batch's weighings are streamed in ``recorded_at`` order straight into NumPy arrays (no
+ORM objects, timestamps parsed by NumPy from their text form) and reduced with
+Largest-Triangle-Three-Buckets: the first and last weigh-ins are kept and every bucket in
+between contributes the point spanning the largest triangle with the point kept before it
+and the mean of the next bucket, so peaks and dips survive where a plain stride would
+skip them. Each bucket is scored with array arithmetic; only the walk over the buckets is
+a Python loop, as every choice depends on the previous one.
+
+NumPy is imported on first use; without it the endpoint answers 503.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Float, String, cast, select, type_coerce
+from sqlalchemy.orm import Session
+
+from .models import Weighing
+
+CURVE_CHUNK = 50_000
+
+
+class CurveUnavailable(RuntimeError):
+    """The weight curve cannot be computed here (NumPy is not installed)."""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise CurveUnavailable("The weight curve requires numpy (pip install numpy)") from exc
+    return numpy
+
+
+def lttb(x: Any, y: Any, points: int) -> Any:
+    """Indices of the ``points`` samples of the series ``(x, y)`` that LTTB keeps, ascending.
+
+    ``x`` must be sorted. Series of at most ``points`` samples are returned whole.
+    """
+
+    np = _numpy()
+    count = len(x)
+    if points >= count or points < 3:
+        return np.arange(count)
+
+    # points - 2 buckets over the interior samples; the first and last sample stand alone.
+    edges = np.linspace(1, count - 1, points - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[: count - 1], edges[:-1])[1:] / sizes[1:], x[-1])
+    next_y = np.append(np.add.reduceat(y[: count - 1], edges[:-1])[1:] / sizes[1:], y[-1])
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, count - 1
+    anchor = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[anchor], y[anchor]
+        # Twice the triangle areas; the factor does not change the arg max.
+        areas = np.abs((ax - next_x[bucket]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (next_y[bucket] - ay))
+        anchor = start + int(areas.argmax())
+        kept[bucket + 1] = anchor
+    return kept
+
+
+def _series(db: Session, batch_id: int) -> tuple[Any, Any]:
+    """Timestamps (``datetime64[us]``) and weights (``float64``) of a batch's weighings, oldest first."""
+
+    np = _numpy()
+    statement = (
+        select(cast(Weighing.recorded_at, String), type_coerce(Weighing.weight_kg, Float))
+        .where(Weighing.batch_id == batch_id)
+        .order_by(Weighing.recorded_at, Weighing.id)
+        .execution_options(yield_per=CURVE_CHUNK)
+    )
+    times, weights = [], []
+    # Core rows on the session's connection: ORM result rows cost more than the query.
+    for partition in db.connection().execute(statement).partitions():
+        times.append(np.array([row[0] for row in partition], dtype="datetime64[us]"))
+        weights.append(np.array([row[1] for row in partition], dtype=np.float64))
+    if not times:
+        return np.empty(0, dtype="datetime64[us]"), np.empty(0, dtype=np.float64)
+    return np.concatenate(times), np.concatenate(weights)
+
+
+def weight_curve(db: Session, batch_id: int, points: int) -> dict[str, Any]:
+    """The weight curve of a batch reduced to at most ``points`` points, shaped like ``schemas.WeightCurve``."""
+
+    np = _numpy()
+    times, weights = _series(db, batch_id)
+    # Seconds since the first weigh-in keep the triangle areas well conditioned.
+    seconds = (times - times[0]).astype(np.float64) / 1e6 if len(times) else weights
+    kept = lttb(seconds, weights, points)
+    return {
+        "batch_id": batch_id,
+        "weighing_count": len(times),
+        "points": [
+            {"recorded_at": recorded_at, "weight_kg": weight_kg}
+            for recorded_at, weight_kg in zip(times[kept].tolist(), weights[kept].tolist())
+        ],
+    }
@@ -0,0 +1,198 @@
+"""Compare throughput and latency of the sync and async route variants.
+
+Starts a real uvicorn server per mode against the same freshly migrated database and drives it
+with ``--clients`` concurrent HTTP clients. Three modes are measured:
+
+* ``sync``      -- ``ASYNC_ROUTES=0`` with the default pool (5 + 10 overflow connections);
+* ``sync-pool`` -- ``ASYNC_ROUTES=0`` with one pooled connection per client. A sync request keeps
+  its session's connection until the ``get_db`` teardown gets a threadpool slot, so the pool has
+  to cover every in-flight request, not just the 40 handler threads, or checkouts starve;
+* ``async``     -- ``ASYNC_ROUTES=1``.
+
+Comparing ``async`` against ``sync-pool`` separates the routing model from pool starvation::
+
+    python -m benchmarks.async_vs_sync --clients 200 --duration 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# scenario -> (method, path, body built from the seeded contract id)
+SCENARIOS = {
+    "list_deliveries": ("GET", "/deliveries/?limit=50", None),
+    "list_contracts": ("GET", "/contracts/?limit=50", None),
+    "settlement_trial": ("POST", "/settlements/trial", lambda contract_id: {"contract_id": contract_id}),
+}
+
+MODES = ("sync", "sync-pool", "async")
+
+
+def _mode_env(mode: str, clients: int) -> dict[str, str]:
+    if mode == "async":
+        return {"ASYNC_ROUTES": "1"}
+    if mode == "sync-pool":
+        return {"ASYNC_ROUTES": "0", "DB_POOL_SIZE": str(clients), "DB_MAX_OVERFLOW": "0"}
+    return {"ASYNC_ROUTES": "0"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _migrate(database_url: str) -> None:
+    env = {**os.environ, "DATABASE_URL": database_url, "SQLITE_URL": database_url}
+    subprocess.run(["alembic", "upgrade", "head"], check=True, cwd=PROJECT_ROOT, env=env, capture_output=True)
+
+
+def _seed(base_url: str, deliveries: int) -> int:
+    with httpx.Client(base_url=base_url) as client:
+        customer = client.post(
+            "/customers/",
+            json={"customer_code": "21001", "name": "压测客户", "recipient_name": "压测", "address": "广安"},
+        ).json()
+        contract = client.post(
+            "/contracts/",
+            json={
+                "contract_code": "BENCH-001",
+                "customer_id": customer["id"],
+                "package_name": "山野草鸡定养",
+                "hen_type": "草鸡母",
+                "egg_type": "山野草鸡蛋",
+                "total_eggs": deliveries * 10,
+                "price": 466.0,
+                "start_date": "2024-01-01",
+            },
+        ).json()
+        for _ in range(deliveries):
+            client.post("/deliveries/", json={"contract_id": contract["id"], "eggs_delivered": 10, "packaging": "散装"})
+        return contract["id"]
+
+
+class Server:
+    """A uvicorn subprocess serving the app with ``env`` layered over the environment."""
+
+    def __init__(self, database_url: str, env: dict[str, str], workers: int) -> None:
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        env = {**os.environ, "DATABASE_URL": database_url, "SQLITE_URL": database_url, **env}
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"]
+        if workers > 1:
+            command += ["--workers", str(workers)]
+        self.process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+
+    def __enter__(self) -> "Server":
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.base_url}/health").status_code == 200:
+                    return self
+            except httpx.TransportError:
+                time.sleep(0.1)
+        self.process.kill()
+        raise RuntimeError("uvicorn did not become healthy")
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class Result:
+    """Outcome of driving one scenario: per-request latencies plus failure counts."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.timeouts = 0
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return float("nan")
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _drive(
+    base_url: str, scenario: str, contract_id: int, clients: int, duration: float, timeout: float
+) -> Result:
+    method, path, body = SCENARIOS[scenario]
+    payload = body(contract_id) if body else None
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    result = Result()
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=payload)
+                except httpx.TimeoutException:
+                    result.timeouts += 1
+                    continue
+                except httpx.HTTPError:
+                    result.errors += 1
+                    continue
+                if response.status_code < 400:
+                    result.latencies.append(time.perf_counter() - started)
+                else:
+                    result.errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario and mode")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request client timeout in seconds")
+    parser.add_argument("--deliveries", type=int, default=500, help="rows seeded before measuring")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--mode", choices=MODES, action="append")
+    parser.add_argument("--database-url", help="benchmark against an existing database instead of a temp SQLite file")
+    args = parser.parse_args(argv)
+    scenarios = args.scenario or sorted(SCENARIOS)
+    modes = args.mode or list(MODES)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        _migrate(database_url)
+        contract_id: int | None = None
+        print(f"{'scenario':<18} {'mode':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'timeouts':>9}")
+        for scenario in scenarios:
+            for mode in modes:
+                with Server(database_url, _mode_env(mode, args.clients), args.workers) as server:
+                    if contract_id is None:
+                        contract_id = _seed(server.base_url, args.deliveries)
+                    result = asyncio.run(
+                        _drive(server.base_url, scenario, contract_id, args.clients, args.duration, args.timeout)
+                    )
+                print(
+                    f"{scenario:<18} {mode:<10} {len(result.latencies) / args.duration:>8.1f}"
+                    f" {result.percentile(0.5) * 1000:>8.1f} {result.percentile(0.99) * 1000:>8.1f}"
+                    f" {result.errors:>7} {result.timeouts:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measure the per-request cost of :class:`app.metrics.MetricsMiddleware`.
+
+Drives a bare ASGI endpoint with and without the middleware directly on an event loop,
+so the difference is the middleware alone (no HTTP parsing, routing or database)::
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/contracts/{contract_id}"
+
+
+async def _endpoint(scope, receive, send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message) -> None:
+    return None
+
+
+async def _drive(app, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/contracts/1"}, _receive, _send)
+    return (time.perf_counter() - started) / requests
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    instrumented = MetricsMiddleware(_endpoint)
+    bare, wrapped = [], []
+    for _ in range(args.rounds):
+        bare.append(asyncio.run(_drive(_endpoint, args.requests)))
+        wrapped.append(asyncio.run(_drive(instrumented, args.requests)))
+    bare_us, wrapped_us = statistics.median(bare) * 1e6, statistics.median(wrapped) * 1e6
+    print(f"bare endpoint      {bare_us:6.2f} us/request")
+    print(f"with middleware    {wrapped_us:6.2f} us/request")
+    print(f"overhead           {wrapped_us - bare_us:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Latency/throughput suite for the main API routes, gated against a JSON baseline.
+
+Builds (once, then reuses) a SQLite database filled by ``python -m app.seed --scale``, copies it
+for each run, and drives every scenario with a fixed, seeded request sequence through two
+transports:
+
+* ``asgi``    -- the app in this process via ``httpx.ASGITransport`` (routing, handlers, ORM);
+* ``uvicorn`` -- a real uvicorn subprocess over HTTP (adds the server and socket layers).
+
+Each scenario reports p50/p99 latency and throughput. ``--save-baseline`` writes them to JSON;
+``--baseline`` compares against a saved file and exits non-zero when a route regresses beyond
+the tolerances (or errors)::
+
+    python -m benchmarks.suite --save-baseline benchmarks/baselines/sqlite-10k.json
+    python -m benchmarks.suite --baseline benchmarks/baselines/sqlite-10k.json
+
+Baselines are only comparable on the same machine and dataset size; the file records both.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from .async_vs_sync import PROJECT_ROOT, Result, Server, _migrate
+
+Request = tuple[str, str, dict[str, Any] | None]
+TRANSPORTS = ("asgi", "uvicorn")
+# create_delivery spreads one-egg deliveries over every contract with at least this many eggs left.
+ROOMY_EGGS = 100
+
+
+@dataclass
+class Dataset:
+    """Ids sampled by the scenarios, read once from the seeded database."""
+
+    customers: list[int]
+    contracts: list[int]
+    roomy_contracts: list[int]
+
+
+def _list(path: str) -> Callable[[random.Random, Dataset], Request]:
+    return lambda rng, data: ("GET", path, None)
+
+
+SCENARIOS: dict[str, Callable[[random.Random, Dataset], Request]] = {
+    "list_contracts": _list("/contracts/?limit=50"),
+    "list_deliveries": _list("/deliveries/?limit=50"),
+    "list_feedings": _list("/feedings/?limit=50"),
+    "get_customer": lambda rng, data: ("GET", f"/customers/{rng.choice(data.customers)}", None),
+    "get_contract": lambda rng, data: ("GET", f"/contracts/{rng.choice(data.contracts)}", None),
+    "create_delivery": lambda rng, data: (
+        "POST",
+        "/deliveries/",
+        {"contract_id": rng.choice(data.roomy_contracts), "eggs_delivered": 1, "packaging": "散装"},
+    ),
+    "settlement_trial": lambda rng, data: (
+        "POST",
+        "/settlements/trial",
+        {"contract_id": rng.choice(data.contracts)},
+    ),
+}
+
+
+@dataclass
+class Measurement:
+    p50_ms: float
+    p99_ms: float
+    rps: float
+    errors: int
+
+    @classmethod
+    def from_result(cls, result: Result, elapsed: float) -> "Measurement":
+        return cls(
+            p50_ms=round(result.percentile(0.5) * 1000, 3),
+            p99_ms=round(result.percentile(0.99) * 1000, 3),
+            rps=round(len(result.latencies) / elapsed, 1),
+            errors=result.errors + result.timeouts,
+        )
+
+
+def _dataset_path(customers: int, seed: int) -> Path:
+    return Path(tempfile.gettempdir()) / f"doppytang-bench-{customers}-{seed}.db"
+
+
+def _prepare(customers: int, seed: int) -> Path:
+    """Migrate and scale-seed the pristine dataset unless a complete one is cached."""
+
+    path = _dataset_path(customers, seed)
+    url = f"sqlite:///{path}"
+    _migrate(url)
+    env = {**os.environ, "DATABASE_URL": url, "SQLITE_URL": url, "ENV_FILE": os.devnull}
+    subprocess.run(
+        [sys.executable, "-m", "app.seed", "--scale", str(customers), "--seed", str(seed)],
+        check=True,
+        cwd=PROJECT_ROOT,
+        env=env,
+    )
+    with sqlite3.connect(path) as connection:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return path
+
+
+def _load_dataset(path: Path) -> Dataset:
+    with sqlite3.connect(path) as connection:
+        customers = [row[0] for row in connection.execute("SELECT id FROM customers")]
+        contracts = [row[0] for row in connection.execute("SELECT id FROM contracts")]
+        roomy = [
+            row[0] for row in connection.execute("SELECT id FROM contracts WHERE remaining_eggs >= ?", (ROOMY_EGGS,))
+        ]
+    return Dataset(customers, contracts, roomy)
+
+
+def _requests(scenario: str, data: Dataset, count: int, seed: int) -> list[Request]:
+    rng = random.Random(f"{seed}:{scenario}")
+    return [SCENARIOS[scenario](rng, data) for _ in range(count)]
+
+
+async def _drive(client: httpx.AsyncClient, requests: list[Request], concurrency: int) -> Measurement:
+    result = Result()
+    pending: Iterator[Request] = iter(requests)
+
+    async def worker() -> None:
+        for method, path, body in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.TimeoutException:
+                result.timeouts += 1
+                continue
+            if response.status_code < 400:
+                result.latencies.append(time.perf_counter() - started)
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Measurement.from_result(result, time.perf_counter() - started)
+
+
+async def _run_scenarios(
+    client: httpx.AsyncClient, transport: str, scenarios: list[str], data: Dataset, args: argparse.Namespace
+) -> dict[str, Measurement]:
+    measurements = {}
+    for scenario in scenarios:
+        await _drive(client, _requests(scenario, data, args.warmup, args.seed + 1), args.concurrency)
+        measurement = await _drive(client, _requests(scenario, data, args.requests, args.seed), args.concurrency)
+        measurements[f"{transport}/{scenario}"] = measurement
+        print(
+            f"{transport:<8} {scenario:<18} {measurement.rps:>9.1f} {measurement.p50_ms:>8.2f}"
+            f" {measurement.p99_ms:>8.2f} {measurement.errors:>7}",
+            flush=True,
+        )
+    return measurements
+
+
+async def _asgi(scenarios: list[str], data: Dataset, args: argparse.Namespace) -> dict[str, Measurement]:
+    # DATABASE_URL is set before this first import of the app, so it binds to the benchmark copy.
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            return await _run_scenarios(client, "asgi", scenarios, data, args)
+
+
+async def _uvicorn(
+    base_url: str, scenarios: list[str], data: Dataset, args: argparse.Namespace
+) -> dict[str, Measurement]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        return await _run_scenarios(client, "uvicorn", scenarios, data, args)
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], tolerance: float, p99_tolerance: float
+) -> list[str]:
+    """Regressions of ``current`` against ``baseline`` results, as human-readable lines."""
+
+    regressions = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if now["errors"]:
+            regressions.append(f"{key}: {now['errors']} failed requests")
+        if before is None:
+            continue
+        if now["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p50 {before['p50_ms']:.2f} -> {now['p50_ms']:.2f} ms")
+        if now["p99_ms"] > before["p99_ms"] * (1 + p99_tolerance):
+            regressions.append(f"{key}: p99 {before['p99_ms']:.2f} -> {now['p99_ms']:.2f} ms")
+        if now["rps"] < before["rps"] / (1 + tolerance):
+            regressions.append(f"{key}: throughput {before['rps']:.1f} -> {now['rps']:.1f} req/s")
+    return regressions
+
+
+def _git_revision() -> str:
+    completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    return completed.stdout.strip() or "unknown"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=10_000, help="size of the --scale dataset")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per scenario and transport")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--transport", choices=TRANSPORTS, action="append")
+    parser.add_argument("--save-baseline", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="fail when results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/throughput regression (0.25 = 25%%)")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5, help="allowed p99 regression")
+    args = parser.parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+    transports = args.transport or list(TRANSPORTS)
+
+    pristine = _prepare(args.customers, args.seed)
+    data = _load_dataset(pristine)
+    results: dict[str, Measurement] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'transport':<8} {'scenario':<18} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for transport in transports:
+            # Writes from one transport must not skew the next one's reads.
+            database = Path(workdir) / f"{transport}.db"
+            shutil.copyfile(pristine, database)
+            url = f"sqlite:///{database}"
+            os.environ.update(DATABASE_URL=url, SQLITE_URL=url, ENV_FILE=os.devnull)
+            if transport == "asgi":
+                results.update(asyncio.run(_asgi(scenarios, data, args)))
+            else:
+                with Server(url, {"ENV_FILE": os.devnull}, workers=1) as server:
+                    results.update(asyncio.run(_uvicorn(server.base_url, scenarios, data, args)))
+
+    current = {key: asdict(measurement) for key, measurement in results.items()}
+    if args.save_baseline:
+        meta = {
+            "revision": _git_revision(),
+            "customers": args.customers,
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpu",
+        }
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps({"meta": meta, "results": current}, indent=2) + "\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(baseline["results"], current, args.tolerance, args.p99_tolerance)
+        if regressions:
+            print(f"regressions against {args.baseline}:", *regressions, sep="\n  ")
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (baseline revision {baseline['meta']['revision']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Time ``GET /batches/{id}/weight-curve`` on one batch with a million weighings.
+
+Migrates a scratch SQLite database, creates one batch through the API and bulk-inserts
+``--rows`` weigh-ins (a noisy growth curve, one every few minutes). It then times, in
+process, the downsampled curve against ``GET /weighings/export``, which ships every row
+and is what a chart had to fetch before. It also splits the curve time into reading the
+rows into arrays and running LTTB::
+
+    python -m benchmarks.weight_curve --rows 1000000 --points 500 --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .async_vs_sync import _migrate
+
+CHUNK = 50_000
+
+
+def _median_seconds(call, runs: int) -> tuple[float, object]:
+    samples, result = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def _seed(client, rows: int) -> int:
+    from sqlalchemy import insert
+
+    from app.database import session_scope
+    from app.models import Weighing
+
+    customer = client.post("/customers/", json={
+        "name": "基准客户",
+        "phones": ["13800000000"],
+        "recipient_name": "基准",
+        "address": "四川省广安市前锋区",
+        "area_code": "21",
+        "first_purchase_date": "2023-01-01",
+    }).json()
+    contract = client.post("/contracts/", json={
+        "contract_code": "BENCH-001",
+        "customer_id": customer["id"],
+        "package_name": "山野草鸡定养",
+        "hen_type": "草鸡母",
+        "egg_type": "山野草鸡蛋",
+        "total_eggs": 200,
+        "price": 466.0,
+        "start_date": "2023-01-02",
+    }).json()
+    batch = client.post("/batches/", json={
+        "contract_id": contract["id"], "name": "基准批次", "start_date": "2023-01-03", "status": "active",
+    }).json()
+
+    rng = random.Random(1)
+    start = datetime(2023, 1, 3)
+    step = timedelta(days=365) / rows
+    with session_scope() as db:
+        for offset in range(0, rows, CHUNK):
+            db.execute(insert(Weighing), [
+                {
+                    "batch_id": batch["id"],
+                    "weight_kg": max(0.04, round(0.05 + 2.2 * index / rows + rng.gauss(0, 0.08), 2)),
+                    "recorded_at": start + step * index,
+                }
+                for index in range(offset, min(offset + CHUNK, rows))
+            ])
+        db.commit()
+    return batch["id"]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="weighings in the batch")
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{Path(workdir) / 'weight_curve.db'}"
+        _migrate(database_url)
+        os.environ.update({"DATABASE_URL": database_url, "SQLITE_URL": database_url, "ENV_FILE": os.devnull})
+
+        from fastapi.testclient import TestClient
+
+        from app import weight_curve
+        from app.database import session_scope
+        from app.main import app
+
+        with TestClient(app) as client:
+            started = time.perf_counter()
+            batch_id = _seed(client, args.rows)
+            print(f"seeded {args.rows} weighings in {time.perf_counter() - started:.1f} s")
+
+            curve_url = f"/batches/{batch_id}/weight-curve?points={args.points}"
+            curve_s, curve = _median_seconds(lambda: client.get(curve_url), args.runs)
+            export_s, export = _median_seconds(lambda: client.get("/weighings/export?format=ndjson"), args.runs)
+            with session_scope() as db:
+                read_s, (times, weights) = _median_seconds(lambda: weight_curve._series(db, batch_id), args.runs)
+            seconds = (times - times[0]).astype("float64") / 1e6
+            lttb_s, _ = _median_seconds(lambda: weight_curve.lttb(seconds, weights, args.points), args.runs)
+
+        print(f"{'request':<28} {'median s':>9} {'bytes':>12} {'points':>9}")
+        print(f"{'weight-curve':<28} {curve_s:>9.3f} {len(curve.content):>12} {len(curve.json()['points']):>9}")
+        print(f"{'weighings/export (ndjson)':<28} {export_s:>9.3f} {len(export.content):>12} {args.rows:>9}")
+        print(f"  of which reading into arrays {read_s:.3f} s, LTTB {lttb_s:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,4 +5,23 @@ set -euo pipefail
 source "$(dirname "$0")/common.sh"
 activate_venv
 
-pytest -q
+# `scripts/run_tests.sh mysql` runs the suite (including tests/test_concurrency.py) against the
+# docker-compose MySQL service instead of the SQLite test database. It uses a separate
+# doppytang_test schema because every test starts by deleting all rows.
+if [ "${1:-}" = "mysql" ]; then
+  shift
+  docker compose up -d db
+  for _ in $(seq 1 60); do
+    if docker compose exec -T db mysqladmin ping -h 127.0.0.1 --silent >/dev/null 2>&1; then
+      break
+    fi
+    sleep 1
+  done
+  docker compose exec -T db mysql -uroot -p"${MYSQL_ROOT_PASSWORD:-secret}" -e \
+    "CREATE DATABASE IF NOT EXISTS doppytang_test; GRANT ALL ON doppytang_test.* TO '${MYSQL_USER:-app}'@'%';"
+  export DATABASE_URL="mysql+pymysql://${MYSQL_USER:-app}:${MYSQL_PASSWORD:-app}@127.0.0.1:3306/doppytang_test"
+  # No SQLite candidate: an unreachable MySQL must fail the run, not silently fall back.
+  export SQLITE_URL="$DATABASE_URL"
+fi
+
+pytest -q "$@"
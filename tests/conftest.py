@@ -15,14 +15,19 @@ os.environ.setdefault("DATABASE_URL", f"sqlite:///{TEST_DB_PATH}")
 os.environ.setdefault("SQLITE_URL", f"sqlite:///{TEST_DB_PATH}")
 
 from app.main import app  # noqa: E402
-from app.database import Base, SessionLocal  # noqa: E402
+from app.cache import reset_reference_cache  # noqa: E402
+from app.database import Base, SessionLocal, init_engine  # noqa: E402
+from app.dashboard import invalidate_dashboard  # noqa: E402
+from app.dispatch import invalidate_dispatch  # noqa: E402
 
 
 @pytest.fixture(scope="session", autouse=True)
 def apply_migrations() -> Iterator[None]:
-    if TEST_DB_PATH.exists():
-        TEST_DB_PATH.unlink()
+    # WAL mode leaves -wal/-shm files next to the database; a stale one must not outlive it.
+    for suffix in ("", "-wal", "-shm"):
+        TEST_DB_PATH.with_name(TEST_DB_PATH.name + suffix).unlink(missing_ok=True)
     subprocess.run(["alembic", "upgrade", "head"], check=True)
+    init_engine()
     yield
 
 
@@ -42,6 +47,10 @@ def clean_database() -> Iterator[None]:
         if foreign_keys_disabled:
             session.execute(text("SET FOREIGN_KEY_CHECKS=1"))
             session.commit()
+        # Row ids are reused once the tables are emptied.
+        reset_reference_cache()
+        invalidate_dispatch()
+        invalidate_dashboard()
         yield
     finally:
         session.close()
@@ -1,8 +1,22 @@
 from __future__ import annotations
 
-from datetime import date
-
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI, Response
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+from app import batch_stats, customer_codes, dashboard, main, profiling
+from app.database import session_scope
+from app.delivery_stats import rebuild
+from app.models import ContractDeliveryStats, Weighing
+from app.profiling import query_budget
+from app.api.routes import contracts, customers, deliveries, settlements
 
 
 CUSTOMER_PAYLOAD = {
@@ -69,6 +83,35 @@ def test_duplicate_customer_code_rejected(client: TestClient) -> None:
     assert response.status_code == 400
 
 
+def test_customer_codes_are_allocated_per_area(client: TestClient) -> None:
+    def create(area_code: str | None, index: int, **fields) -> Response:
+        payload = {key: value for key, value in CUSTOMER_PAYLOAD.items() if key != "customer_code"}
+        payload.update(area_code=area_code, phones=[f"1370000{index:04d}"], **fields)
+        return client.post("/customers/", json=payload)
+
+    # The counter of area 1 starts past the hand-entered 21001.
+    create_customer(client)
+    assert [create("21", index).json()["customer_code"] for index in range(2)] == ["21002", "21003"]
+    assert create("25", 2).json()["customer_code"] == "25001"
+    manual = create("21", 3, customer_code="21010")
+    assert manual.status_code == 201
+    assert create("21", 4).json()["customer_code"] == "21011"
+
+    invalid = create("31", 5)
+    assert invalid.status_code == 400 and "area_code" in invalid.json()["detail"]
+    assert create(None, 6).status_code == 400
+
+    with session_scope() as db:
+        assert customer_codes.allocate_codes(db, "21", 3) == ["21012", "21013", "21014"]
+        with pytest.raises(customer_codes.AreaCodesExhausted):
+            customer_codes.allocate_codes(db, "21", customer_codes.MAX_SEQUENCE)
+    assert create("21", 7, customer_code="21999").status_code == 201
+    exhausted = create("21", 8)
+    assert exhausted.status_code == 409
+    assert exhausted.json()["detail"].startswith("Area 21 has no room for a customer code")
+    assert create("25", 9).json()["customer_code"] == "25002"
+
+
 def test_customer_update_and_delete(client: TestClient) -> None:
     customer = create_customer(client)
     update = client.put(
@@ -83,6 +126,70 @@ def test_customer_update_and_delete(client: TestClient) -> None:
     assert not_found.status_code == 404
 
 
+def test_customer_lookup_by_phone_follows_writes(client: TestClient) -> None:
+    customer = create_customer(client)
+    with query_budget(1):
+        found = client.get("/customers/by-phone/+86 139-0000-0000")
+    assert found.json()["id"] == customer["id"]
+
+    other = {**CUSTOMER_PAYLOAD, "customer_code": "21002", "phones": ["8613900000000"]}
+    taken = client.post("/customers/", json=other)
+    assert taken.status_code == 400
+    assert taken.json()["detail"] == "Phone already bound to another customer: 13900000000"
+    other_id = client.post("/customers/", json={**other, "phones": ["13911112222"]}).json()["id"]
+    assert client.put(f"/customers/{other_id}", json={"phones": ["13900000000"]}).status_code == 400
+
+    moved = client.put(f"/customers/{customer['id']}", json={"phones": ["13900000000", "139 0000 0001"]})
+    assert moved.status_code == 200
+    assert client.get("/customers/by-phone/13900000001").json()["id"] == customer["id"]
+    client.put(f"/customers/{customer['id']}", json={"phones": ["13900000001"]})
+    assert client.get("/customers/by-phone/13900000000").status_code == 404
+    assert client.put(f"/customers/{other_id}", json={"phones": ["13900000000"]}).status_code == 200
+    assert client.get("/customers/by-phone/13900000000").json()["id"] == other_id
+
+    client.delete(f"/customers/{customer['id']}")
+    assert client.get("/customers/by-phone/13900000001").status_code == 404
+
+
+def test_customer_search_ranks_and_paginates(client: TestClient) -> None:
+    people = [
+        ("21001", "张三丰", "张三丰", "四川省广安市前锋区幸福街1号"),
+        ("21002", "李四", "张三丰家", "四川省成都市人民路2号"),
+        ("21003", "王五", "王五", "四川省广安市张三丰路3号"),
+    ]
+    ids = [
+        client.post(
+            "/customers/",
+            json={**CUSTOMER_PAYLOAD, "customer_code": code, "name": name, "recipient_name": recipient,
+                  "address": address, "phones": []},
+        ).json()["id"]
+        for code, name, recipient, address in people
+    ]
+
+    def search(q: str, **params) -> list[int]:
+        response = client.get("/customers/search", params={"q": q, **params})
+        assert response.status_code == 200, response.text
+        return [customer["id"] for customer in response.json()]
+
+    # Full-text terms rank name over recipient over address; shorter terms fall back to LIKE.
+    assert search("张三丰") == ids
+    assert search("张三") == ids
+    assert search("广安市 王") == [ids[2]]
+    assert search("不存在的人") == []
+
+    first = client.get("/customers/search", params={"q": "张三", "limit": 2})
+    assert [customer["id"] for customer in first.json()] == ids[:2]
+    assert search("张三", limit=2, cursor=first.headers["X-Next-Cursor"]) == [ids[2]]
+    assert client.get("/customers/search", params={"q": "张三", "cursor": "bad"}).status_code == 400
+    assert client.get("/customers/search", params={"q": "  "}).status_code == 400
+
+    client.put(f"/customers/{ids[2]}", json={"address": "四川省华蓥市双河街"})
+    assert search("张三丰") == ids[:2]
+    assert search("华蓥市") == [ids[2]]
+    client.delete(f"/customers/{ids[0]}")
+    assert search("张三丰") == [ids[1]]
+
+
 def test_contract_creation_and_listing(client: TestClient) -> None:
     customer = create_customer(client)
     contract = create_contract(client, customer["id"])
@@ -144,6 +251,94 @@ def test_feeding_medication_weighing_records(client: TestClient) -> None:
     assert client.get("/weighings/").status_code == 200
 
 
+def test_batch_daily_stats_follow_feeding_and_weighing_writes(client: TestClient) -> None:
+    customer = create_customer(client)
+    batch = create_batch(client, create_contract(client, customer["id"])["id"])
+
+    def feed(feed_type: str, kg: float, fed_at: str) -> dict:
+        payload = {"batch_id": batch["id"], "feed_type": feed_type, "quantity_kg": kg, "fed_at": fed_at}
+        return client.post("/feedings/", json=payload).json()
+
+    def weigh(kg: float, recorded_at: str) -> dict:
+        payload = {"batch_id": batch["id"], "weight_kg": kg, "recorded_at": recorded_at}
+        return client.post("/weighings/", json=payload).json()
+
+    feed("有机玉米", 12.0, "2024-01-06T08:00:00")
+    feed("有机玉米", 8.5, "2024-01-06T17:00:00")
+    feed("青菜", 3.0, "2024-01-06T12:00:00")
+    moved = feed("青菜", 2.0, "2024-01-07T08:00:00")
+    weigh(1.8, "2024-01-06T09:00:00")
+    heaviest = weigh(2.1, "2024-01-06T10:00:00")
+    weigh(1.5, "2024-01-07T10:00:00")
+
+    def stats(**params) -> list[dict]:
+        response = client.get(f"/batches/{batch['id']}/daily-stats", params=params)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    first, second = stats()
+    assert first == {
+        "day": "2024-01-06",
+        "feed_kg": 23.5,
+        "feeds": [
+            {"feed_type": "有机玉米", "quantity_kg": 20.5, "feeding_count": 2},
+            {"feed_type": "青菜", "quantity_kg": 3.0, "feeding_count": 1},
+        ],
+        "weighing_count": 2,
+        "weight_mean_kg": 1.95,
+        "weight_min_kg": 1.8,
+        "weight_max_kg": 2.1,
+    }
+    assert (second["day"], second["feed_kg"], second["weighing_count"]) == ("2024-01-07", 2.0, 1)
+
+    # Edits and deletes re-aggregate both the old and the new day.
+    assert client.put(f"/feedings/{moved['id']}", json={"fed_at": "2024-01-06T18:00:00"}).status_code == 200
+    assert client.delete(f"/weighings/{heaviest['id']}").status_code == 204
+    first, second = stats()
+    assert first["feeds"][1] == {"feed_type": "青菜", "quantity_kg": 5.0, "feeding_count": 2}
+    assert (first["weighing_count"], first["weight_max_kg"]) == (1, 1.8)
+    assert (second["feeds"], second["weighing_count"]) == ([], 1)
+    assert [day["day"] for day in stats(start="2024-01-07", end="2024-01-31")] == ["2024-01-07"]
+    assert stats(end="2024-01-05") == []
+    assert client.get("/batches/999999/daily-stats").status_code == 404
+
+    with session_scope() as db:
+        assert batch_stats.rebuild(db) == (2, 2)
+        db.commit()
+    assert [day["feed_kg"] for day in stats()] == [25.5, 0.0]
+
+
+def test_batch_weight_curve_is_downsampled_keeping_its_shape(client: TestClient) -> None:
+    customer = create_customer(client)
+    batch = create_batch(client, create_contract(client, customer["id"])["id"])
+    start = datetime(2024, 1, 1, 6, 0)
+    rows = [
+        {"batch_id": batch["id"], "weight_kg": 1.0 + hour / 100, "recorded_at": start + timedelta(hours=hour)}
+        for hour in range(200)
+    ]
+    rows[77]["weight_kg"] = 9.0
+    with session_scope() as db:
+        db.execute(insert(Weighing), rows)
+        db.commit()
+
+    def curve(**params) -> dict:
+        response = client.get(f"/batches/{batch['id']}/weight-curve", params=params)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    reduced = curve(points=20)
+    assert (reduced["weighing_count"], len(reduced["points"])) == (200, 20)
+    times = [point["recorded_at"] for point in reduced["points"]]
+    assert times == sorted(times)
+    assert (times[0], times[-1]) == ("2024-01-01T06:00:00", "2024-01-09T13:00:00")
+    # The one-off spike survives the reduction.
+    assert {"recorded_at": "2024-01-04T11:00:00", "weight_kg": 9.0} in reduced["points"]
+
+    assert len(curve()["points"]) == 200
+    assert client.get(f"/batches/{batch['id']}/weight-curve", params={"points": 2}).status_code == 422
+    assert client.get("/batches/999999/weight-curve").status_code == 404
+
+
 def test_delivery_updates_remaining_eggs(client: TestClient) -> None:
     customer = create_customer(client)
     contract = create_contract(client, customer["id"])
@@ -207,3 +402,441 @@ def test_settlement_trial_and_create(client: TestClient) -> None:
     listing = client.get("/settlements/")
     assert listing.status_code == 200
     assert len(listing.json()) == 1
+
+
+def test_delivery_listing_keyset_pagination(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    for day in (1, 2, 2, 3, 4):
+        response = client.post(
+            "/deliveries/",
+            json={
+                "contract_id": contract["id"],
+                "eggs_delivered": 10,
+                "packaging": "散装",
+                "delivered_at": f"2024-02-0{day}T09:00:00",
+            },
+        )
+        assert response.status_code == 201
+
+    seen: list[int] = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/deliveries/", params=params)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    full = client.get("/deliveries/").json()
+    assert pages == 3
+    assert seen == [item["id"] for item in full]
+    assert [item["delivered_at"][:10] for item in full][0] == "2024-02-04"
+    assert client.get("/deliveries/", params={"cursor": "not-a-cursor"}).status_code == 400
+    for path, values in (
+        ("/contracts/", "[1e999]"),
+        ("/contracts/", f"[{10**30}]"),
+        ("/contracts/", "[true]"),
+        ("/deliveries/", '["2024-01-01T00:00:00",1e999]'),
+        ("/deliveries/", '[20240101,1]'),
+    ):
+        crafted = base64.urlsafe_b64encode(values.encode()).decode()
+        assert client.get(path, params={"cursor": crafted}).status_code == 400, values
+
+
+def test_contract_listing_loads_customers_in_constant_statements(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+
+    assert contract["customer"] is None
+    plain = client.get(f"/contracts/{contract['id']}")
+    assert plain.json()["customer"] is None
+    updated = client.put(f"/contracts/{contract['id']}", json={"description": "续约"})
+    assert updated.json()["customer"] is None
+    updated = client.put(f"/contracts/{contract['id']}", params={"expand": "customer"}, json={"description": "续约"})
+    assert updated.json()["customer"]["id"] == customer["id"]
+    expanded = client.get(f"/contracts/{contract['id']}", params={"expand": "customer"})
+    assert expanded.json()["customer"]["customer_code"] == CUSTOMER_PAYLOAD["customer_code"]
+
+    with query_budget(3) as single:
+        response = client.get("/contracts/", params={"expand": "customer"})
+    assert len(response.json()) == 1
+
+    for index in range(2, 7):
+        other = client.post(
+            "/customers/", json={**CUSTOMER_PAYLOAD, "customer_code": f"2100{index}", "phones": [f"1390000000{index}"]}
+        ).json()
+        client.post(
+            "/contracts/",
+            json={
+                "contract_code": f"CON-2024-00{index}",
+                "customer_id": other["id"],
+                "package_name": "山野草鸡定养",
+                "hen_type": "草鸡母",
+                "egg_type": "山野草鸡蛋",
+                "total_eggs": 200,
+                "price": 466.0,
+                "start_date": "2024-01-02",
+            },
+        )
+
+    with query_budget(3) as many:
+        response = client.get("/contracts/", params={"expand": "customer"})
+    body = response.json()
+    assert len(body) == 6
+    assert all(item["customer"] is not None for item in body)
+    assert many[0].count == single[0].count
+
+    with query_budget(2) as bare:
+        response = client.get("/contracts/")
+    assert all(item["customer"] is None for item in response.json())
+    assert bare[0].count == single[0].count - 1
+    assert client.get("/contracts/", params={"expand": "owner"}).status_code == 400
+
+
+def test_delivery_export_streams_ndjson_and_csv(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    for day in (1, 2, 3):
+        client.post(
+            "/deliveries/",
+            json={
+                "contract_id": contract["id"],
+                "eggs_delivered": 10,
+                "packaging": "散装",
+                "delivered_at": f"2024-03-0{day}T09:00:00",
+            },
+        )
+
+    ndjson = client.get("/deliveries/export", params={"start": "2024-03-02T00:00:00"})
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [record["delivered_at"][:10] for record in records] == ["2024-03-02", "2024-03-03"]
+
+    exported = client.get("/deliveries/export", params={"format": "csv", "end": "2024-03-02T00:00:00"})
+    assert exported.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+    assert len(rows) == 1
+    assert rows[0]["eggs_delivered"] == "10"
+    assert client.get("/feedings/export", params={"format": "csv"}).text.startswith("batch_id,")
+
+
+def test_bulk_delivery_registration(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    batch = create_batch(client, contract["id"])
+    rows = [
+        {
+            "contract_id": contract["id"],
+            "batch_id": batch["id"],
+            "eggs_delivered": 30,
+            "packaging": "普通家庭装30枚",
+        },
+        {"contract_id": contract["id"], "eggs_delivered": 45, "packaging": "礼盒装45枚", "hen_delivered": True},
+    ]
+
+    rejected = client.post(
+        "/deliveries/bulk",
+        json={"deliveries": rows + [{"contract_id": 999999, "eggs_delivered": 1, "packaging": "散装"}]},
+    )
+    assert rejected.status_code == 400
+    assert rejected.json()["detail"] == [{"index": 2, "detail": "Contract not found"}]
+    assert client.get("/deliveries/").json() == []
+
+    created = client.post("/deliveries/bulk", json={"deliveries": rows})
+    assert created.status_code == 201, created.text
+    assert created.json() == {
+        "created": 2,
+        "contracts": [{"contract_id": contract["id"], "remaining_eggs": 125, "hen_delivered": True}],
+    }
+    assert len(client.get("/deliveries/").json()) == 2
+
+    overdraw = client.post(
+        "/deliveries/bulk",
+        json={"deliveries": [{"contract_id": contract["id"], "eggs_delivered": 100, "packaging": "散装"}] * 2},
+    )
+    assert overdraw.status_code == 400
+    assert [error["index"] for error in overdraw.json()["detail"]] == [0, 1]
+    assert client.get(f"/contracts/{contract['id']}").json()["remaining_eggs"] == 125
+
+
+def test_async_route_variants(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main.settings, "async_routes", True)
+    async_app = FastAPI(lifespan=main.lifespan)
+    for module in (customers, contracts, deliveries, settlements):
+        async_app.include_router(module.async_router)
+
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    with TestClient(async_app) as async_client:
+        created = async_client.post(
+            "/deliveries/",
+            json={"contract_id": contract["id"], "eggs_delivered": 30, "packaging": "普通家庭装30枚"},
+        )
+        assert created.status_code == 201, created.text
+        overdraw = async_client.post(
+            "/deliveries/", json={"contract_id": contract["id"], "eggs_delivered": 300, "packaging": "散装"}
+        )
+        assert overdraw.status_code == 400
+        listing = async_client.get("/deliveries/")
+        assert [item["id"] for item in listing.json()] == [created.json()["id"]]
+        contracts_page = async_client.get("/contracts/", params={"expand": "customer"}).json()
+        assert contracts_page[0]["remaining_eggs"] == 170
+        assert contracts_page[0]["customer"]["id"] == customer["id"]
+        assert async_client.get("/customers/by-phone/13900000000").json()["id"] == customer["id"]
+        assert [found["id"] for found in async_client.get("/customers/search?q=测试客户").json()] == [customer["id"]]
+        trial = async_client.post("/settlements/trial", json={"contract_id": contract["id"]})
+        assert trial.json() == client.post("/settlements/trial", json={"contract_id": contract["id"]}).json()
+
+
+def test_bulk_settlement_trial_matches_single_trials(client: TestClient) -> None:
+    customer = create_customer(client)
+    first = create_contract(client, customer["id"])
+    second = client.post(
+        "/contracts/",
+        json={
+            "contract_code": "CON-2024-002",
+            "customer_id": customer["id"],
+            "package_name": "山野草鸡定养",
+            "hen_type": "草鸡母",
+            "egg_type": "山野草鸡蛋",
+            "total_eggs": 300,
+            "price": 599.0,
+            "start_date": "2024-03-01",
+            "status": "closed",
+        },
+    ).json()
+    for eggs in (30, 45):
+        client.post("/deliveries/", json={"contract_id": first["id"], "eggs_delivered": eggs, "packaging": "散装"})
+
+    with query_budget(1):
+        response = client.post("/settlements/trial/bulk", json={"price_override": 500.0, "notes": "月结"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        client.post(
+            "/settlements/trial", json={"contract_id": contract["id"], "price_override": 500.0, "notes": "月结"}
+        ).json()
+        for contract in (first, second)
+    ]
+    assert lines[1]["eggs_delivered_total"] == 0
+
+    filtered = client.post("/settlements/trial/bulk", json={"status": "closed", "start_date_from": "2024-02-01"})
+    assert [json.loads(line)["contract_id"] for line in filtered.text.splitlines()] == [second["id"]]
+    assert client.post(
+        "/settlements/trial/bulk", json={"start_date_from": "2024-03-01", "start_date_to": "2024-01-01"}
+    ).status_code == 400
+
+
+def test_contract_delivery_stats_follow_delivery_writes(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    assert contract["delivery_stats"] == {
+        "eggs_delivered_total": 0,
+        "delivery_count": 0,
+        "hen_delivery_count": 0,
+        "last_delivered_at": None,
+    }
+
+    def post(eggs: int, day: int, hen: bool = False) -> dict:
+        return client.post(
+            "/deliveries/",
+            json={
+                "contract_id": contract["id"],
+                "eggs_delivered": eggs,
+                "packaging": "散装",
+                "hen_delivered": hen,
+                "delivered_at": f"2024-04-0{day}T09:00:00",
+            },
+        ).json()
+
+    first = post(30, 1)
+    latest = post(20, 3, hen=True)
+    bulk_row = {
+        "contract_id": contract["id"],
+        "eggs_delivered": 5,
+        "packaging": "散装",
+        "delivered_at": "2024-04-02T09:00:00",
+    }
+    assert client.post("/deliveries/bulk", json={"deliveries": [bulk_row]}).status_code == 201
+    client.put(f"/deliveries/{first['id']}", json={"eggs_delivered": 40})
+    stats = client.get(f"/contracts/{contract['id']}").json()["delivery_stats"]
+    assert (stats["eggs_delivered_total"], stats["delivery_count"], stats["hen_delivery_count"]) == (65, 3, 1)
+    assert stats["last_delivered_at"].startswith("2024-04-03")
+
+    with query_budget(3) as requests:
+        trial = client.post("/settlements/trial", json={"contract_id": contract["id"]}).json()
+    assert trial["eggs_delivered_total"] == 65
+    assert not any("deliveries" in statement for statement in requests[0].statements)
+
+    assert client.delete(f"/deliveries/{latest['id']}").status_code == 204
+    body = client.get(f"/contracts/{contract['id']}").json()
+    assert body["hen_delivered"] is False
+    assert body["delivery_stats"]["hen_delivery_count"] == 0
+    assert body["delivery_stats"]["last_delivered_at"].startswith("2024-04-02")
+
+    with session_scope() as session:
+        session.execute(delete(ContractDeliveryStats))
+        assert rebuild(session) == 1
+        session.commit()
+    assert client.get(f"/contracts/{contract['id']}").json()["delivery_stats"] == body["delivery_stats"]
+
+
+def test_dashboard_summary_aggregates_contracts_settlements_and_batches(client: TestClient) -> None:
+    contracts_ = []
+    for index, (status_, hen_delivered) in enumerate([("active", False), ("active", True), ("closed", False)]):
+        payload = {**CUSTOMER_PAYLOAD, "customer_code": f"2100{index + 1}", "phones": [f"1370000000{index}"]}
+        customer = client.post("/customers/", json=payload).json()
+        contract = client.post(
+            "/contracts/",
+            json={"contract_code": f"DSH-{index}", "customer_id": customer["id"], "package_name": "山野草鸡定养",
+                  "hen_type": "草鸡母", "egg_type": "山野草鸡蛋", "total_eggs": 200, "price": 466.0,
+                  "start_date": "2024-01-02", "status": status_, "hen_delivered": hen_delivered},
+        )
+        assert contract.status_code == 201, contract.text
+        contracts_.append(contract.json())
+    for status_ in ("active", "active", "planned"):
+        batch = create_batch(client, contracts_[0]["id"])
+        client.put(f"/batches/{batch['id']}", json={"status": status_})
+    for amount_due, amount_paid, status_ in [(120.5, 20.0, "pending"), (80.0, 0.0, "pending"), (50.0, 50.0, "paid")]:
+        payload = {"contract_id": contracts_[0]["id"], "settlement_date": "2024-02-01", "eggs_delivered_total": 10,
+                   "amount_due": amount_due, "amount_paid": amount_paid, "status": status_}
+        assert client.post("/settlements/", json=payload).status_code == 201
+
+    with query_budget(2):
+        summary = client.get("/dashboard/summary").json()
+    assert {key: value for key, value in summary.items() if key != "generated_at"} == {
+        "active_contracts": 2,
+        "remaining_eggs": 400,
+        "hens_outstanding": 1,
+        "pending_settlements": 2,
+        "pending_amount_due": 200.5,
+        "pending_amount_paid": 20.0,
+        "pending_amount_outstanding": 180.5,
+        "batches_by_status": {"active": 2, "planned": 1},
+    }
+
+    # Writes show up once the cached summary expires, not before.
+    client.put(f"/contracts/{contracts_[0]['id']}", json={"hen_delivered": True})
+    with query_budget(0):
+        assert client.get("/dashboard/summary").json() == summary
+    dashboard.invalidate_dashboard()
+    assert client.get("/dashboard/summary").json()["hens_outstanding"] == 0
+
+
+def test_dispatch_manifest_lists_due_contracts_by_area_and_courier(client: TestClient) -> None:
+    contract_ids = {}
+    for index, (code, area_code, status_) in enumerate(
+        [("21001", "21", "active"), ("22001", "22", "active"), ("22002", "22", "active"), ("21002", "21", "closed")]
+    ):
+        customer = client.post(
+            "/customers/",
+            json={**CUSTOMER_PAYLOAD, "customer_code": code, "area_code": area_code, "phones": [f"1380000000{index}"]},
+        ).json()
+        contract = client.post(
+            "/contracts/",
+            json={"contract_code": f"DSP-{code}", "customer_id": customer["id"], "package_name": "山野草鸡定养",
+                  "hen_type": "草鸡母", "egg_type": "山野草鸡蛋", "total_eggs": 100, "price": 466.0,
+                  "start_date": "2024-01-02", "status": status_},
+        ).json()
+        contract_ids[code] = contract["id"]
+    for code, day, courier in [("22001", "2024-01-08", "配送员A"), ("22002", "2024-01-03", "配送员B")]:
+        delivery = {"contract_id": contract_ids[code], "eggs_delivered": 30, "packaging": "散装",
+                    "delivered_at": f"{day}T09:00:00", "delivered_by": courier}
+        assert client.post("/deliveries/", json=delivery).status_code == 201
+
+    def manifest(day: str, **params) -> dict:
+        response = client.get(f"/dispatch/{day}", params=params)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def stops(body: dict) -> list[tuple]:
+        return [
+            (area["area_code"], courier["courier"], stop["contract_code"], stop["days_since_last_delivery"])
+            for area in body["areas"]
+            for courier in area["couriers"]
+            for stop in courier["stops"]
+        ]
+
+    # Closed contracts and those delivered within the cadence are left out.
+    body = manifest("2024-01-14")
+    assert (body["cadence_days"], body["contract_count"]) == (7, 2)
+    assert stops(body) == [("21", None, "DSP-21001", None), ("22", "配送员B", "DSP-22002", 11)]
+    assert stops(manifest("2024-01-15")) == [
+        ("21", None, "DSP-21001", None), ("22", "配送员A", "DSP-22001", 7), ("22", "配送员B", "DSP-22002", 12)
+    ]
+    assert stops(manifest("2024-01-14", cadence_days=14)) == [("21", None, "DSP-21001", None)]
+    assert manifest("2024-01-01")["areas"] == []
+    assert client.get("/dispatch/2024-01-14", params={"cadence_days": 0}).status_code == 422
+
+    # Served from the cache until a delivery is recorded.
+    with query_budget(0):
+        manifest("2024-01-15")
+    delivery = {"contract_id": contract_ids["21001"], "eggs_delivered": 100, "packaging": "散装",
+                "delivered_at": "2024-01-15T08:00:00", "delivered_by": "配送员A"}
+    assert client.post("/deliveries/", json=delivery).status_code == 201
+    assert [stop[2] for stop in stops(manifest("2024-01-15"))] == ["DSP-22001", "DSP-22002"]
+    # Without eggs left the contract is not due again; a fresh manifest is one statement.
+    with query_budget(1):
+        assert [stop[2] for stop in stops(manifest("2024-02-15"))] == ["DSP-22001", "DSP-22002"]
+
+
+def test_conditional_get_short_circuits_unchanged_resources(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    delivery = client.post(
+        "/deliveries/", json={"contract_id": contract["id"], "eggs_delivered": 30, "packaging": "散装"}
+    ).json()
+
+    for path in ("/contracts/", f"/contracts/{contract['id']}", "/deliveries/", f"/deliveries/{delivery['id']}"):
+        first = client.get(path)
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+        assert "Last-Modified" in first.headers
+        with query_budget(1):
+            cached = client.get(path, headers={"If-None-Match": etag})
+        assert cached.status_code == 304, path
+        assert cached.headers["ETag"] == etag
+        assert cached.content == b""
+        since = client.get(path, headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert since.status_code == 304, path
+
+    contract_etag = client.get(f"/contracts/{contract['id']}").headers["ETag"]
+    list_etag = client.get("/deliveries/").headers["ETag"]
+    assert client.get(f"/contracts/{contract['id']}", params={"expand": "customer"}).headers["ETag"] != contract_etag
+    client.put(f"/deliveries/{delivery['id']}", json={"delivered_at": "2024-05-01T09:00:00"})
+    assert client.get(f"/contracts/{contract['id']}", headers={"If-None-Match": contract_etag}).status_code == 200
+    assert client.get("/deliveries/", headers={"If-None-Match": list_etag}).status_code == 200
+    assert client.get("/deliveries/999999", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_requests_report_query_count_and_db_time(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    contract = create_contract(client, create_customer(client)["id"])
+
+    with query_budget(2) as requests:
+        response = client.get(f"/contracts/{contract['id']}")
+    timing = response.headers["Server-Timing"]
+    metrics = {part.split(";")[0].strip(): part for part in timing.split(",")}
+    assert set(metrics) == {"db", "app", "total"}
+    assert f'desc="{requests[0].count} queries"' in metrics["db"]
+    assert requests[0].route == "/contracts/{contract_id}"
+    assert requests[0].db_time > 0
+
+    with pytest.raises(AssertionError, match=r"GET /contracts/\{contract_id\}: 2 statements"):
+        with query_budget(1):
+            client.get(f"/contracts/{contract['id']}")
+
+    monkeypatch.setattr(profiling.settings, "slow_query_threshold", 0.0)
+    with caplog.at_level("WARNING", logger="app.profiling"):
+        client.get("/customers/")
+    assert any("on /customers/" in record.getMessage() for record in caplog.records)
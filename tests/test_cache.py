@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.cache import MISSING, LRUCache, SharedCache, SingleFlightCache
+from tests.test_api import create_batch, create_contract, create_customer
+
+
+def test_lru_cache_evicts_least_recent_and_expires() -> None:
+    now = [0.0]
+    cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    now[0] = 10.0
+    assert cache.get("a") is MISSING
+    assert len(cache) == 1
+
+
+def test_single_flight_cache_shares_one_computation_between_concurrent_misses() -> None:
+    now = [0.0]
+    cache = SingleFlightCache(ttl=5, clock=lambda: now[0])
+    calls = []
+    started = threading.Event()
+
+    def compute() -> int:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        first = pool.submit(cache.get_or_compute, compute)
+        started.wait()
+        results = [pool.submit(cache.get_or_compute, compute) for _ in range(7)]
+        assert {first.result(), *(result.result() for result in results)} == {1}
+    assert len(calls) == 1
+
+    now[0] = 5.0
+    assert cache.get_or_compute(compute) == 2
+    cache.clear()
+    assert cache.get_or_compute(compute) == 3
+
+
+def test_shared_cache_invalidation_is_seen_by_other_workers(tmp_path: Path) -> None:
+    path = str(tmp_path / "cache.db")
+    worker_a, worker_b = SharedCache(path, maxsize=10, ttl=60), SharedCache(path, maxsize=10, ttl=60)
+    worker_a.set("contracts:1", [1, 7])
+    assert worker_b.get("contracts:1") == [1, 7]
+    worker_b.delete("contracts:1")
+    assert worker_a.get("contracts:1") is MISSING
+
+
+def test_reference_lookups_are_cached_and_invalidated(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    batch = create_batch(client, contract["id"])
+    feeding = {"batch_id": batch["id"], "feed_type": "玉米", "quantity_kg": 12.5}
+
+    before = client.get("/health/cache").json()
+    for _ in range(3):
+        assert client.post("/feedings/", json=feeding).status_code == 201
+    stats = client.get("/health/cache").json()
+    assert stats["backend"] == "memory"
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 2
+
+    assert client.delete(f"/contracts/{contract['id']}").status_code == 204
+    assert client.post("/feedings/", json=feeding).status_code == 400
+    delivery = {"contract_id": contract["id"], "eggs_delivered": 1, "packaging": "散装"}
+    assert client.post("/deliveries/", json=delivery).json()["detail"] == "Contract not found"
@@ -0,0 +1,99 @@
+"""Concurrency tests for egg accounting and code allocation; run them on MySQL with ``scripts/run_tests.sh mysql``."""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from app.customer_codes import allocate_codes
+from app.database import session_scope
+from tests.test_api import CUSTOMER_PAYLOAD, create_contract, create_customer
+
+WORKERS = 8
+ATTEMPTS_PER_WORKER = 20
+
+
+def test_concurrent_deliveries_never_lose_or_overdraw_eggs(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    total = contract["remaining_eggs"]
+    eggs_per_delivery = 2
+    attempts = WORKERS * ATTEMPTS_PER_WORKER
+    assert attempts * eggs_per_delivery > total
+
+    def courier(worker: int) -> list[int]:
+        statuses = []
+        for _ in range(ATTEMPTS_PER_WORKER):
+            response = client.post(
+                "/deliveries/",
+                json={
+                    "contract_id": contract["id"],
+                    "eggs_delivered": eggs_per_delivery,
+                    "packaging": "散装",
+                    "delivered_by": f"配送员{worker}",
+                },
+            )
+            statuses.append(response.status_code)
+        return statuses
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        statuses = [code for result in pool.map(courier, range(WORKERS)) for code in result]
+
+    assert set(statuses) <= {201, 400}
+    accepted = statuses.count(201)
+    assert accepted == total // eggs_per_delivery
+
+    remaining = client.get(f"/contracts/{contract['id']}").json()["remaining_eggs"]
+    deliveries = client.get("/deliveries/", params={"limit": 500}).json()
+    delivered = sum(item["eggs_delivered"] for item in deliveries)
+    assert len(deliveries) == accepted
+    assert remaining == 0
+    assert remaining + delivered == total
+
+
+def test_concurrent_deletes_restore_eggs_once(client: TestClient) -> None:
+    customer = create_customer(client)
+    contract = create_contract(client, customer["id"])
+    delivery = client.post(
+        "/deliveries/",
+        json={"contract_id": contract["id"], "eggs_delivered": 30, "packaging": "普通家庭装30枚"},
+    ).json()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        statuses = list(pool.map(lambda _: client.delete(f"/deliveries/{delivery['id']}").status_code, range(WORKERS)))
+
+    assert statuses.count(204) == 1
+    assert set(statuses) <= {204, 404}
+    assert client.get(f"/contracts/{contract['id']}").json()["remaining_eggs"] == contract["total_eggs"]
+
+
+def test_concurrent_code_allocation_never_hands_out_a_code_twice(client: TestClient) -> None:
+    block = 5
+
+    def clerk(worker: int) -> list[str]:
+        codes = []
+        for attempt in range(ATTEMPTS_PER_WORKER // 2):
+            payload = {**CUSTOMER_PAYLOAD, "phones": [f"136{worker:02d}{attempt:06d}"], "area_code": "23"}
+            del payload["customer_code"]
+            response = client.post("/customers/", json=payload)
+            assert response.status_code == 201, response.text
+            codes.append(response.json()["customer_code"])
+        return codes
+
+    def importer(_: int) -> list[str]:
+        codes = []
+        for _ in range(ATTEMPTS_PER_WORKER // 4):
+            with session_scope() as db:
+                codes += allocate_codes(db, "23", block)
+                db.commit()
+        return codes
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        clerks = pool.map(clerk, range(WORKERS // 2))
+        importers = pool.map(importer, range(WORKERS // 2))
+        codes = [code for result in [*clerks, *importers] for code in result]
+
+    created = WORKERS // 2 * (ATTEMPTS_PER_WORKER // 2)
+    reserved = WORKERS // 2 * (ATTEMPTS_PER_WORKER // 4) * block
+    assert len(codes) == len(set(codes)) == created + reserved
+    assert sorted(codes) == [f"23{sequence:03d}" for sequence in range(1, created + reserved + 1)]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import csv
+import io
+import sys
+
+import pytest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import importer
+from app.database import session_scope
+from app.delivery_stats import rebuild
+from app.models import Contract, ContractDeliveryStats, Customer
+
+CUSTOMERS_CSV = """customer_code,name,phones,recipient_name,address,area_code,first_purchase_date
+21001,老客户,13900000000；13911111111,张三,广安前锋区,21,2023-03-01
+21002,,13922222222,李四,广安岳池县,21,
+21001,重复客户,,王五,广安,21,
+21003,新客户,+86 139 1111 1111,赵六,广安,21,
+"""
+
+CONTRACTS_CSV = """contract_code,customer_code,package_name,hen_type,egg_type,total_eggs,price,start_date
+HIS-001,21001,山野草鸡定养,草鸡母,山野草鸡蛋,100,466,2023-03-02
+HIS-002,29999,山野草鸡定养,草鸡母,山野草鸡蛋,100,466,2023-03-02
+"""
+
+DELIVERIES_CSV = """contract_code,delivered_at,eggs_delivered,packaging,hen_delivered
+HIS-001,2023-04-01 09:00,30,散装,否
+HIS-001,2023-05-01 09:00,60,散装,是
+HIS-001,2023-06-01 09:00,30,散装,否
+HIS-404,2023-06-01 09:00,10,散装,否
+HIS-001,2023-07-01 09:00,abc,散装,否
+"""
+
+
+def test_import_cli_writes_rejects_and_keeps_balances(tmp_path, capsys) -> None:
+    customers = tmp_path / "customers.csv"
+    customers.write_text(CUSTOMERS_CSV, encoding="utf-8")
+    contracts = tmp_path / "contracts.csv"
+    contracts.write_text(CONTRACTS_CSV, encoding="utf-8")
+    deliveries = tmp_path / "deliveries.csv"
+    deliveries.write_text(DELIVERIES_CSV, encoding="utf-8")
+
+    importer.main(["customers", str(customers), "--chunk-size", "2"])
+    importer.main(["contracts", str(contracts)])
+    # Chunks of one row: the third delivery is rejected against the balance committed by the first two.
+    importer.main(["deliveries", str(deliveries), "--chunk-size", "1"])
+    output = capsys.readouterr().out
+    assert "Imported 1 customers" in output and "rejected 3" in output
+    assert "Imported 2 deliveries" in output and "rejected 3" in output
+
+    rejects = (tmp_path / "customers.csv.rejects.csv").read_text(encoding="utf-8-sig").splitlines()
+    assert rejects[0] == "line,error,customer_code,name,phones,recipient_name,address,area_code,first_purchase_date"
+    assert rejects[1].startswith("3,name: Field required,21002")
+    assert rejects[2].startswith("4,customer_code 21001 already exists,21001,重复客户")
+    assert rejects[3].startswith("5,Phone already bound to another customer: 13911111111,21003")
+    assert (tmp_path / "contracts.csv.rejects.csv").read_text(encoding="utf-8-sig").splitlines()[1].startswith(
+        "3,Customer 29999 not found"
+    )
+    with (tmp_path / "deliveries.csv.rejects.csv").open(encoding="utf-8-sig", newline="") as stream:
+        delivery_rejects = list(csv.reader(stream))
+    assert [row[:2] for row in delivery_rejects[1:]] == [
+        ["4", "Insufficient remaining eggs"],
+        ["5", "Contract HIS-404 not found"],
+        ["6", "eggs_delivered: Input should be a valid integer, unable to parse string as an integer"],
+    ]
+
+    with session_scope() as db:
+        customer = db.scalars(select(Customer)).one()
+        assert customer.phones == ["13900000000", "13911111111"]
+        assert sorted(row.phone for row in customer.phone_numbers) == ["13900000000", "13911111111"]
+        contract = db.scalars(select(Contract)).one()
+        assert (contract.remaining_eggs, contract.hen_delivered) == (10, True)
+        stats = db.get(ContractDeliveryStats, contract.id)
+        imported = (stats.eggs_delivered_total, stats.delivery_count, stats.hen_delivery_count)
+        assert imported == (90, 2, 1)
+        rebuild(db)
+        db.expire_all()
+        stats = db.get(ContractDeliveryStats, contract.id)
+        assert (stats.eggs_delivered_total, stats.delivery_count, stats.hen_delivery_count) == imported
+        db.rollback()
+
+
+def test_import_upload_endpoint(client: TestClient) -> None:
+    response = client.post("/imports/customers", content=CUSTOMERS_CSV.encode(), headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "kind": "customers",
+        "imported": 1,
+        "rejected": 3,
+        "rejects": [
+            {"line": 3, "error": "name: Field required"},
+            {"line": 4, "error": "customer_code 21001 already exists"},
+            {"line": 5, "error": "Phone already bound to another customer: 13911111111"},
+        ],
+    }
+    assert client.get("/customers/by-phone/13911111111").json()["customer_code"] == "21001"
+
+    missing = client.post("/imports/contracts", content=b"contract_code,price\nX,1\n")
+    assert missing.status_code == 400
+    assert missing.json()["detail"].startswith("Missing columns: customer_code, egg_type")
+    gbk = client.post("/imports/customers", content="客户编号\n".encode("gbk"))
+    assert gbk.status_code == 400
+
+
+def test_import_rows_streams_in_chunks() -> None:
+    rows = iter(
+        (line, {"customer_code": f"3{line:04d}", "name": "客户", "recipient_name": "收件人", "address": "地址"})
+        for line in range(2, 2 + 2500)
+    )
+    rejects: list[tuple[int, str]] = []
+    with session_scope() as db:
+        result = importer.import_rows(
+            db,
+            "customers",
+            ["customer_code", "name", "recipient_name", "address"],
+            rows,
+            lambda line, raw, error: rejects.append((line, error)),
+            chunk_size=1000,
+        )
+    assert (result.imported, result.rejected, rejects) == (2500, 0, [])
+    assert next(rows, None) is None
+    with session_scope() as db:
+        assert len(db.scalars(select(Customer.id)).all()) == 2500
+
+
+def test_xlsx_without_openpyxl_is_a_format_error(monkeypatch) -> None:
+    monkeypatch.setitem(sys.modules, "openpyxl", None)
+    with pytest.raises(importer.ImportFormatError, match="openpyxl"):
+        list(importer.read_rows(io.BytesIO(b""), "xlsx"))
+
+
+def test_import_allocates_missing_customer_codes_in_blocks() -> None:
+    rows = [
+        (2, {"customer_code": "22005", "name": "老客户", "recipient_name": "甲", "address": "广安"}),
+        (3, {"name": "新客户", "recipient_name": "乙", "address": "广安", "area_code": "22"}),
+        (4, {"name": "新客户", "recipient_name": "丙", "address": "广安", "area_code": "24"}),
+        (5, {"name": "新客户", "recipient_name": "丁", "address": "广安", "area_code": "22"}),
+        (6, {"name": "无分区", "recipient_name": "戊", "address": "广安"}),
+    ]
+    rejects: list[tuple[int, str]] = []
+    columns = ["customer_code", "name", "recipient_name", "address", "area_code"]
+    with session_scope() as db:
+        result = importer.import_rows(
+            db, "customers", columns, rows, lambda line, raw, error: rejects.append((line, error))
+        )
+        codes = dict(db.execute(select(Customer.recipient_name, Customer.customer_code)).all())
+    assert (result.imported, result.rejected) == (4, 1)
+    assert rejects == [(6, "area_code must be 2 followed by the area digit, got None")]
+    assert codes == {"甲": "22005", "乙": "22006", "丙": "24001", "丁": "22007"}
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import re
+
+from fastapi.testclient import TestClient
+
+from tests.test_api import create_contract, create_customer
+
+
+def _sample(body: str, name: str, **labels: str) -> float:
+    for line in body.splitlines():
+        if line.startswith("#"):
+            continue
+        metric, _, value = line.rpartition(" ")
+        match = re.fullmatch(rf"{name}(?:\{{(.*)\}})?", metric)
+        if match and all(f'{key}="{val}"' in (match.group(1) or "") for key, val in labels.items()):
+            return float(value)
+    raise AssertionError(f"{name} {labels} not exported")
+
+
+def test_metrics_label_requests_by_route_template(client: TestClient) -> None:
+    contract = create_contract(client, create_customer(client)["id"])
+    route = {"method": "GET", "route": "/contracts/{contract_id}", "status": "200"}
+    before = client.get("/metrics").text
+    baseline = 0.0 if "/contracts/{contract_id}" not in before else _sample(before, "http_requests_total", **route)
+    for _ in range(3):
+        client.get(f"/contracts/{contract['id']}")
+    client.get("/no-such-page/42")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert _sample(body, "http_requests_total", **route) == baseline + 3
+    assert _sample(body, "http_request_duration_seconds_bucket", le="+Inf", **route) == baseline + 3
+    assert _sample(body, "http_request_duration_seconds_sum", **route) > 0
+    assert _sample(body, "http_requests_total", route="unmatched", status="404") >= 1
+    assert "/no-such-page/42" not in body
+    # The scrape itself is in flight while the body is rendered.
+    assert _sample(body, "http_requests_in_flight") == 1
+    assert _sample(body, "db_pool_checked_out", engine="sync") >= 0
+    assert _sample(body, "db_pool_checkout_wait_seconds_count", engine="sync") > 0
+    assert _sample(body, "reference_cache_misses_total", backend="memory") >= 1
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import func, inspect, select
+from sqlalchemy.sql import Select
+
+from app.database import Base, get_engine, session_scope
+from app.delivery_stats import latest_delivery
+from app.models import Contract, Delivery, Feeding, Medication, Settlement, Weighing
+from app.seed import seed
+
+
+HOT_QUERIES: list[tuple[str, Select]] = [
+    (
+        "ix_deliveries_delivered_at",
+        select(Delivery).order_by(Delivery.delivered_at.desc(), Delivery.id.desc()).limit(101),
+    ),
+    (
+        "ix_deliveries_contract_id_delivered_at",
+        select(func.coalesce(func.sum(Delivery.eggs_delivered), 0)).where(Delivery.contract_id == 1),
+    ),
+    (
+        "ix_deliveries_contract_id_delivered_at",
+        select(latest_delivery(1)),
+    ),
+    ("ix_feedings_fed_at", select(Feeding).order_by(Feeding.fed_at.desc(), Feeding.id.desc()).limit(101)),
+    ("ix_feedings_batch_id_fed_at", select(Feeding).where(Feeding.batch_id == 1).order_by(Feeding.fed_at)),
+    (
+        "ix_medications_administered_at",
+        select(Medication).order_by(Medication.administered_at.desc(), Medication.id.desc()).limit(101),
+    ),
+    (
+        "ix_weighings_batch_id_recorded_at",
+        select(Weighing).where(Weighing.batch_id == 1).order_by(Weighing.recorded_at),
+    ),
+    (
+        "ix_settlements_settlement_date",
+        select(Settlement).order_by(Settlement.settlement_date.desc(), Settlement.id.desc()).limit(101),
+    ),
+    ("ix_contracts_customer_id", select(Contract).where(Contract.customer_id == 1)),
+]
+
+
+@pytest.fixture()
+def planner_statistics() -> None:
+    """Give MySQL rows and fresh statistics; on empty tables its plans do not reflect production."""
+
+    engine = get_engine()
+    if engine.dialect.name != "mysql":
+        return
+    with session_scope() as session:
+        seed(session)
+    with engine.connect() as connection:
+        for table in Base.metadata.sorted_tables:
+            connection.exec_driver_sql(f"ANALYZE TABLE {table.name}")
+
+
+def _indexes_used(statement: Select) -> str:
+    engine = get_engine()
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+            return " ".join(row[-1] for row in rows)
+        if engine.dialect.name == "mysql":
+            rows = connection.exec_driver_sql(f"EXPLAIN {compiled}").mappings().all()
+            return " ".join(str(row["key"]) for row in rows)
+    pytest.skip(f"query plan assertions not defined for {engine.dialect.name}")
+
+
+@pytest.mark.parametrize(("index_name", "statement"), HOT_QUERIES, ids=[name for name, _ in HOT_QUERIES])
+def test_hot_queries_use_secondary_indexes(index_name: str, statement: Select, planner_statistics: None) -> None:
+    assert index_name in _indexes_used(statement)
+
+
+def test_migrated_indexes_match_models() -> None:
+    inspector = inspect(get_engine())
+    for table in Base.metadata.sorted_tables:
+        declared = {index.name for index in table.indexes}
+        migrated = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert declared <= migrated, table.name
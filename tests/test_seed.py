@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import re
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import session_scope
+from app.delivery_stats import rebuild
+from app.models import Contract, ContractDeliveryStats, Customer, Delivery
+from app.seed import SCALE_COLUMNS, seed, seed_scale
+
+STATS_COLUMNS = select(
+    ContractDeliveryStats.contract_id,
+    ContractDeliveryStats.eggs_delivered_total,
+    ContractDeliveryStats.delivery_count,
+    ContractDeliveryStats.hen_delivery_count,
+    ContractDeliveryStats.last_delivered_at,
+).order_by(ContractDeliveryStats.contract_id)
+
+
+def test_scale_seed_is_consistent_and_resumable() -> None:
+    interrupted = seed_scale(250, seed_value=3, chunk_size=100, analyze=False)
+    progress = [next(interrupted), next(interrupted)]
+    interrupted.close()
+    assert [done for done, _ in progress] == [100, 200]
+    resumed = list(seed_scale(250, seed_value=3, chunk_size=100, analyze=False))
+    assert [done for done, _ in resumed] == [250]
+
+    with session_scope() as db:
+        stored = sum(db.scalar(select(func.count()).select_from(table)) for table in SCALE_COLUMNS)
+        assert stored == sum(rows for _, rows in progress + resumed)
+        codes = db.execute(select(Customer.customer_code, Customer.area_code)).all()
+        assert len({code for code, _ in codes}) == 250
+        assert all(re.fullmatch(r"2\d{4}", code) and code[:2] == area for code, area in codes)
+
+        delivered = (
+            select(func.coalesce(func.sum(Delivery.eggs_delivered), 0))
+            .where(Delivery.contract_id == Contract.id)
+            .scalar_subquery()
+        )
+        drifted = select(func.count(Contract.id)).where(Contract.remaining_eggs != Contract.total_eggs - delivered)
+        assert db.scalar(drifted) == 0
+        generated = db.execute(STATS_COLUMNS).all()
+        rebuild(db)
+        assert db.execute(STATS_COLUMNS).all() == generated
+        db.rollback()
+
+
+def test_scale_seed_refuses_foreign_data() -> None:
+    with session_scope() as db:
+        seed(db)
+    with pytest.raises(SystemExit):
+        list(seed_scale(10, analyze=False))